@@ -1,5 +1,11 @@
+import math
+import uuid
+
 import streamlit as st
 from pipeline.pipeline import AnimeRecommendationPipeline
+from src.llm_gateway import KeyedRateLimiter
+from utils.metrics import start_metrics_server
+from config.config import USER_RATE_LIMIT_PER_MINUTE, USER_RATE_LIMIT_BURST, PROCESSED_CSV_PATH
 from dotenv import load_dotenv
 
 st.set_page_config(
@@ -47,9 +53,21 @@ input[type="text"] {
 # ---------------------- Load the Pipeline ----------------------
 @st.cache_resource
 def init_pipeline():
-    return AnimeRecommendationPipeline(csv_path="")
+    # Load the embedding model, Chroma and the LLM client in the background so the
+    # page renders immediately; queries wait for readiness below.
+    # /metrics for Prometheus (no-op unless METRICS_ENABLED=true)
+    start_metrics_server()
+    return AnimeRecommendationPipeline(csv_path=str(PROCESSED_CSV_PATH), startup="background")
+
+@st.cache_resource
+def init_user_limiter():
+    # Shared by every session; each browser session gets its own bucket
+    return KeyedRateLimiter(USER_RATE_LIMIT_PER_MINUTE, USER_RATE_LIMIT_BURST)
 
 pipeline = init_pipeline()
+user_limiter = init_user_limiter()
+if "user_id" not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
 
 # --------------------------- HEADER -------------------------------------
 st.markdown("<h1>✨ Anime Recommender System ✨</h1>", unsafe_allow_html=True)
@@ -73,16 +91,18 @@ recommend_btn = st.button("🎌 Recommend Anime")
 if recommend_btn:
     if not query.strip():
         st.warning("Please enter a description of your preferences first 😊")
+    elif not (limit := user_limiter.try_acquire(st.session_state.user_id))[0]:
+        st.warning(f"You're sending requests too quickly; please try again in {math.ceil(limit[1])}s ⏳")
     else:
-        with st.spinner("Finding the best anime for you... 🌸"):
-            try:
-                recommendation = pipeline.recommend(query)
-
-                st.markdown("<h3>🎯 Recommended Anime</h3>", unsafe_allow_html=True)
-                st.markdown(
-                    f"<div class='result-box'>{recommendation}</div>",
-                    unsafe_allow_html=True,
-                )
-
-            except Exception as e:
-                st.error(f"⚠️ An error occurred: {e}")
+        try:
+            if not pipeline.is_ready():
+                with st.spinner("Warming up the recommender... 🌸"):
+                    pipeline.wait_until_ready()
+
+            st.markdown("<h3>🎯 Recommended Anime</h3>", unsafe_allow_html=True)
+            # Render tokens as they arrive instead of waiting for the full answer
+            with st.container(border=True):
+                st.write_stream(pipeline.stream_recommend(query))
+
+        except Exception as e:
+            st.error(f"⚠️ An error occurred: {e}")
@@ -0,0 +1,317 @@
+# app/server.py
+"""
+HTTP/JSON serving entry point (FastAPI), independent of Streamlit.
+
+One AnimeRecommendationPipeline per worker process serves every request, so the
+embedding model and vector index are loaded once. Concurrent `/recommend` requests
+are micro-batched (one query-embedding call and one vector search per batch), at most
+SERVER_MAX_CONCURRENCY execute at once, up to SERVER_MAX_QUEUE more wait, and anything
+beyond that is rejected with 429 + Retry-After.
+
+    python -m app.server --port 8000 --workers 2
+    python -m app.server --stub-llm --fake-embeddings      # local testing, no Groq/HF
+    curl -X POST localhost:8000/recommend -H 'Content-Type: application/json' \\
+         -d '{"query": "space bounty hunters", "include_genres": ["sci-fi"]}'
+    # "mode": "fast" skips the LLM and answers from the retrieved documents
+"""
+import os
+import math
+import time
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal, Optional, Set, Tuple
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.filters import FiltersUnavailable, RecommendationFilter
+from src.llm_gateway import KeyedRateLimiter
+from utils import metrics
+from utils.logger import get_logger
+from config.config import (
+    SERVER_MAX_CONCURRENCY,
+    SERVER_MAX_QUEUE,
+    SERVER_BATCH_WAIT_MS,
+    SERVER_MAX_BATCH_SIZE,
+    SERVER_REQUEST_TIMEOUT,
+    USER_RATE_LIMIT_PER_MINUTE,
+    USER_RATE_LIMIT_BURST,
+    USER_ID_HEADER,
+    NEIGHBOURS_TOP_N,
+    PROCESSED_CSV_PATH,
+)
+
+logger = get_logger(__name__)
+
+# Read by the app factory so `--workers N` (separate processes) picks them up too
+STUB_LLM_ENV = "SERVER_STUB_LLM"
+FAKE_EMBEDDINGS_ENV = "SERVER_FAKE_EMBEDDINGS"
+
+
+def rate_limit_key(request: Request, user_header: str = USER_ID_HEADER) -> str:
+    """
+    Per-user rate-limit key: the client address, or `user_header` when configured (it
+    must come from a trusted proxy; a missing header falls back to the address).
+    """
+    user = request.headers.get(user_header) if user_header else None
+    return user or (request.client.host if request.client else "")
+
+
+class RecommendRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=2000)
+    include_genres: List[str] = []
+    exclude_genres: List[str] = []
+    min_score: Optional[float] = None
+    # "fast" answers from the retrieved documents alone, without the LLM
+    mode: Literal["llm", "fast"] = "llm"
+
+    def filters(self) -> Optional[RecommendationFilter]:
+        filters = RecommendationFilter(
+            include_genres=tuple(self.include_genres),
+            exclude_genres=tuple(self.exclude_genres),
+            min_score=self.min_score,
+        )
+        return None if filters.is_empty() else filters
+
+
+class RecommendResponse(BaseModel):
+    answer: str
+    latency_ms: float
+    batch_size: int
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full."""
+
+
+class AdmissionController:
+    """
+    Lets `max_concurrency` requests run and `max_queue` more wait; rejects the rest
+    immediately (backpressure instead of unbounded queueing).
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.admitted = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.admitted >= self.max_concurrency + self.max_queue:
+            raise Overloaded()
+        self.admitted += 1
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            self.admitted -= 1
+
+
+class MicroBatcher:
+    """
+    Groups concurrent queries that share the same filters into one
+    `arecommend_batch` call, flushing after `max_wait_ms` or `max_batch_size` queries.
+    """
+
+    def __init__(self, pipeline: AnimeRecommendationPipeline, max_batch_size: int, max_wait_ms: float):
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: Dict[Optional[RecommendationFilter], List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Optional[RecommendationFilter], asyncio.TimerHandle] = {}
+        # Strong references: the event loop only keeps weak ones to running tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, query: str, filters: Optional[RecommendationFilter]) -> Tuple[str, int]:
+        """:return: (answer, size of the batch it was served in)."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        batch = self._pending.setdefault(filters, [])
+        batch.append((query, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(filters)
+        elif filters not in self._timers:
+            self._timers[filters] = loop.call_later(self.max_wait, self._flush, filters)
+        return await future
+
+    def _flush(self, filters: Optional[RecommendationFilter]) -> None:
+        timer = self._timers.pop(filters, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(filters, [])
+        if batch:
+            task = asyncio.ensure_future(self._run(batch, filters))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """Cancels pending timers and in-flight batches (their callers see the cancellation)."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for batch in self._pending.values():
+            for _, future in batch:
+                future.cancel()
+        self._pending.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]], filters: Optional[RecommendationFilter]) -> None:
+        queries = [query for query, _ in batch]
+        try:
+            answers = await self.pipeline.arecommend_batch(
+                queries, max_concurrency=len(queries), filters=filters
+            )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), answer in zip(batch, answers):
+            if not future.done():
+                future.set_result((answer, len(batch)))
+
+
+def _create_pipeline() -> AnimeRecommendationPipeline:
+    llm = embedding = None
+    if os.getenv(STUB_LLM_ENV) == "1" or os.getenv(FAKE_EMBEDDINGS_ENV) == "1":
+        # Local testing only: offline stand-ins for Groq and the HuggingFace model
+        from src.stubs import StubChatModel, make_embeddings
+
+        if os.getenv(STUB_LLM_ENV) == "1":
+            llm = StubChatModel(latency=float(os.getenv("SERVER_STUB_LLM_LATENCY", "0.5")))
+        if os.getenv(FAKE_EMBEDDINGS_ENV) == "1":
+            embedding = make_embeddings()
+    return AnimeRecommendationPipeline(
+        csv_path=str(PROCESSED_CSV_PATH), startup="background", llm=llm, embedding=embedding
+    )
+
+
+def create_app(pipeline: Optional[AnimeRecommendationPipeline] = None) -> FastAPI:
+    """
+    :param pipeline: Pre-built pipeline (e.g. in tests); by default one is created at startup.
+    """
+    state: Dict[str, object] = {}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        state["pipeline"] = pipeline or _create_pipeline()
+        state["admission"] = AdmissionController(SERVER_MAX_CONCURRENCY, SERVER_MAX_QUEUE)
+        state["batcher"] = MicroBatcher(state["pipeline"], SERVER_MAX_BATCH_SIZE, SERVER_BATCH_WAIT_MS)
+        state["user_limiter"] = KeyedRateLimiter(USER_RATE_LIMIT_PER_MINUTE, USER_RATE_LIMIT_BURST)
+        logger.info(
+            "Server started (max_concurrency=%s, max_queue=%s, batch=%s/%sms)",
+            SERVER_MAX_CONCURRENCY, SERVER_MAX_QUEUE, SERVER_MAX_BATCH_SIZE, SERVER_BATCH_WAIT_MS,
+        )
+        yield
+        await state["batcher"].close()
+
+    app = FastAPI(title="Anime Recommender", lifespan=lifespan)
+
+    @app.post("/recommend", response_model=RecommendResponse)
+    async def recommend(request: RecommendRequest, http_request: Request) -> RecommendResponse:
+        start = time.perf_counter()
+        allowed, retry_in = state["user_limiter"].try_acquire(rate_limit_key(http_request))
+        if not allowed:
+            metrics.inc("anime_user_rate_limited_total")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests for this user",
+                headers={"Retry-After": str(math.ceil(retry_in))},
+            )
+        try:
+            async with state["admission"].slot():
+                if request.mode == "fast":
+                    # Retrieval only: nothing to amortise over a batch
+                    answer, batch_size = await asyncio.wait_for(
+                        state["pipeline"].arecommend(request.query, request.filters(), mode="fast"),
+                        timeout=SERVER_REQUEST_TIMEOUT,
+                    ), 1
+                else:
+                    answer, batch_size = await asyncio.wait_for(
+                        state["batcher"].submit(request.query, request.filters()),
+                        timeout=SERVER_REQUEST_TIMEOUT,
+                    )
+        except Overloaded:
+            metrics.inc("anime_http_rejected_total")
+            raise HTTPException(status_code=429, detail="Server is busy", headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Recommendation timed out")
+        except FiltersUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception:
+            logger.error("Recommendation request failed", exc_info=True)
+            raise HTTPException(status_code=500, detail="Failed to get recommendation")
+
+        return RecommendResponse(
+            answer=answer,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2),
+            batch_size=batch_size,
+        )
+
+    @app.get("/similar")
+    async def similar(title: Optional[str] = None, mal_id: Optional[int] = None, n: int = 10) -> Dict[str, object]:
+        """Precomputed "more like this" lookup (no embedding or LLM call) by `title` or `mal_id`."""
+        if (title is None) == (mal_id is None):
+            raise HTTPException(status_code=422, detail="Pass exactly one of 'title' and 'mal_id'")
+        title_or_id = mal_id if mal_id is not None else title
+        n = max(1, min(n, NEIGHBOURS_TOP_N))
+        try:
+            # The first lookup loads the table from disk; keep that off the event loop
+            return await asyncio.to_thread(state["pipeline"].similar_to, title_or_id, n=n)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"No anime matches {title_or_id!r}")
+        except FileNotFoundError:
+            raise HTTPException(status_code=503, detail="neighbour table not built")
+
+    @app.get("/genres")
+    async def genres() -> List[str]:
+        return await asyncio.to_thread(state["pipeline"].available_genres)
+
+    @app.get("/healthz")
+    async def healthz() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz(response: Response) -> Dict[str, object]:
+        ready = state["pipeline"].is_ready()
+        if not ready:
+            response.status_code = 503
+        return {"ready": ready, "admitted": state["admission"].admitted}
+
+    @app.get("/metrics")
+    async def prometheus_metrics() -> Response:
+        return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the anime recommender over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (each loads its own pipeline).")
+    parser.add_argument("--stub-llm", action="store_true", help="Use the offline stub LLM instead of Groq.")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use fake embeddings (no model download).")
+    args = parser.parse_args()
+
+    if args.stub_llm:
+        os.environ[STUB_LLM_ENV] = "1"
+    if args.fake_embeddings:
+        os.environ[FAKE_EMBEDDINGS_ENV] = "1"
+    uvicorn.run("app.server:create_app", factory=True, host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_batch_recommend.py
+"""
+Compares sequential `recommend`, concurrent `arecommend` and `recommend_batch`
+on a temporary vector store, with a local stub LLM in place of ChatGroq.
+
+    python -m benchmarks.bench_batch_recommend --queries 16 --llm-latency 0.5
+"""
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from src.stubs import StubChatModel, make_embeddings
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.vector_store import VectorStoreBuilder
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSED_CSV_PATH = PROJECT_ROOT / "data" / "anime_updated.csv"
+
+SAMPLE_QUERIES = [
+    "dark fantasy like Attack on Titan",
+    "cozy slice of life",
+    "space bounty hunters with jazz",
+    "giant robots and teenage pilots",
+    "samurai action with comedy",
+    "psychological thriller with a detective",
+    "romantic comedy in high school",
+    "post-apocalyptic adventure",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub LLM delay in seconds.")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--embedding-model", default=None, help="Small local model; default fake vectors.")
+    args = parser.parse_args()
+
+    queries = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] + f" #{i}" for i in range(args.queries)]
+    embedding = make_embeddings(args.embedding_model)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persist_dir = str(Path(tmp) / "chroma_db")
+        VectorStoreBuilder(str(PROCESSED_CSV_PATH), persist_dir=persist_dir, embedding=embedding).build_and_save_vectorstore()
+
+        pipeline = AnimeRecommendationPipeline(
+            csv_path=str(PROCESSED_CSV_PATH),
+            persist_dir=persist_dir,
+            use_query_cache=False,
+            use_answer_cache=False,
+            llm=StubChatModel(latency=args.llm_latency),
+            embedding=embedding,
+        )
+
+        start = time.perf_counter()
+        for query in queries:
+            pipeline.recommend(query)
+        sequential = time.perf_counter() - start
+
+        async def run_concurrent():
+            semaphore = asyncio.Semaphore(args.max_concurrency)
+
+            async def one(query):
+                async with semaphore:
+                    return await pipeline.arecommend(query)
+
+            return await asyncio.gather(*(one(query) for query in queries))
+
+        start = time.perf_counter()
+        asyncio.run(run_concurrent())
+        concurrent = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pipeline.recommend_batch(queries, max_concurrency=args.max_concurrency)
+        batch = time.perf_counter() - start
+
+    print(json.dumps({
+        "queries": len(queries),
+        "llm_latency_s": args.llm_latency,
+        "max_concurrency": args.max_concurrency,
+        "sequential_s": round(sequential, 3),
+        "arecommend_gather_s": round(concurrent, 3),
+        "recommend_batch_s": round(batch, 3),
+        "batch_speedup": round(sequential / batch, 2) if batch else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_embedding_backends.py
+"""
+Compares query-encoding latency, load time and memory of the embedding backends
+(torch fp32, ONNX fp32, ONNX int8), and checks retrieval parity against the fp32 index:
+every backend's query vectors are searched against document vectors encoded with
+torch fp32, and top-k overlap with the fp32 query results is reported as recall@k.
+Each backend runs in a fresh process so RSS numbers are not polluted by the others.
+
+    python -m benchmarks.bench_embedding_backends --model sentence-transformers/all-MiniLM-L6-v2
+    python -m benchmarks.bench_embedding_backends --threads 4 --min-recall 0.95
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import latency_summary, rss_mb
+from benchmarks.bench_batch_recommend import SAMPLE_QUERIES
+from config.config import HUGGINGFACE_MODEL_NAME, HUGGINGFACE_MODEL_CACHE_DIR
+from src.embeddings import BatchedEmbeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSED_CSV_PATH = PROJECT_ROOT / "data" / "anime_updated.csv"
+
+
+def _measure(backend: str, args: Dict, queries: List[str], result_queue) -> None:
+    baseline = rss_mb()
+    embedding = BatchedEmbeddings(
+        model_name=args["model"],
+        cache_folder=args["cache_folder"],
+        backend=backend,
+        num_threads=args["threads"],
+        onnx_dir=args["onnx_dir"],
+        quantization_config=args["quantization"],
+    )
+    start = time.perf_counter()
+    embedding.embed_query(queries[0])  # pays for loading (and the one-off ONNX export)
+    load_s = time.perf_counter() - start
+
+    samples, vectors = [], []
+    for query in queries:
+        t = time.perf_counter()
+        vectors.append(embedding.embed_query(query))
+        samples.append(time.perf_counter() - t)
+
+    result_queue.put({
+        "backend": backend,
+        "load_and_first_query_s": round(load_s, 3),
+        "rss_delta_mb": round(rss_mb() - baseline, 1),
+        **latency_summary(samples),
+        "vectors": vectors,
+    })
+
+
+def _top_k(queries: np.ndarray, documents: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=HUGGINGFACE_MODEL_NAME)
+    parser.add_argument("--cache-folder", default=str(HUGGINGFACE_MODEL_CACHE_DIR))
+    parser.add_argument("--backends", nargs="+", default=list(BatchedEmbeddings.BACKENDS))
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads (0 = runtime default).")
+    parser.add_argument("--quantization", default="avx512_vnni")
+    parser.add_argument("--onnx-dir", default=None, help="Where exported ONNX models go (default: temp dir).")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--min-recall",
+        type=float,
+        default=None,
+        help="Exit non-zero if any backend's recall@k against fp32 falls below this.",
+    )
+    args = parser.parse_args()
+
+    df = pd.read_csv(PROCESSED_CSV_PATH)
+    documents = df["combined_info"].astype(str).tolist()
+    # Realistic queries plus "like <title>" lookups, which depend on exact neighbours
+    titles = df["combined_info"].str.extract(r"Title: (.*?)Overview:")[0].dropna().tolist()
+    queries = (SAMPLE_QUERIES + [f"anime like {title}" for title in titles])[: args.queries]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = {
+            "model": args.model,
+            "cache_folder": args.cache_folder,
+            "threads": args.threads,
+            "onnx_dir": args.onnx_dir or str(Path(tmp) / "onnx"),
+            "quantization": args.quantization,
+        }
+
+        # fp32 reference index, encoded the way `build_and_save_vectorstore` does by default
+        reference = BatchedEmbeddings(model_name=args.model, cache_folder=args.cache_folder)
+        doc_vectors = np.asarray(reference.embed_documents(documents), dtype=np.float32)
+        del reference
+
+        ctx = multiprocessing.get_context("spawn")
+        results = []
+        for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+            result_queue = ctx.Queue()
+            process = ctx.Process(target=_measure, args=(backend, settings, queries, result_queue))
+            process.start()
+            results.append(result_queue.get())
+            process.join()
+
+    fp32_queries = np.asarray(results[0]["vectors"], dtype=np.float32)
+    fp32_top = _top_k(fp32_queries, doc_vectors, args.k)
+    failed = []
+    for result in results:
+        vectors = np.asarray(result.pop("vectors"), dtype=np.float32)
+        top = _top_k(vectors, doc_vectors, args.k)
+        overlap = [len(set(a) & set(b)) / args.k for a, b in zip(top, fp32_top)]
+        result[f"recall_at_{args.k}_vs_fp32"] = round(float(np.mean(overlap)), 4)
+        result["mean_cosine_vs_fp32"] = round(float(np.mean(np.sum(vectors * fp32_queries, axis=1))), 5)
+        if args.min_recall is not None and result[f"recall_at_{args.k}_vs_fp32"] < args.min_recall:
+            failed.append(result["backend"])
+
+    print(json.dumps({
+        "model": args.model,
+        "documents": len(documents),
+        "queries": len(queries),
+        "k": args.k,
+        "threads": args.threads or "default",
+        "results": [r for r in results if r["backend"] in args.backends],
+    }, indent=2))
+
+    if failed:
+        print(f"Recall parity below {args.min_recall}: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_llm_gateway.py
+"""
+Load test of the LLM gateway against a local mock Groq server (real ChatGroq client
+and HTTP stack, mock upstream with its own rate limit).
+
+Many concurrent users send a skewed mix of popular queries. Compares:
+
+  - direct:  ChatGroq with its built-in retries, no coalescing or pacing (the old path),
+  - gateway: coalescing of identical in-flight prompts, a token bucket matched to the
+             upstream limit, retries with backoff and the shared connection pool.
+
+Each mode runs twice: against an upstream limited to `--upstream-rps` (pacing and
+retries at work) and against an unlimited one (coalescing alone). Reports upstream
+calls, upstream 429s, the success rate and latency p50/p95/p99 over all requests
+(failures included, timed until they failed) and over successful requests only.
+
+    python -m benchmarks.bench_llm_gateway --requests 200 --concurrency 32 --upstream-rps 10
+"""
+import json
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from langchain_groq import ChatGroq
+
+from benchmarks.bench_batch_recommend import SAMPLE_QUERIES
+from benchmarks.common import latency_summary
+from benchmarks.mock_groq import MockGroqServer
+from src.stubs import make_embeddings
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.llm_gateway import LLMGateway, shared_http_clients
+from src.vector_store import VectorStoreBuilder
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSED_CSV_PATH = PROJECT_ROOT / "data" / "anime_updated.csv"
+
+
+def workload(requests: int, distinct: int, seed: int = 0) -> List[str]:
+    """Zipf-like mix: query i is drawn with weight 1 / (i + 1)."""
+    rng = random.Random(seed)
+    queries = SAMPLE_QUERIES[:distinct]
+    weights = [1 / (i + 1) for i in range(len(queries))]
+    return rng.choices(queries, weights=weights, k=requests)
+
+
+def run(
+    mode: str, server: MockGroqServer, upstream_rps: float, persist_dir: str, embedding, queries: List[str], args
+) -> Dict:
+    if mode == "direct":
+        llm = ChatGroq(api_key="mock", model="mock", base_url=server.base_url, temperature=0.0)
+        gateway = LLMGateway(coalesce=False, rate=0, max_retries=0)
+    else:
+        http_client, http_async_client = shared_http_clients()
+        llm = ChatGroq(
+            api_key="mock",
+            model="mock",
+            base_url=server.base_url,
+            temperature=0.0,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=0,
+        )
+        gateway = LLMGateway(coalesce=True, rate=upstream_rps, burst=args.upstream_burst)
+
+    pipeline = AnimeRecommendationPipeline(
+        csv_path=str(PROCESSED_CSV_PATH),
+        persist_dir=persist_dir,
+        use_query_cache=False,
+        use_answer_cache=False,  # measure coalescing of in-flight calls, not the answer cache
+        llm=llm,
+        embedding=embedding,
+        llm_gateway=gateway,
+    )
+    before = server.stats()
+
+    def one(query: str):
+        start = time.perf_counter()
+        try:
+            pipeline.recommend(query)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, type(e.__cause__ or e).__name__
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, queries))
+    wall = time.perf_counter() - start
+
+    after = server.stats()
+    ok = [seconds for seconds, error in results if error is None]
+    return {
+        "mode": mode,
+        "upstream_rps": upstream_rps,
+        "requests": len(queries),
+        "failed": len(results) - len(ok),
+        "success_rate": round(len(ok) / len(results), 4),
+        "upstream_calls": after["calls"] - before["calls"],
+        "upstream_429s": after["rate_limited"] - before["rate_limited"],
+        "wall_s": round(wall, 2),
+        # Failed requests are fast; successful-only latency alone flatters a failing mode
+        "latency_all": latency_summary([seconds for seconds, _ in results]),
+        "latency_ok": latency_summary(ok),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent users.")
+    parser.add_argument("--distinct-queries", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Mock upstream latency in seconds.")
+    parser.add_argument(
+        "--upstream-rps", type=float, default=10, help="Mock upstream rate limit (an unlimited run is always added)."
+    )
+    parser.add_argument("--upstream-burst", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = workload(args.requests, args.distinct_queries)
+    embedding = make_embeddings()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        persist_dir = str(Path(tmp) / "chroma_db")
+        VectorStoreBuilder(str(PROCESSED_CSV_PATH), persist_dir=persist_dir, embedding=embedding).build_and_save_vectorstore()
+        for upstream_rps in dict.fromkeys((args.upstream_rps, 0.0)):
+            for mode in ("direct", "gateway"):
+                # Fresh upstream (and rate-limit bucket) per run
+                with MockGroqServer(latency=args.llm_latency, rps=upstream_rps, burst=args.upstream_burst) as server:
+                    results.append(run(mode, server, upstream_rps, persist_dir, embedding, queries, args))
+
+    print(json.dumps({
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "distinct_queries": args.distinct_queries,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_numpy_index.py
+"""
+Compares top-k latency and memory of the Chroma backend against the in-process
+NumPy index (float32, float16 and int8, the compact ones with and without float32
+re-ranking) on the same embeddings, plus each variant's recall@k against exact
+float32 search. Each backend is measured in a fresh process so RSS numbers are not
+polluted by the others.
+
+    python -m benchmarks.bench_numpy_index --queries 200
+"""
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import latency_summary, rss_mb
+from src.stubs import make_embeddings
+from src.numpy_index import NumpyVectorIndex
+from src.vector_store import VectorStoreBuilder
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROCESSED_CSV_PATH = PROJECT_ROOT / "data" / "anime_updated.csv"
+
+
+def _measure(backend: str, location: str, queries: np.ndarray, k: int, result_queue) -> None:
+    baseline = rss_mb()
+    start = time.perf_counter()
+    if backend == "chroma":
+        import chromadb
+
+        collection = chromadb.PersistentClient(path=location).get_collection("anime")
+
+        def search(vector):
+            return collection.query(query_embeddings=[vector.tolist()], n_results=k)
+    else:
+        index = NumpyVectorIndex.load(location)
+
+        def search(vector):
+            return index.search(vector, k)
+
+    search(queries[0])  # first query pays for lazy loading; report it separately
+    load_s = time.perf_counter() - start
+
+    samples = []
+    results = []
+    for vector in queries:
+        t = time.perf_counter()
+        results.append(search(vector))
+        samples.append(time.perf_counter() - t)
+
+    rows = None if backend == "chroma" else [[row for row, _ in hits] for hits in results]
+    result_queue.put({
+        "backend": backend,
+        "rows": rows,
+        "load_and_first_query_s": round(load_s, 3),
+        "rss_delta_mb": round(rss_mb() - baseline, 1),
+        **latency_summary(samples),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--embedding-model", default=None, help="Small local model; default fake vectors.")
+    args = parser.parse_args()
+
+    embedding = make_embeddings(args.embedding_model)
+    with tempfile.TemporaryDirectory() as tmp:
+        persist_dir = str(Path(tmp) / "chroma_db")
+        builder = VectorStoreBuilder(str(PROCESSED_CSV_PATH), persist_dir=persist_dir, embedding=embedding)
+        builder.build_and_save_vectorstore()
+        index = builder.export_numpy_index(str(Path(tmp) / "np32"), dtype="float32")
+        variants = [("numpy-float32", "np32")]
+        for dtype in ("float16", "int8"):
+            index.save(str(Path(tmp) / f"{dtype}-rerank"), dtype=dtype)
+            index.save(str(Path(tmp) / dtype), dtype=dtype, rerank=False)
+            variants += [(f"numpy-{dtype}-rerank", f"{dtype}-rerank"), (f"numpy-{dtype}", dtype)]
+
+        # Query vectors are precomputed so only the index lookup is timed
+        rng = np.random.default_rng(0)
+        picks = rng.integers(0, len(index), size=args.queries)
+        queries = np.asarray(index.vectors, dtype=np.float32)[picks]
+        queries += rng.normal(scale=0.01, size=queries.shape).astype(np.float32)
+
+        ctx = multiprocessing.get_context("spawn")
+        results = []
+        locations = [("chroma", persist_dir)] + [(name, str(Path(tmp) / sub)) for name, sub in variants]
+        for backend, location in locations:
+            result_queue = ctx.Queue()
+            process = ctx.Process(target=_measure, args=(backend, location, queries, args.k, result_queue))
+            process.start()
+            results.append(result_queue.get())
+            process.join()
+
+    # Recall@k of each NumPy variant against exact float32 search
+    reference = next(result["rows"] for result in results if result["backend"] == "numpy-float32")
+    for result in results:
+        rows = result.pop("rows")
+        if rows is not None:
+            result[f"recall_at_{args.k}"] = round(
+                float(np.mean([len(set(got) & set(want)) / len(want) for got, want in zip(rows, reference)])), 4
+            )
+
+    print(json.dumps({"vectors": len(index), "k": args.k, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
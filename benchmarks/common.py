@@ -0,0 +1,32 @@
+# benchmarks/common.py
+"""Small measurement helpers shared by the benchmark scripts."""
+import resource
+from typing import Dict, List
+
+import numpy as np
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency_summary(samples_s: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean of latency samples, in milliseconds."""
+    if not samples_s:
+        return {}
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "n": len(samples_s),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
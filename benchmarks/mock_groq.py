@@ -0,0 +1,161 @@
+# benchmarks/mock_groq.py
+"""
+Local stand-in for the Groq chat completions API (OpenAI-compatible), for load tests
+that exercise the real ChatGroq client and HTTP stack without a key or network.
+
+It answers like `StubChatModel` after `latency` seconds, enforces its own upstream
+rate limit (429 + Retry-After beyond `rps`), and counts what it served:
+
+    with MockGroqServer(latency=0.3, rps=20) as server:
+        llm = ChatGroq(api_key="mock", model="mock", base_url=server.base_url)
+        ...
+        print(server.stats())   # {"calls": ..., "rate_limited": ...}
+
+    python -m benchmarks.mock_groq --port 8765     # standalone
+"""
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain_core.messages import HumanMessage
+
+from src.stubs import StubChatModel
+from src.llm_gateway import TokenBucket
+
+
+def create_mock_groq_app(latency: float = 0.3, rps: float = 0.0, burst: int = 5) -> FastAPI:
+    """
+    :param latency: Seconds before each (accepted) answer.
+    :param rps:     Accepted requests per second before answering 429 (0 = unlimited).
+    :param burst:   Bucket size of that limit.
+    """
+    app = FastAPI(title="Mock Groq")
+    bucket = TokenBucket(rps, burst)
+    counts = {"calls": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def completion(body: Dict[str, Any]) -> str:
+        messages: List[Dict[str, Any]] = body.get("messages", [])
+        return StubChatModel._answer([HumanMessage(content=str(m.get("content", ""))) for m in messages])
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        allowed, retry_in = bucket.try_acquire()
+        if not allowed:
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"retry-after": f"{retry_in:.3f}"},
+            )
+
+        counts["calls"] += 1
+        counts["in_flight"] += 1
+        counts["max_in_flight"] = max(counts["max_in_flight"], counts["in_flight"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            counts["in_flight"] -= 1
+
+        text = completion(body)
+        created = int(time.time())
+        model = body.get("model", "mock")
+        usage = {"prompt_tokens": 100, "completion_tokens": len(text.split()), "total_tokens": 100 + len(text.split())}
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                ],
+                "usage": usage,
+            }
+
+        def events():
+            for token in text.split(" "):
+                chunk = {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, int]:
+        return dict(counts)
+
+    @app.post("/reset")
+    async def reset() -> Dict[str, int]:
+        counts.update(calls=0, rate_limited=0, max_in_flight=0)
+        return dict(counts)
+
+    app.state.counts = counts
+    return app
+
+
+class MockGroqServer:
+    """Runs the mock API on a free local port in a background thread (context manager)."""
+
+    def __init__(self, latency: float = 0.3, rps: float = 0.0, burst: int = 5, port: int = 0):
+        self.app = create_mock_groq_app(latency, rps, burst)
+        if not port:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="mock-groq", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.app.state.counts)
+
+    def __enter__(self) -> "MockGroqServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a mock Groq chat completions API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--rps", type=float, default=0.0, help="Upstream rate limit (0 = unlimited).")
+    parser.add_argument("--burst", type=int, default=5)
+    args = parser.parse_args()
+    uvicorn.run(create_mock_groq_app(args.latency, args.rps, args.burst), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
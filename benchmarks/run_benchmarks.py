@@ -0,0 +1,234 @@
+# benchmarks/run_benchmarks.py
+"""
+End-to-end benchmark of the build and query hot paths, run offline with a stub LLM
+in place of ChatGroq.
+
+Measures `AnimeDataLoader.load_and_process`, `build_and_save_vectorstore`, retriever
+latency and full `recommend` latency (p50/p95/p99), and writes the results as JSON.
+Settings that change performance (CHUNK_SIZE, CHUNK_OVERLAP, RETRIEVER_K, the
+embedding model) are env-driven in config.py and recorded with every run.
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --query-log requests.jsonl --compare bench.json
+    CHUNK_SIZE=500 RETRIEVER_K=8 python -m benchmarks.run_benchmarks --compare bench.json
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import latency_summary, rss_mb
+from src.stubs import StubChatModel, make_embeddings
+from benchmarks.bench_batch_recommend import SAMPLE_QUERIES
+from config.config import CHUNK_OVERLAP, CHUNK_SIZE, HUGGINGFACE_MODEL_NAME, RETRIEVER_K
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.data_loader import AnimeDataLoader
+from src.vector_store import VectorStoreBuilder
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+RAW_CSV_PATH = PROJECT_ROOT / "data" / "anime_with_synopsis.csv"
+
+# Fields tried, in order, for the query text of a JSON query-log line
+QUERY_LOG_FIELDS = ("query", "question", "title", "body")
+
+
+def load_query_log(path: str, limit: Optional[int] = None) -> List[str]:
+    """
+    Queries from a log file: JSON lines (first of `QUERY_LOG_FIELDS` present, e.g.
+    requests.jsonl) or plain text with one query per line.
+    """
+    queries: List[str] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = line
+            if isinstance(record, dict):
+                record = next((record[field] for field in QUERY_LOG_FIELDS if record.get(field)), None)
+            if isinstance(record, str) and record.strip():
+                queries.append(record.strip())
+            if limit is not None and len(queries) >= limit:
+                break
+    return queries
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def timed(fn) -> Dict[str, Any]:
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    result = fn()
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+        "result": result,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.query_log:
+        queries = load_query_log(args.query_log, limit=args.max_queries)
+    else:
+        queries = SAMPLE_QUERIES[: args.max_queries]
+    if not queries:
+        raise SystemExit("No queries to replay.")
+
+    embedding = make_embeddings(args.embedding_model)
+    results: Dict[str, Any] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processed_csv = Path(tmp) / "anime_updated.csv"
+        persist_dir = str(Path(tmp) / "chroma_db")
+
+        loader = AnimeDataLoader(str(args.raw_csv), str(processed_csv))
+        load = timed(loader.load_and_process)
+        results["load_and_process"] = {"seconds": load["seconds"], "rss_delta_mb": load["rss_delta_mb"]}
+
+        builder = VectorStoreBuilder(str(processed_csv), persist_dir=persist_dir, embedding=embedding)
+        build = timed(builder.build_and_save_vectorstore)
+        results["build_vectorstore"] = {
+            "seconds": build["seconds"],
+            "rss_delta_mb": build["rss_delta_mb"],
+            "chunks": len((builder.read_manifest() or {}).get("chunks", {})),
+        }
+
+        numpy_index_dir = str(Path(tmp) / "numpy_index")
+        if args.backend == "numpy":
+            builder.export_numpy_index(numpy_index_dir)
+
+        pipeline = AnimeRecommendationPipeline(
+            csv_path=str(processed_csv),
+            persist_dir=persist_dir,
+            use_query_cache=False,
+            use_answer_cache=False,
+            llm=StubChatModel(latency=args.llm_latency, token_latency=0.0),
+            embedding=embedding,
+            retriever_backend=args.backend,
+            numpy_index_dir=numpy_index_dir,
+        )
+        results["startup"] = pipeline.startup_timings
+
+        for query in queries[: args.warmup]:
+            pipeline.retriever.invoke(query)
+
+        retrieval: List[float] = []
+        recommend: List[float] = []
+        for _ in range(args.repeat):
+            for query in queries:
+                start = time.perf_counter()
+                pipeline.retriever.invoke(query)
+                retrieval.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                pipeline.recommend(query)
+                recommend.append(time.perf_counter() - start)
+
+        results["retrieval"] = latency_summary(retrieval)
+        results["recommend"] = latency_summary(recommend)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "queries": len(queries),
+            "query_log": args.query_log,
+            "repeat": args.repeat,
+            "backend": args.backend,
+            "embedding_model": args.embedding_model or "fake",
+            "configured_embedding_model": HUGGINGFACE_MODEL_NAME,
+            "llm_latency_s": args.llm_latency,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "retriever_k": RETRIEVER_K,
+        },
+        "results": results,
+    }
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """{"retrieval": {"p50_ms": 1.2}} -> {"retrieval.p50_ms": 1.2} (numeric leaves only)."""
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Prints a metric-by-metric comparison and returns the timing metrics (seconds / *_ms)
+    that got slower than the baseline by more than `threshold` (a fraction).
+    """
+    now, before = flatten(current["results"]), flatten(baseline["results"])
+    regressions: List[str] = []
+    print(f"{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name in sorted(now.keys() & before.keys()):
+        old, new = before[name], now[name]
+        change = (new - old) / old if old else 0.0
+        print(f"{name:<36}{old:>12.3f}{new:>12.3f}{change:>+10.1%}")
+        is_timing = name.endswith("seconds") or name.endswith("_ms")
+        if is_timing and change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--raw-csv", default=str(RAW_CSV_PATH))
+    parser.add_argument("--query-log", default=None, help="JSONL or text file of queries to replay.")
+    parser.add_argument("--max-queries", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the query set.")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed queries before measuring.")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM delay in seconds.")
+    parser.add_argument("--embedding-model", default=None, help="Small local model; default fake vectors.")
+    parser.add_argument("--output", default=None, help="Write results JSON here (default: stdout).")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="With --compare, exit non-zero if a timing is this much slower (0.2 = 20%%).",
+    )
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,38 @@ load_dotenv()
 # --- Project Root ---
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
+# --- Data ---
+# Raw dataset every build starts from, and the processed CSV written from it
+RAW_CSV_PATH = Path(os.getenv("RAW_CSV_PATH", PROJECT_ROOT / "data" / "anime_with_synopsis.csv"))
+PROCESSED_CSV_PATH = Path(os.getenv("PROCESSED_CSV_PATH", PROJECT_ROOT / "data" / "anime_updated.csv"))
+
 # --- Groq API ---
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL_NAME = os.getenv("GROQ_MODEL_NAME", "llama-3.1-8B-instant")
+# Override the API endpoint (e.g. a local mock server for load tests); empty = Groq
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+# --- LLM Client Config ---
+# Shared keep-alive HTTP connection pool used by every ChatGroq client in the process
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+LLM_HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_HTTP_KEEPALIVE_CONNECTIONS", "16"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+# Concurrent identical (question, context) requests share one upstream call
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+# Upstream token bucket: requests per second (0 = unlimited) and burst size
+LLM_RATE_LIMIT_RPS = float(os.getenv("LLM_RATE_LIMIT_RPS", "0"))
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "5"))
+# Retries of 429/5xx/connection errors with exponential backoff (honours Retry-After)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+# Per-user request limit in the apps (0 = unlimited)
+USER_RATE_LIMIT_PER_MINUTE = float(os.getenv("USER_RATE_LIMIT_PER_MINUTE", "0"))
+USER_RATE_LIMIT_BURST = int(os.getenv("USER_RATE_LIMIT_BURST", "5"))
+# Header naming the user for the HTTP server's per-user limit; unset = client address.
+# Only set it behind a trusted proxy that sets the header itself and strips it from
+# inbound traffic, otherwise clients choose their own key and evade the limit.
+USER_ID_HEADER = os.getenv("USER_ID_HEADER", "")
 
 # --- HuggingFace Model Config ---
 HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
@@ -17,3 +46,128 @@ HUGGINGFACE_MODEL_NAME = os.getenv("HUGGINGFACE_MODEL_NAME", "intfloat/e5-large-
 
 # This ensures the models folder is ALWAYS at repo root
 HUGGINGFACE_MODEL_CACHE_DIR = PROJECT_ROOT / "models" / "e5-large-v2"
+
+# --- Embedding Engine Config ---
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# 0/1 = encode in-process; >1 = sentence-transformers multi-process pool on CPU
+EMBEDDING_NUM_WORKERS = int(os.getenv("EMBEDDING_NUM_WORKERS", "0"))
+# "torch" (fp32 PyTorch) | "onnx" (fp32 ONNX Runtime) | "onnx-int8" (dynamically quantized)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# CPU inference threads; 0 = runtime default
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+# Exported ONNX models (fp32 and int8) are saved here once and reused; one directory per model
+EMBEDDING_ONNX_DIR = Path(
+    os.getenv("EMBEDDING_ONNX_DIR", PROJECT_ROOT / "models" / f"{HUGGINGFACE_MODEL_NAME.rstrip('/').split('/')[-1]}-onnx")
+)
+# int8 dynamic quantization preset: "arm64" | "avx2" | "avx512" | "avx512_vnni"
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "avx512_vnni")
+# Chunks embedded + upserted per batch while building; bounds peak build memory
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "2048"))
+# Raw CSV rows read per pandas chunk in streaming ingestion
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "5000"))
+# Split, embed and upsert in concurrent threads during a build (false = one stage at a time)
+INGEST_PARALLEL = os.getenv("INGEST_PARALLEL", "true").lower() == "true"
+# Batches buffered between build stages
+INGEST_QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", "4"))
+
+# --- Retriever Config ---
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+# "chroma" | "numpy" (exact in-process index exported from the Chroma store)
+# | "bundle" (validated, versioned index bundle; see INDEX_BUNDLE_*)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma")
+NUMPY_INDEX_DIR = Path(os.getenv("NUMPY_INDEX_DIR", PROJECT_ROOT / "numpy_index"))
+# "float32" | "float16" | "int8" (per-vector scale) storage of the exported matrix
+NUMPY_INDEX_DTYPE = os.getenv("NUMPY_INDEX_DTYPE", "float32")
+# float16/int8: keep a memory-mapped float32 copy and re-score this many first-pass candidates
+NUMPY_INDEX_RERANK = os.getenv("NUMPY_INDEX_RERANK", "true").lower() == "true"
+NUMPY_INDEX_RERANK_CANDIDATES = int(os.getenv("NUMPY_INDEX_RERANK_CANDIDATES", "100"))
+# Hybrid retrieval: BM25 + vector results fused with reciprocal rank fusion, one chunk per title
+RETRIEVER_HYBRID = os.getenv("RETRIEVER_HYBRID", "false").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# --- Index Bundle Config ---
+# Versioned, checksummed index bundles (<dir>/<version>/, newest named in <dir>/LATEST),
+# written by run_build_pipeline and memory-mapped by the "bundle" retriever backend
+# Bundles record the hash of RAW_CSV_PATH (the one input of both regular and streaming
+# builds) and the "bundle" backend refuses a bundle whose source does not match it
+INDEX_BUNDLE_DIR = Path(os.getenv("INDEX_BUNDLE_DIR", PROJECT_ROOT / "index_bundle"))
+INDEX_BUNDLE_EXPORT = os.getenv("INDEX_BUNDLE_EXPORT", "true").lower() == "true"
+INDEX_BUNDLE_KEEP = int(os.getenv("INDEX_BUNDLE_KEEP", "2"))
+# Also verify SHA-256 checksums at startup (reads every bundle file once per process);
+# file sizes are always checked. Off by default: the Docker image build verifies them once
+INDEX_BUNDLE_VERIFY_CHECKSUMS = os.getenv("INDEX_BUNDLE_VERIFY_CHECKSUMS", "false").lower() == "true"
+
+# --- Neighbour Table Config ---
+# Precomputed "more like this" table (top-N similar anime per MAL_ID), built by run_build_pipeline
+NEIGHBOURS_PATH = Path(os.getenv("NEIGHBOURS_PATH", PROJECT_ROOT / "neighbours.npz"))
+NEIGHBOURS_TOP_N = int(os.getenv("NEIGHBOURS_TOP_N", "20"))
+
+# --- Text Splitter Config ---
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+
+# --- Context Assembly Config ---
+# Dedupe retrieved chunks per title and trim them to a token budget before the LLM call
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION_ENABLED", "true").lower() == "true"
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1200"))
+CONTEXT_MAX_TOKENS_PER_TITLE = int(os.getenv("CONTEXT_MAX_TOKENS_PER_TITLE", "300"))
+# tiktoken encoding used to measure the budget
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+
+# LLM-free fast path (recommend(mode="fast")): chunks retrieved to find three distinct titles
+FAST_PATH_CANDIDATES = int(os.getenv("FAST_PATH_CANDIDATES", "12"))
+
+# --- Query Cache Config ---
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "86400"))
+# Empty = in-memory only; set a path to share an on-disk SQLite tier across processes
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "")
+# On-disk rows of other namespaces (index versions) are deleted once no process has
+# used them for this long, so processes on different versions can share the file
+QUERY_CACHE_NAMESPACE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_NAMESPACE_TTL_SECONDS", "3600"))
+
+# --- Answer Cache Config ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+# Cosine similarity above which a cached answer for the same documents is reused
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# --- Retrieval Evaluation Config (pipeline/eval_pipeline.py) ---
+# Checked-in queries with the MAL_IDs they should retrieve
+GOLDEN_QUERIES_PATH = Path(os.getenv("GOLDEN_QUERIES_PATH", PROJECT_ROOT / "data" / "golden_queries.jsonl"))
+# Distinct titles scored per query (recall@k, nDCG@k)
+EVAL_K = int(os.getenv("EVAL_K", "5"))
+# Report of a reference run on the real store (record one with
+# `python -m pipeline.eval_pipeline --output data/eval_baseline.json`); when it exists,
+# every evaluation is compared against it. None is checked in yet.
+EVAL_BASELINE_PATH = Path(os.getenv("EVAL_BASELINE_PATH", PROJECT_ROOT / "data" / "eval_baseline.json"))
+# Absolute floors; the evaluation fails below them. 0 = off: set them from a recorded
+# baseline (e.g. its recall_at_k minus a margin), not from guesses.
+EVAL_MIN_RECALL = float(os.getenv("EVAL_MIN_RECALL", "0"))
+EVAL_MIN_MRR = float(os.getenv("EVAL_MIN_MRR", "0"))
+EVAL_MIN_NDCG = float(os.getenv("EVAL_MIN_NDCG", "0"))
+# Retrieval latency ceiling (p95 over the golden queries, ms); 0 = off
+EVAL_MAX_P95_MS = float(os.getenv("EVAL_MAX_P95_MS", "0"))
+# Against a baseline report: largest allowed quality drop (absolute) and p95 slowdown (fraction)
+EVAL_MAX_QUALITY_DROP = float(os.getenv("EVAL_MAX_QUALITY_DROP", "0.02"))
+EVAL_MAX_LATENCY_INCREASE = float(os.getenv("EVAL_MAX_LATENCY_INCREASE", "0.25"))
+
+# --- Startup Config ---
+# "eager" | "background" | "lazy" (see AnimeRecommendationPipeline)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+
+# --- HTTP Server Config (app/server.py) ---
+# Requests executing at once; further requests queue up to SERVER_MAX_QUEUE, then get 429
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "16"))
+SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "64"))
+# Micro-batching: wait up to this long to group queries into one embedding/search call
+SERVER_BATCH_WAIT_MS = float(os.getenv("SERVER_BATCH_WAIT_MS", "10"))
+SERVER_MAX_BATCH_SIZE = int(os.getenv("SERVER_MAX_BATCH_SIZE", "16"))
+SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "60"))
+
+# --- Metrics Config ---
+# Per-stage timings + counters, served in Prometheus text format on METRICS_PORT
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
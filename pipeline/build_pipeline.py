@@ -1,30 +1,60 @@
 # build_pipeline.py
 
 import sys
+import json
+import argparse
 from pathlib import Path
 
 from src.data_loader import AnimeDataLoader
 from src.vector_store import VectorStoreBuilder
+from config.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_NUM_WORKERS,
+    INGEST_BATCH_SIZE,
+    INGEST_PARALLEL,
+    INGEST_QUEUE_BATCHES,
+    CSV_CHUNK_ROWS,
+    NUMPY_INDEX_DIR,
+    NUMPY_INDEX_DTYPE,
+    NUMPY_INDEX_RERANK,
+    NEIGHBOURS_PATH,
+    NEIGHBOURS_TOP_N,
+    INDEX_BUNDLE_DIR,
+    INDEX_BUNDLE_EXPORT,
+    RAW_CSV_PATH,
+    PROCESSED_CSV_PATH,
+)
 from utils.logger import get_logger
 from utils.custom_exception import CustomException
 
 logger = get_logger(__name__)
 
-# Resolve project root = one level up from this file (pipeline/)
-PROJECT_ROOT = Path(__file__).resolve().parents[1]
-
-RAW_CSV_PATH = PROJECT_ROOT / "data" / "anime_with_synopsis.csv"
-PROCESSED_CSV_PATH = PROJECT_ROOT / "data" / "anime_updated.csv"
 
 
 def run_build_pipeline(
     raw_csv: Path = RAW_CSV_PATH,
     processed_csv: Path = PROCESSED_CSV_PATH,
+    incremental: bool = False,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    num_workers: int = EMBEDDING_NUM_WORKERS,
+    export_numpy_index: bool = False,
+    streaming: bool = False,
+    chunksize: int = CSV_CHUNK_ROWS,
+    ingest_batch_size: int = INGEST_BATCH_SIZE,
+    build_neighbours: bool = True,
+    parallel: bool = INGEST_PARALLEL,
+    queue_batches: int = INGEST_QUEUE_BATCHES,
+    resume: bool = True,
+    export_bundle: bool = INDEX_BUNDLE_EXPORT,
 ) -> None:
     try:
         logger.info("Starting anime build pipeline.")
         logger.info("Raw CSV: %s", raw_csv)
         logger.info("Processed CSV: %s", processed_csv)
+        logger.info("Incremental: %s", incremental)
+        logger.info("Embedding batch_size=%s, num_workers=%s", batch_size, num_workers)
+        logger.info("Streaming: %s (chunksize=%s, ingest_batch_size=%s)", streaming, chunksize, ingest_batch_size)
+        logger.info("Parallel stages: %s (queue_batches=%s, resume=%s)", parallel, queue_batches, resume)
 
         processed_csv.parent.mkdir(parents=True, exist_ok=True)
 
@@ -32,13 +62,51 @@ def run_build_pipeline(
             original_csv=str(raw_csv),
             processed_csv=str(processed_csv),
         )
-        processed_csv_path = loader.load_and_process()
-        logger.info("Data loaded and processed successfully: %s", processed_csv_path)
-
-        vector_store_builder = VectorStoreBuilder(csv_path=processed_csv_path)
-        vector_store_builder.build_and_save_vectorstore()
+        documents = None
+        if streaming:
+            # Raw rows flow straight into the vector store; no processed CSV is written
+            documents = loader.iter_documents(chunksize=chunksize)
+        else:
+            loader.load_and_process()
+            logger.info("Data loaded and processed successfully: %s", processed_csv)
+
+        vector_store_builder = VectorStoreBuilder(
+            csv_path=str(processed_csv),
+            batch_size=batch_size,
+            num_workers=num_workers,
+            ingest_batch_size=ingest_batch_size,
+        )
+        vector_store_builder.build_and_save_vectorstore(
+            incremental=incremental,
+            documents=documents,
+            parallel=parallel,
+            queue_batches=queue_batches,
+            resume=resume,
+        )
         logger.info("Vector store built and saved successfully.")
 
+        if export_numpy_index:
+            vector_store_builder.export_numpy_index(
+                str(NUMPY_INDEX_DIR), dtype=NUMPY_INDEX_DTYPE, rerank=NUMPY_INDEX_RERANK
+            )
+            logger.info("NumPy vector index exported to %s", NUMPY_INDEX_DIR)
+
+        if build_neighbours:
+            vector_store_builder.export_neighbour_table(str(NEIGHBOURS_PATH), top_n=NEIGHBOURS_TOP_N)
+            logger.info("Neighbour table saved to %s", NEIGHBOURS_PATH)
+
+        if export_bundle:
+            bundle_dir = vector_store_builder.export_index_bundle(
+                str(INDEX_BUNDLE_DIR),
+                dtype=NUMPY_INDEX_DTYPE,
+                rerank=NUMPY_INDEX_RERANK,
+                # The raw CSV is the input of regular and streaming builds alike (the
+                # latter never write the processed CSV), so it is what bundles record
+                source_path=str(raw_csv),
+                neighbours_path=str(NEIGHBOURS_PATH) if build_neighbours else None,
+            )
+            logger.info("Index bundle written to %s", bundle_dir)
+
         logger.info("Anime build pipeline completed successfully.")
 
     except Exception as e:
@@ -46,8 +114,109 @@ def run_build_pipeline(
         raise CustomException("Build pipeline failed", sys) from e
 
 
+def run_compaction(processed_csv: Path = PROCESSED_CSV_PATH) -> dict:
+    """Deduplicates and compacts the persisted vector store; returns the size report."""
+    try:
+        report = VectorStoreBuilder(csv_path=str(processed_csv)).compact_vectorstore()
+        logger.info("Vector store compacted: %s", report)
+        return report
+    except Exception as e:
+        logger.error("An error occurred while compacting the vector store.", exc_info=True)
+        raise CustomException("Vector store compaction failed", sys) from e
+
+
 def main() -> None:
-    run_build_pipeline()
+    parser = argparse.ArgumentParser(description="Build the anime Chroma vector store.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only embed new or changed chunks (uses the manifest next to chroma_db/).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EMBEDDING_BATCH_SIZE,
+        help="Texts per embedding forward pass.",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=EMBEDDING_NUM_WORKERS,
+        help="Embedding worker processes (0/1 = in-process).",
+    )
+    parser.add_argument(
+        "--export-numpy-index",
+        action="store_true",
+        help="Also export the in-process NumPy index (NUMPY_INDEX_DIR, NUMPY_INDEX_DTYPE, NUMPY_INDEX_RERANK).",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream the raw CSV in chunks straight into the vector store (no processed CSV).",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=CSV_CHUNK_ROWS,
+        help="Raw CSV rows per chunk when streaming.",
+    )
+    parser.add_argument(
+        "--ingest-batch-size",
+        type=int,
+        default=INGEST_BATCH_SIZE,
+        help="Chunks embedded and upserted per batch.",
+    )
+    parser.add_argument(
+        "--skip-neighbours",
+        action="store_true",
+        help="Do not precompute the similar-anime table (NEIGHBOURS_PATH).",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Split, embed and upsert one batch at a time instead of in concurrent stages.",
+    )
+    parser.add_argument(
+        "--queue-batches",
+        type=int,
+        default=INGEST_QUEUE_BATCHES,
+        help="Batches buffered between the split, embed and upsert stages.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint of an interrupted build instead of resuming it.",
+    )
+    parser.add_argument(
+        "--skip-bundle",
+        action="store_true",
+        help="Do not write the versioned index bundle (INDEX_BUNDLE_DIR).",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Only compact the existing vector store (dedupe chunks, VACUUM) and report sizes.",
+    )
+    args = parser.parse_args()
+
+    if args.compact:
+        print(json.dumps(run_compaction(), indent=2))
+        return
+
+    run_build_pipeline(
+        incremental=args.incremental,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        export_numpy_index=args.export_numpy_index,
+        streaming=args.streaming,
+        chunksize=args.chunksize,
+        ingest_batch_size=args.ingest_batch_size,
+        build_neighbours=not args.skip_neighbours,
+        parallel=INGEST_PARALLEL and not args.sequential,
+        queue_batches=args.queue_batches,
+        resume=not args.restart,
+        export_bundle=INDEX_BUNDLE_EXPORT and not args.skip_bundle,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+# eval_pipeline.py
+
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.evaluation import check_thresholds, evaluate_retriever, load_golden_queries, read_report
+from config.config import (
+    HUGGINGFACE_MODEL_NAME,
+    EMBEDDING_BACKEND,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    RETRIEVER_BACKEND,
+    RETRIEVER_HYBRID,
+    NUMPY_INDEX_DIR,
+    NUMPY_INDEX_DTYPE,
+    INDEX_BUNDLE_DIR,
+    GOLDEN_QUERIES_PATH,
+    PROCESSED_CSV_PATH,
+    EVAL_BASELINE_PATH,
+    EVAL_K,
+    EVAL_MIN_RECALL,
+    EVAL_MIN_MRR,
+    EVAL_MIN_NDCG,
+    EVAL_MAX_P95_MS,
+    EVAL_MAX_QUALITY_DROP,
+    EVAL_MAX_LATENCY_INCREASE,
+)
+from utils.logger import get_logger
+from utils.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+
+def run_evaluation(
+    golden_path: Path = GOLDEN_QUERIES_PATH,
+    processed_csv: Path = PROCESSED_CSV_PATH,
+    persist_dir: str = "chroma_db",
+    k: int = EVAL_K,
+    retriever_backend: str = RETRIEVER_BACKEND,
+    hybrid: bool = RETRIEVER_HYBRID,
+    numpy_index_dir: str = str(NUMPY_INDEX_DIR),
+    index_bundle_dir: str = str(INDEX_BUNDLE_DIR),
+    baseline_path: Optional[str] = None,
+    embedding: Optional[Embeddings] = None,
+) -> Dict[str, Any]:
+    """
+    Scores the current vector store / retriever configuration on the golden query set
+    (recall@k, MRR, nDCG@k over distinct titles, per-query latency) and checks the
+    result against the EVAL_* thresholds and, optionally, a baseline report.
+
+    :param baseline_path: Report JSON of an earlier run to compare against.
+    :param embedding: Optional embeddings used instead of the configured model.
+    :return: Report with "meta", "summary", "checks", "gated" (False when no check is
+             configured, so "passed" means nothing), "passed" and per-query "queries".
+    """
+    try:
+        logger.info("Starting retrieval evaluation with golden set %s", golden_path)
+        queries = load_golden_queries(str(golden_path))
+        logger.info("Loaded %d golden queries.", len(queries))
+
+        pipeline = AnimeRecommendationPipeline(
+            csv_path=str(processed_csv),
+            persist_dir=persist_dir,
+            # Measure the retriever itself, not cache hits
+            use_query_cache=False,
+            use_answer_cache=False,
+            # Retrieval only: the LLM is never called, so no GROQ_API_KEY is needed
+            llm=FakeListChatModel(responses=[""]),
+            embedding=embedding,
+            startup="eager",
+            retriever_backend=retriever_backend,
+            numpy_index_dir=numpy_index_dir,
+            index_bundle_dir=index_bundle_dir,
+            hybrid=hybrid,
+        )
+        result = evaluate_retriever(pipeline.retriever, queries, k=k)
+
+        baseline = read_report(baseline_path) if baseline_path else None
+        checks = check_thresholds(
+            result["summary"],
+            min_quality={"recall_at_k": EVAL_MIN_RECALL, "mrr": EVAL_MIN_MRR, "ndcg_at_k": EVAL_MIN_NDCG},
+            max_p95_ms=EVAL_MAX_P95_MS,
+            baseline=baseline,
+            max_quality_drop=EVAL_MAX_QUALITY_DROP,
+            max_latency_increase=EVAL_MAX_LATENCY_INCREASE,
+        )
+        if not checks:
+            logger.warning(
+                "No evaluation gates are set (EVAL_MIN_* / EVAL_MAX_P95_MS are 0 and no baseline report "
+                "exists at %s); reporting metrics only.", EVAL_BASELINE_PATH,
+            )
+        passed = all(check["passed"] for check in checks)
+        logger.info("Retrieval evaluation %s: %s", "passed" if passed else "FAILED", result["summary"])
+
+        return {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "golden_queries": str(golden_path),
+                "queries": len(queries),
+                "k": k,
+                "embedding_model": HUGGINGFACE_MODEL_NAME if embedding is None else type(embedding).__name__,
+                "embedding_backend": EMBEDDING_BACKEND,
+                "chunk_size": CHUNK_SIZE,
+                "chunk_overlap": CHUNK_OVERLAP,
+                "retriever_backend": retriever_backend,
+                "numpy_index_dtype": NUMPY_INDEX_DTYPE if retriever_backend == "numpy" else None,
+                "hybrid": hybrid,
+                "index_version": pipeline.index_version(),
+                "baseline": baseline_path,
+            },
+            "summary": result["summary"],
+            "checks": checks,
+            "gated": bool(checks),
+            "passed": passed,
+            "queries": result["queries"],
+        }
+
+    except Exception as e:
+        logger.error("An error occurred in the retrieval evaluation.", exc_info=True)
+        raise CustomException("Retrieval evaluation failed", sys) from e
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Evaluate retrieval quality and latency on the golden query set."
+    )
+    parser.add_argument("--golden", default=str(GOLDEN_QUERIES_PATH), help="Golden queries (JSON lines).")
+    parser.add_argument("--persist-dir", default="chroma_db", help="Chroma DB to evaluate.")
+    parser.add_argument("--k", type=int, default=EVAL_K, help="Distinct titles scored per query.")
+    parser.add_argument("--backend", choices=["chroma", "numpy", "bundle"], default=RETRIEVER_BACKEND)
+    parser.add_argument(
+        "--hybrid",
+        action=argparse.BooleanOptionalAction,
+        default=RETRIEVER_HYBRID,
+        help="Evaluate the hybrid BM25 + vector retriever.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=str(EVAL_BASELINE_PATH) if EVAL_BASELINE_PATH.exists() else None,
+        help="Earlier report JSON; fail on regressions against it (default: EVAL_BASELINE_PATH, if present).",
+    )
+    parser.add_argument("--no-baseline", action="store_true", help="Do not compare against any baseline.")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help=f"Write the report JSON here; run on the real store with --output {EVAL_BASELINE_PATH} "
+             "to record the baseline.",
+    )
+    args = parser.parse_args()
+    if args.no_baseline:
+        args.baseline = None
+
+    report = run_evaluation(
+        golden_path=Path(args.golden),
+        persist_dir=args.persist_dir,
+        k=args.k,
+        retriever_backend=args.backend,
+        hybrid=args.hybrid,
+        baseline_path=args.baseline,
+    )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    print(json.dumps({"summary": report["summary"], "gated": report["gated"], "passed": report["passed"]}, indent=2))
+    if not report["gated"]:
+        print(
+            "No gate configured: EVAL_MIN_RECALL, EVAL_MIN_MRR, EVAL_MIN_NDCG and EVAL_MAX_P95_MS are 0 "
+            f"and no baseline report is used; metrics are reported only. Record a baseline on the "
+            f"real store with --output {EVAL_BASELINE_PATH}."
+        )
+    for check in report["checks"]:
+        status = "ok  " if check["passed"] else "FAIL"
+        print(f"{status} {check['check']:<40}{check['value']:>12}{check['limit']:>12}")
+    if not report["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,634 @@
 # pipeline.py
 import sys
-from typing import Tuple, List
+import time
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Tuple, List, Optional, Union
 
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 
-from src.vector_store import VectorStoreBuilder
-from src.recommender import AnimeRecommender
+from src.vector_store import VectorStoreBuilder, search_by_vectors
+from src.recommender import AnimeRecommender, create_llm
+from src.cache import QueryCache, CachedRetriever, AnswerCache
+from src.prompt_template import PROMPT_VERSION
+from src.context import ContextBuilder, TokenCounter
+from src.numpy_index import NumpyVectorIndex, NumpyRetriever
+from src.hybrid_retriever import HybridRetriever, documents_from_store
+from src.neighbours import NeighbourTable
+from src.index_bundle import NEIGHBOURS_FILE, load_index_bundle, resolve_bundle_dir
+from src.fast_path import fast_recommendation
+from src.llm_gateway import LLMGateway
+from src.filters import FiltersUnavailable, GenreIndex, RecommendationFilter
 from utils.logger import get_logger
+from utils import metrics
 from utils.custom_exception import CustomException
-from config.config import (GROQ_API_KEY, GROQ_MODEL_NAME)
+from config.config import (
+    GROQ_API_KEY,
+    GROQ_MODEL_NAME,
+    GROQ_BASE_URL,
+    HUGGINGFACE_MODEL_NAME,
+    EMBEDDING_BACKEND,
+    RETRIEVER_K,
+    RETRIEVER_BACKEND,
+    NUMPY_INDEX_DIR,
+    INDEX_BUNDLE_DIR,
+    INDEX_BUNDLE_VERIFY_CHECKSUMS,
+    RAW_CSV_PATH,
+    RETRIEVER_HYBRID,
+    HYBRID_CANDIDATES,
+    HYBRID_RRF_K,
+    NEIGHBOURS_PATH,
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_TTL_SECONDS,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_NAMESPACE_TTL_SECONDS,
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    STARTUP_MODE,
+    CONTEXT_COMPRESSION_ENABLED,
+    CONTEXT_MAX_TOKENS,
+    CONTEXT_MAX_TOKENS_PER_TITLE,
+    CONTEXT_TOKENIZER,
+    FAST_PATH_CANDIDATES,
+)
 
 logger = get_logger(__name__)
 
+# "llm": retrieve then generate; "fast": templated answer from the retrieved documents only
+RECOMMEND_MODES = ("llm", "fast")
+
 
 class AnimeRecommendationPipeline:
     """
     Orchestrates the full anime recommendation flow:
 
-    1. Loads (or builds) a Chroma vector store from a processed CSV.
-    2. Creates a retriever from that vector store.
+    1. Loads (or builds) a Chroma vector store from a processed CSV, or an exported
+       NumPy index when `retriever_backend="numpy"`, or a validated index bundle
+       (no Chroma, no re-embedding) when `retriever_backend="bundle"`.
+    2. Creates a retriever from that vector store (behind a query/retrieval cache).
     3. Wires the retriever into an AnimeRecommender (ChatGroq + custom prompt).
-    4. Exposes a simple `recommend(query)` method for external callers.
+    4. Exposes a simple `recommend(query)` method for external callers, plus
+       `arecommend(query)` and `recommend_batch(queries)` for concurrent callers.
+       All of them accept an optional `RecommendationFilter` (genres include/exclude,
+       minimum score) that is pushed down into the vector store's `where` clause.
+
+    Steps 1-3 load the embedding model, Chroma and the LLM client in parallel, either
+    eagerly, on a background thread or lazily (see `startup`); `is_ready()` /
+    `wait_until_ready()` expose readiness and `startup_timings` the per-phase breakdown.
     """
 
-    def __init__(self, csv_path: str, persist_dir: str = "chroma_db", build_if_missing: bool = False):
+    def __init__(
+        self,
+        csv_path: str,
+        persist_dir: str = "chroma_db",
+        build_if_missing: bool = False,
+        use_query_cache: bool = QUERY_CACHE_ENABLED,
+        use_answer_cache: bool = ANSWER_CACHE_ENABLED,
+        llm: Optional[BaseChatModel] = None,
+        embedding: Optional[Embeddings] = None,
+        startup: str = STARTUP_MODE,
+        retriever_backend: str = RETRIEVER_BACKEND,
+        numpy_index_dir: str = str(NUMPY_INDEX_DIR),
+        compress_context: bool = CONTEXT_COMPRESSION_ENABLED,
+        hybrid: bool = RETRIEVER_HYBRID,
+        neighbours_path: str = str(NEIGHBOURS_PATH),
+        llm_gateway: Optional[LLMGateway] = None,
+        index_bundle_dir: str = str(INDEX_BUNDLE_DIR),
+        bundle_source_path: str = str(RAW_CSV_PATH),
+    ):
         """
         :param csv_path: Path to the processed CSV with `combined_info` column.
         :param persist_dir: Directory where Chroma DB is stored.
-        :param build_if_missing: If True, call `build_and_save_vectorstore()` before loading.
+        :param build_if_missing: If True, bring the vector store up to date with an incremental
+                                 `build_and_save_vectorstore()` before loading.
+        :param use_query_cache: Cache query embeddings and retrieval results (see QUERY_CACHE_* config).
+        :param use_answer_cache: Cache LLM answers, with near-duplicate query matching (see ANSWER_CACHE_* config).
+        :param llm: Optional chat model used instead of ChatGroq (e.g. a local stub for benchmarks).
+        :param embedding: Optional embeddings used instead of the configured HuggingFace model.
+        :param startup: How heavyweight components (embedding model, Chroma, LLM client) are loaded:
+                        "eager"      - in parallel, before the constructor returns;
+                        "background" - in parallel on a background thread; queries wait for it;
+                        "lazy"       - on the first query.
+        :param retriever_backend: "chroma" (persisted Chroma DB), "numpy" (exact in-process
+                                  index exported with `VectorStoreBuilder.export_numpy_index`)
+                                  or "bundle" (index bundle written by the build pipeline;
+                                  refused if built for another model, splitter or source data).
+        :param numpy_index_dir: Directory of the NumPy index for the "numpy" backend.
+        :param compress_context: Dedupe retrieved chunks per title and fit them to a token budget
+                                 before the LLM call (see CONTEXT_* config).
+        :param hybrid: Fuse BM25 keyword search with vector search (RRF) and return one
+                       chunk per title (see HYBRID_* config).
+        :param neighbours_path: Precomputed neighbour table used by `similar_to`.
+        :param llm_gateway: Coalescing, rate limiting and retries in front of the LLM; by
+                            default one configured from the LLM_* settings.
+        :param index_bundle_dir: Bundle root (its LATEST bundle) or bundle directory for the
+                                 "bundle" backend; its neighbour table, if any, backs `similar_to`.
+        :param bundle_source_path: Raw data a bundle must have been built from.
         """
         try:
             logger.info(
-                "Initializing AnimeRecommendationPipeline with csv_path=%s, persist_dir=%s",
+                "Initializing AnimeRecommendationPipeline with csv_path=%s, persist_dir=%s, startup=%s",
                 csv_path,
                 persist_dir,
+                startup,
             )
+            if startup not in ("eager", "background", "lazy"):
+                raise ValueError(f"Unknown startup mode: {startup!r}")
+            if retriever_backend not in ("chroma", "numpy", "bundle"):
+                raise ValueError(f"Unknown retriever backend: {retriever_backend!r}")
+
+            self.retriever_backend = retriever_backend
+            self.numpy_index_dir = numpy_index_dir
+            self.vector_store = None
+            self.numpy_index: Optional[NumpyVectorIndex] = None
+            self.index_bundle: Optional[Dict[str, Any]] = None
+            self.index_bundle_path = None
+            self.bundle_source_path = bundle_source_path
+            if retriever_backend == "bundle":
+                # Pinned now, so a build publishing a newer bundle cannot mix versions
+                self.index_bundle_path = resolve_bundle_dir(index_bundle_dir)
+                if (self.index_bundle_path / NEIGHBOURS_FILE).exists():
+                    neighbours_path = str(self.index_bundle_path / NEIGHBOURS_FILE)
+            self.genre_index = GenreIndex({})
+            self.use_query_cache = use_query_cache
+            self.use_answer_cache = use_answer_cache
+            self.compress_context = compress_context
+            self.hybrid = hybrid
+            self.hybrid_retriever: Optional[HybridRetriever] = None
+            self.neighbours_path = neighbours_path
+            self._neighbours: Optional[NeighbourTable] = None
+            self._neighbours_lock = threading.Lock()
+            self._llm = llm
+            self.llm_gateway = llm_gateway or LLMGateway()
+            self.startup_timings: Dict[str, float] = {}
+            self._ready = threading.Event()
+            self._init_lock = threading.Lock()
+            self._startup_error: Optional[BaseException] = None
 
-            # 1. Create vector builder
-            self.vector_builder = VectorStoreBuilder(csv_path=csv_path, persist_dir=persist_dir)
+            # 1. Create vector builder (query embeddings cached per model)
+            self.embedding_cache: Optional[QueryCache] = None
+            self.retrieval_cache: Optional[QueryCache] = None
+            self.answer_cache: Optional[AnswerCache] = None
+            if use_query_cache:
+                # Quantized backends produce slightly different vectors, so they get their own namespace
+                self.embedding_cache = self._create_cache(
+                    "query_embeddings", f"{HUGGINGFACE_MODEL_NAME}:{EMBEDDING_BACKEND}"
+                )
+
+            self.vector_builder = VectorStoreBuilder(
+                csv_path=csv_path,
+                persist_dir=persist_dir,
+                query_cache=self.embedding_cache,
+                embedding=embedding,
+            )
 
             # Optionally build the vector store (e.g. on first run / offline job)
             if build_if_missing:
                 logger.info("Building and persisting Chroma vector store...")
-                self.vector_builder.build_and_save_vectorstore()
-
-            # 2. Load vector store and create retriever
-            vector_store = self.vector_builder.load_vectorstore()
-            retriever = vector_store.as_retriever()
-            logger.info("Vector store loaded and retriever created successfully.")
+                self.vector_builder.build_and_save_vectorstore(incremental=True)
 
-            # 3. Create the high-level recommender
-            self.recommender = AnimeRecommender(
-                retriever=retriever,
-                api_key=GROQ_API_KEY,
-                model_name=GROQ_MODEL_NAME,
-                temperature=0.0,
-            )
-            logger.info("AnimeRecommender initialized successfully.")
+            # 2./3. Load the heavyweight components and wire the recommender
+            if startup == "eager":
+                self._initialize()
+            elif startup == "background":
+                threading.Thread(
+                    target=self._initialize_in_background,
+                    name="anime-pipeline-startup",
+                    daemon=True,
+                ).start()
 
         except Exception as e:
             logger.error("Error initializing AnimeRecommendationPipeline", exc_info=True)
             # Wrap in your CustomException with file + line info
             raise CustomException("Error initializing AnimeRecommendationPipeline", sys) from e
 
-    def recommend(self, query: str) -> str:
+    def _initialize(self, terminal: bool = False) -> None:
+        with self._init_lock:
+            self._initialize_locked(terminal)
+
+    def _initialize_locked(self, terminal: bool = False) -> None:
+        """
+        Runs startup unless it already finished; the caller holds `_init_lock`.
+
+        :param terminal: Record a failure as the pipeline's startup error (background
+                         startup); otherwise the next waiter retries (lazy startup).
+        """
+        if self._ready.is_set():
+            return
+        try:
+            self._load_components()
+        except BaseException as e:
+            if terminal:
+                # Set under the lock, so no waiter can start a retry in between
+                self._startup_error = e
+                self._ready.set()
+            raise
+
+    def _load_components(self) -> None:
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+
+        def timed(phase: str, fn):
+            phase_start = time.perf_counter()
+            result = fn()
+            timings[phase] = round(time.perf_counter() - phase_start, 3)
+            return result
+
+        # Model load + warm-up, Chroma open and LLM client creation are independent
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="anime-startup") as pool:
+            warm_up = pool.submit(self.vector_builder.warm_up)
+            vector_store = pool.submit(timed, "vector_store", self._load_vector_backend)
+            llm = pool.submit(timed, "llm_client", self._create_llm)
+
+            timings.update(warm_up.result())
+            vector_store = vector_store.result()
+            llm = llm.result()
+
+        wiring_start = time.perf_counter()
+        self.retriever_k = RETRIEVER_K
+        if self.retriever_backend in ("numpy", "bundle"):
+            self.numpy_index = vector_store
+            retriever = NumpyRetriever(
+                index=self.numpy_index,
+                embedding=self.vector_builder.embedding,
+                k=self.retriever_k,
+            )
+        else:
+            self.vector_store = vector_store
+            retriever = self.vector_store.as_retriever(search_kwargs={"k": self.retriever_k})
+        if self.hybrid:
+            self.hybrid_retriever = timed("bm25_index", lambda: self._create_hybrid_retriever(retriever))
+            retriever = self.hybrid_retriever
+        if self.use_query_cache:
+            # Keyed on the index version, so a rebuild invalidates cached results
+            self.retrieval_cache = self._create_cache("retrieval", self.index_version())
+            retriever = CachedRetriever(
+                retriever=retriever,
+                cache=self.retrieval_cache,
+                version_fn=self.index_version,
+            )
+        self.retriever = retriever
+        logger.info("Vector store loaded and retriever created successfully.")
+
+        self.genre_index = timed("genre_index", self._build_genre_index)
+
+        context_builder = None
+        if self.compress_context:
+            context_builder = ContextBuilder(
+                max_tokens=CONTEXT_MAX_TOKENS,
+                max_tokens_per_title=CONTEXT_MAX_TOKENS_PER_TITLE,
+                token_counter=TokenCounter(CONTEXT_TOKENIZER),
+            )
+
+        if self.use_answer_cache:
+            self.answer_cache = AnswerCache(
+                # Compression settings change what the LLM sees, so they key answers too
+                prompt_version=f"{PROMPT_VERSION}:{context_builder.version}" if context_builder else PROMPT_VERSION,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                similarity_threshold=ANSWER_CACHE_SIMILARITY,
+                embedding=self.vector_builder.embedding,
+                version_fn=self.index_version,
+            )
+
+        self.recommender = AnimeRecommender(
+            retriever=retriever,
+            api_key=GROQ_API_KEY,
+            model_name=GROQ_MODEL_NAME,
+            temperature=0.0,
+            answer_cache=self.answer_cache,
+            llm=llm,
+            context_builder=context_builder,
+            gateway=self.llm_gateway,
+        )
+        logger.info("AnimeRecommender initialized successfully.")
+        timings["wiring"] = round(time.perf_counter() - wiring_start, 3)
+        timings["total"] = round(time.perf_counter() - start, 3)
+
+        self.startup_timings = timings
+        logger.info("Pipeline startup timings (s): %s", timings)
+        self._ready.set()
+
+    def _initialize_in_background(self) -> None:
+        try:
+            self._initialize(terminal=True)
+        except BaseException:
+            logger.error("Background startup of AnimeRecommendationPipeline failed", exc_info=True)
+
+    def _load_vector_backend(self):
+        if self.retriever_backend == "numpy":
+            return NumpyVectorIndex.load(self.numpy_index_dir)
+        if self.retriever_backend == "bundle":
+            index, self.index_bundle, _ = load_index_bundle(
+                str(self.index_bundle_path),
+                identity=self.vector_builder.bundle_identity(),
+                source_path=self.bundle_source_path,
+                checksums=INDEX_BUNDLE_VERIFY_CHECKSUMS,
+            )
+            return index
+        return self.vector_builder.load_vectorstore()
+
+    def index_version(self) -> str:
+        """Identifies the loaded index (keys the retrieval cache)."""
+        if self.index_bundle is not None:
+            return f"{self.index_bundle['model']}:bundle-{self.index_bundle['version']}"
+        return self.vector_builder.index_version()
+
+    def _create_hybrid_retriever(self, vector_retriever) -> HybridRetriever:
+        if self.numpy_index is not None:
+            documents = [self.numpy_index.document(row) for row in range(len(self.numpy_index))]
+        else:
+            documents = documents_from_store(self.vector_store)
+        return HybridRetriever.from_documents(
+            vector_retriever,
+            documents,
+            k=self.retriever_k,
+            candidates=HYBRID_CANDIDATES,
+            rrf_k=HYBRID_RRF_K,
+        )
+
+    def _build_genre_index(self) -> GenreIndex:
+        if self.numpy_index is not None:
+            metadatas = self.numpy_index.metadatas
+        else:
+            metadatas = self.vector_store.get(include=["metadatas"])["metadatas"]
+        genre_index = GenreIndex.from_metadatas(metadatas)
+        if not genre_index.filterable:
+            # Filters would silently match nothing; requests using them are refused instead
+            logger.error(
+                "The vector store has no MAL_ID/genres/Score metadata (built before filtering "
+                "existed); filtered requests will be refused. Rebuild it with "
+                "`python -m pipeline.build_pipeline`."
+            )
+        logger.info("Genre index built with %d genres.", len(genre_index.genres))
+        return genre_index
+
+    def _create_llm(self) -> BaseChatModel:
+        if self._llm is not None:
+            return self._llm
+        # Retries go through the gateway's rate limiter and backoff
+        return create_llm(GROQ_API_KEY, GROQ_MODEL_NAME, temperature=0.0, base_url=GROQ_BASE_URL, max_retries=0)
+
+    def is_ready(self) -> bool:
+        """Readiness hook: True once every component is loaded and warmed up."""
+        return self._ready.is_set() and self._startup_error is None
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until startup has finished (starting it now in "lazy" mode).
+
+        :return: False if `timeout` expired first.
+        """
+        if not self._ready.is_set():
+            # Every waiter takes the lock, so it either sees the attempt in progress finish
+            # or, in lazy mode (also after a failed lazy attempt), runs startup itself
+            if not self._init_lock.acquire(timeout=-1 if timeout is None else timeout):
+                return False
+            try:
+                self._initialize_locked()
+            except Exception as e:
+                raise CustomException("Error initializing AnimeRecommendationPipeline", sys) from e
+            finally:
+                self._init_lock.release()
+
+        if self._startup_error is not None:
+            raise CustomException("Background startup of AnimeRecommendationPipeline failed", sys) from self._startup_error
+        return True
+
+    @staticmethod
+    def _create_cache(name: str, namespace: str = "") -> QueryCache:
+        return QueryCache(
+            name=name,
+            namespace=namespace,
+            max_entries=QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+            sqlite_path=QUERY_CACHE_PATH or None,
+            namespace_ttl_seconds=QUERY_CACHE_NAMESPACE_TTL_SECONDS,
+        )
+
+    def cache_stats(self) -> List[dict]:
+        """Hit/miss counters of the query and answer caches (empty when caching is disabled)."""
+        caches = (self.embedding_cache, self.retrieval_cache, self.answer_cache)
+        return [cache.stats() for cache in caches if cache is not None]
+
+    def similar_to(self, title_or_id: Union[int, str], n: int = 10) -> Dict[str, Any]:
+        """
+        "More like this" from the precomputed neighbour table: no query embedding,
+        vector search or LLM call, and it does not wait for the pipeline to be ready.
+
+        :param title_or_id: MAL_ID (int) or title (str, fuzzy matched).
+        :param n: Number of similar anime to return.
+        :return: {"mal_id", "title", "similar": [{"mal_id", "title", "score"}, ...]}
+        :raises KeyError: If no anime matches `title_or_id`.
+        :raises FileNotFoundError: If the neighbour table has not been built.
+        """
+        try:
+            if self._neighbours is None:
+                if not Path(self.neighbours_path).exists():
+                    raise FileNotFoundError(f"Neighbour table not built: {self.neighbours_path}")
+                with self._neighbours_lock:
+                    if self._neighbours is None:
+                        self._neighbours = NeighbourTable.load(self.neighbours_path)
+            return self._neighbours.similar_to(title_or_id, n=n)
+        except (KeyError, FileNotFoundError):
+            raise
+        except Exception as e:
+            logger.error("Failed to look up similar anime", exc_info=True)
+            raise CustomException(f"Failed to look up anime similar to {title_or_id!r}", sys) from e
+
+    def available_genres(self) -> List[str]:
+        """Normalized genre names usable in a `RecommendationFilter`."""
+        self.wait_until_ready()
+        return self.genre_index.genres
+
+    def _search_kwargs(self, filters: Optional[RecommendationFilter]) -> Dict[str, Any]:
+        where = self.genre_index.to_where(filters)
+        if where is not None:
+            logger.info("Applying metadata filter: %s", filters)
+        return {"filter": where} if where is not None else {}
+
+    @staticmethod
+    def _check_mode(mode: str) -> None:
+        if mode not in RECOMMEND_MODES:
+            raise ValueError(f"Unknown recommendation mode {mode!r}; expected one of {RECOMMEND_MODES}")
+
+    def _fast_search_kwargs(self, filters: Optional[RecommendationFilter]) -> Dict[str, Any]:
+        # Several chunks usually belong to one title, so fetch enough for three distinct ones
+        return {**self._search_kwargs(filters), "k": max(FAST_PATH_CANDIDATES, self.retriever_k)}
+
+    @staticmethod
+    def _fast_answer(query: str, docs: List[Document], filters: Optional[RecommendationFilter]) -> str:
+        metrics.inc("anime_retrieved_documents_total", len(docs))
+        with metrics.span("fast_answer"):
+            return fast_recommendation(query, docs, requested_genres=filters.include_genres if filters else ())
+
+    def recommend(self, query: str, filters: Optional[RecommendationFilter] = None, mode: str = "llm") -> str:
         """
         Run the full recommendation pipeline.
 
         :param query: Natural language description of what the user wants.
-        :return: (answer_text, source_documents)
+        :param filters: Optional genre/score pre-filter.
+        :param mode: "llm" (default) generates the answer with the LLM; "fast" skips it and
+                     templates the top three distinct titles from the retrieved documents
+                     (extractive summaries, genre-overlap explanations, same answer format),
+                     so latency is bounded by retrieval.
+        :return: answer_text
+        :raises FiltersUnavailable: If `filters` are given but the vector store was built
+                                    without filter metadata.
+        """
+        self._check_mode(mode)
+        try:
+            logger.info("Received recommendation query (mode=%s): %s", mode, query)
+            with metrics.trace(f"recommend_{mode}" if mode != "llm" else "recommend", query):
+                self.wait_until_ready()
+                if mode == "fast":
+                    with metrics.span("retrieval"):
+                        docs = self.retriever.invoke(query, **self._fast_search_kwargs(filters))
+                    answer = self._fast_answer(query, docs, filters)
+                else:
+                    answer = self.recommender.get_recommendation(query, self._search_kwargs(filters))
+            logger.info("Recommendation generated successfully.")
+            return answer
+
+        except FiltersUnavailable:
+            raise
+        except Exception as e:
+            logger.error("Failed to get recommendation", exc_info=True)
+            raise CustomException("Failed to get recommendation", sys) from e
+
+    def stream_recommend(self, query: str, filters: Optional[RecommendationFilter] = None) -> Iterator[str]:
+        """
+        Streaming variant of `recommend`: yields answer tokens as they arrive.
+
+        :param query: Natural language description of what the user wants.
+        :param filters: Optional genre/score pre-filter.
         """
         try:
-            logger.info("Received recommendation query: %s", query)
-            answer = self.recommender.get_recommendation(query)
+            logger.info("Received streaming recommendation query: %s", query)
+            with metrics.trace("stream_recommend", query):
+                self.wait_until_ready()
+                yield from self.recommender.stream_recommendation(query, self._search_kwargs(filters))
+
+        except FiltersUnavailable:
+            raise
+        except Exception as e:
+            logger.error("Failed to stream recommendation", exc_info=True)
+            raise CustomException("Failed to stream recommendation", sys) from e
+
+    async def arecommend(
+        self, query: str, filters: Optional[RecommendationFilter] = None, mode: str = "llm"
+    ) -> str:
+        """
+        Async variant of `recommend`; the LLM round-trip does not block a thread.
+        """
+        self._check_mode(mode)
+        try:
+            logger.info("Received async recommendation query (mode=%s): %s", mode, query)
+            with metrics.trace(f"arecommend_{mode}" if mode != "llm" else "arecommend", query):
+                await asyncio.to_thread(self.wait_until_ready)
+                if mode == "fast":
+                    with metrics.span("retrieval"):
+                        docs = await self.retriever.ainvoke(query, **self._fast_search_kwargs(filters))
+                    answer = self._fast_answer(query, docs, filters)
+                else:
+                    answer = await self.recommender.aget_recommendation(query, self._search_kwargs(filters))
             logger.info("Recommendation generated successfully.")
             return answer
 
+        except FiltersUnavailable:
+            raise
         except Exception as e:
             logger.error("Failed to get recommendation", exc_info=True)
             raise CustomException("Failed to get recommendation", sys) from e
+
+    def _retrieve_batch(self, queries: List[str], search_kwargs: Dict[str, Any]) -> List[List[Document]]:
+        """
+        Retrieve documents for several queries at once: one encoder call for all
+        uncached queries and one vector store lookup with all their embeddings.
+        """
+        where = search_kwargs.get("filter")
+        cached_retriever = self.retriever if isinstance(self.retriever, CachedRetriever) else None
+        results: List[Optional[List[Document]]] = [
+            cached_retriever.get_cached(query, **search_kwargs) if cached_retriever is not None else None
+            for query in queries
+        ]
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        if not missing:
+            return results
+
+        embedding = self.vector_builder.embedding
+        texts = [queries[i] for i in missing]
+        if hasattr(embedding, "embed_queries"):
+            vectors = embedding.embed_queries(texts)
+        else:
+            vectors = [embedding.embed_query(text) for text in texts]
+
+        # Hybrid retrieval fuses a wider dense candidate list with BM25 below
+        n_results = HYBRID_CANDIDATES if self.hybrid_retriever is not None else self.retriever_k
+        if self.numpy_index is not None:
+            with metrics.span("vector_search"):
+                hits_batch = self.numpy_index.search_batch(vectors, n_results, where=where)
+            found = [[self.numpy_index.document(row) for row, _ in hits] for hits in hits_batch]
+        else:
+            with metrics.span("vector_search"):
+                found = search_by_vectors(self.vector_store, vectors, n_results, where=where)
+
+        if self.hybrid_retriever is not None:
+            found = [
+                self.hybrid_retriever.fuse(queries[i], docs, k=self.retriever_k, where=where)
+                for i, docs in zip(missing, found)
+            ]
+
+        for docs, i in zip(found, missing):
+            metrics.inc("anime_retrieved_documents_total", len(docs))
+            results[i] = docs
+            if cached_retriever is not None:
+                cached_retriever.put(queries[i], docs, **search_kwargs)
+        return results
+
+    async def arecommend_batch(
+        self,
+        queries: List[str],
+        max_concurrency: int = 4,
+        filters: Optional[RecommendationFilter] = None,
+    ) -> List[str]:
+        """
+        Recommend for several queries: batched query embedding and vector lookups,
+        then LLM calls fanned out with at most `max_concurrency` in flight.
+        `filters` applies to every query.
+
+        :return: One answer per query, in input order.
+        """
+        try:
+            logger.info("Received batch of %d recommendation queries.", len(queries))
+            with metrics.trace("recommend_batch", f"{len(queries)} queries"):
+                await asyncio.to_thread(self.wait_until_ready)
+                with metrics.span("retrieval"):
+                    sources = await asyncio.to_thread(self._retrieve_batch, queries, self._search_kwargs(filters))
+                answers = await self.recommender.arecommend_from_documents(
+                    queries, sources, max_concurrency=max_concurrency
+                )
+            logger.info("Batch recommendations generated successfully.")
+            return answers
+
+        except FiltersUnavailable:
+            raise
+        except Exception as e:
+            logger.error("Failed to get batch recommendations", exc_info=True)
+            raise CustomException("Failed to get batch recommendations", sys) from e
+
+    def recommend_batch(
+        self,
+        queries: List[str],
+        max_concurrency: int = 4,
+        filters: Optional[RecommendationFilter] = None,
+    ) -> List[str]:
+        """
+        Synchronous entry point for `arecommend_batch` (must not be called from a running event loop).
+        """
+        return asyncio.run(self.arecommend_batch(queries, max_concurrency=max_concurrency, filters=filters))
@@ -0,0 +1,434 @@
+# src/cache.py
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from utils.logger import logging
+from utils.custom_exception import CustomException
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, trim and collapse whitespace so trivially different queries share a key."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def document_key(doc: Document) -> str:
+    """
+    Stable identity of a retrieved document (MAL_ID + content hash), independent of
+    whether the retrieval path populated `Document.id`.
+    """
+    digest = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:16]
+    return f"{doc.metadata.get('MAL_ID', '')}:{digest}"
+
+
+class QueryCache:
+    """
+    Two-tier key/value cache for JSON-serializable values:
+
+      - an in-memory LRU tier bounded by `max_entries`,
+      - an optional on-disk SQLite tier (`sqlite_path`) bounded by `max_disk_entries`,
+        shared by every process that points at the same file.
+
+    Entries expire after `ttl_seconds` (None = never). Every entry belongs to a
+    `namespace` (e.g. model name + index version) and is only served under it;
+    `set_namespace()` switches namespaces. Processes on different namespaces may share
+    the SQLite file (e.g. during a rolling deploy), so rows of another namespace are
+    only deleted once nobody has written or read them for `namespace_ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        namespace: str = "",
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        sqlite_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+        namespace_ttl_seconds: float = 3600.0,
+    ):
+        self.name = name
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.namespace_ttl_seconds = namespace_ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            try:
+                Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    " name TEXT NOT NULL, key TEXT NOT NULL, namespace TEXT NOT NULL,"
+                    " value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                    " PRIMARY KEY (name, key))"
+                )
+                self._db.commit()
+                self._purge_stale_namespaces()
+            except Exception as e:
+                raise CustomException(f"Failed to open query cache database: {sqlite_path}", sys) from e
+
+    def _key(self, key: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{key}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        hashed = self._key(key)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(hashed)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(hashed)
+                    self.hits += 1
+                    return value
+                del self._memory[hashed]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM cache WHERE name = ? AND key = ?",
+                    (self.name, hashed),
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    value = json.loads(row[0])
+                    self._db.execute(
+                        "UPDATE cache SET accessed_at = ? WHERE name = ? AND key = ?",
+                        (now, self.name, hashed),
+                    )
+                    self._db.commit()
+                    self._remember(hashed, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        hashed = self._key(key)
+        now = time.time()
+        with self._lock:
+            self._remember(hashed, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (name, key, namespace, value, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.name, hashed, self.namespace, json.dumps(value), now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, hashed: str, created_at: float, value: Any) -> None:
+        self._memory[hashed] = (created_at, value)
+        self._memory.move_to_end(hashed)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._db.execute(
+                "DELETE FROM cache WHERE name = ? AND created_at < ?",
+                (self.name, now - self.ttl_seconds),
+            )
+        # Size-based eviction: drop least recently accessed rows beyond the limit
+        self._db.execute(
+            "DELETE FROM cache WHERE name = ? AND key IN ("
+            " SELECT key FROM cache WHERE name = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.max_disk_entries),
+        )
+
+    def _purge_stale_namespaces(self) -> None:
+        self._db.execute(
+            "DELETE FROM cache WHERE name = ? AND namespace != ? AND accessed_at < ?",
+            (self.name, self.namespace, time.time() - self.namespace_ttl_seconds),
+        )
+        self._db.commit()
+
+    def set_namespace(self, namespace: str) -> None:
+        """
+        Switch to a new namespace: entries cached under the old one are no longer served
+        (on disk they age out after `namespace_ttl_seconds`).
+        """
+        with self._lock:
+            if namespace == self.namespace:
+                return
+            logging.info(f"Invalidating '{self.name}' cache: namespace {self.namespace!r} -> {namespace!r}")
+            self.namespace = namespace
+            self._memory.clear()
+            if self._db is not None:
+                self._purge_stale_namespaces()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE name = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an `Embeddings` instance and caches `embed_query` results by normalized query
+    text. Document embedding is passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: QueryCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, encoding only the cache misses (in one call when supported)."""
+        keys = [normalize_query(text) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            texts_to_embed = [texts[i] for i in missing]
+            if hasattr(self.embeddings, "embed_queries"):
+                computed = self.embeddings.embed_queries(texts_to_embed)
+            else:
+                computed = [self.embeddings.embed_query(text) for text in texts_to_embed]
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                self.cache.set(keys[i], vector)
+        return vectors
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Caches the documents returned by `retriever` for a normalized query (plus any
+    search kwargs such as filters).
+
+    `version_fn` returns the current index version; whenever it changes (the
+    collection was rebuilt) the cache moves to a new namespace, so entries cached
+    for the old index are no longer served.
+    """
+
+    retriever: BaseRetriever
+    cache: QueryCache
+    version_fn: Optional[Callable[[], str]] = None
+
+    def _sync_version(self) -> None:
+        if self.version_fn is not None:
+            self.cache.set_namespace(self.version_fn())
+
+    @staticmethod
+    def _key(query: str, kwargs: Dict[str, Any]) -> str:
+        return json.dumps([normalize_query(query), kwargs], sort_keys=True, default=str)
+
+    def get_cached(self, query: str, **kwargs: Any) -> Optional[List[Document]]:
+        """Cached documents for `query`, or None. Lets batch lookups share this cache."""
+        self._sync_version()
+        cached = self.cache.get(self._key(query, kwargs))
+        if cached is None:
+            return None
+        return [
+            Document(id=item["id"], page_content=item["page_content"], metadata=item["metadata"])
+            for item in cached
+        ]
+
+    def put(self, query: str, docs: List[Document], **kwargs: Any) -> None:
+        self.cache.set(
+            self._key(query, kwargs),
+            [{"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata} for doc in docs],
+        )
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        cached = self.get_cached(query, **kwargs)
+        if cached is not None:
+            return cached
+
+        docs = self.retriever.invoke(query, **kwargs)
+        self.put(query, docs, **kwargs)
+        return docs
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        cached = self.get_cached(query, **kwargs)
+        if cached is not None:
+            return cached
+
+        docs = await self.retriever.ainvoke(query, **kwargs)
+        self.put(query, docs, **kwargs)
+        return docs
+
+
+class AnswerCache:
+    """
+    In-memory LRU cache of LLM answers.
+
+    An answer is keyed on the retrieved document ids (in retrieval order), the prompt
+    template version and the normalized query; with temperature 0 the same key
+    produces the same answer. When `embedding` is given, a miss on the exact key falls
+    back to a near-duplicate lookup: a cached answer for the *same documents and prompt*
+    whose query embedding has cosine similarity >= `similarity_threshold`.
+
+    `version_fn` returns the current index version, as for `CachedRetriever`; when it
+    changes every cached answer is dropped.
+    """
+
+    def __init__(
+        self,
+        prompt_version: str,
+        max_entries: int = 512,
+        similarity_threshold: float = 0.95,
+        embedding: Optional[Embeddings] = None,
+        version_fn: Optional[Callable[[], str]] = None,
+    ):
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embedding = embedding
+        self.version_fn = version_fn
+        self._version = version_fn() if version_fn is not None else None
+
+        # exact key -> (context key, normalized query vector or None, answer)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[np.ndarray], str]]" = OrderedDict()
+        # context key -> exact keys cached for that context
+        self._by_context: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _context_key(self, docs: Sequence[Document]) -> str:
+        return json.dumps([self.prompt_version, [document_key(doc) for doc in docs]])
+
+    def _query_vector(self, query: str) -> Optional[np.ndarray]:
+        if self.embedding is None:
+            return None
+        vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _sync_version(self) -> None:
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        with self._lock:
+            if version != self._version:
+                logging.info(f"Invalidating answer cache: index version {self._version!r} -> {version!r}")
+                self._version = version
+                self._entries.clear()
+                self._by_context.clear()
+
+    def lookup(self, query: str, docs: Sequence[Document]) -> Optional[str]:
+        self._sync_version()
+        context_key = self._context_key(docs)
+        exact_key = f"{context_key}\x00{normalize_query(query)}"
+
+        with self._lock:
+            entry = self._entries.get(exact_key)
+            if entry is not None:
+                self._entries.move_to_end(exact_key)
+                self.exact_hits += 1
+                return entry[2]
+            candidates = list(self._by_context.get(context_key, []))
+
+        if candidates and self.embedding is not None:
+            vector = self._query_vector(query)
+            with self._lock:
+                best_key, best_score = None, self.similarity_threshold
+                for key in candidates:
+                    entry = self._entries.get(key)
+                    if entry is None or entry[1] is None:
+                        continue
+                    score = float(np.dot(vector, entry[1]))
+                    if score >= best_score:
+                        best_key, best_score = key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.semantic_hits += 1
+                    logging.info(f"Answer cache near-duplicate hit (cosine={best_score:.3f})")
+                    return self._entries[best_key][2]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, query: str, docs: Sequence[Document], answer: str) -> None:
+        self._sync_version()
+        context_key = self._context_key(docs)
+        exact_key = f"{context_key}\x00{normalize_query(query)}"
+        vector = self._query_vector(query)
+
+        with self._lock:
+            if exact_key not in self._entries:
+                self._by_context.setdefault(context_key, []).append(exact_key)
+            self._entries[exact_key] = (context_key, vector, answer)
+            self._entries.move_to_end(exact_key)
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, (evicted_context, _, _) = self._entries.popitem(last=False)
+                keys = self._by_context.get(evicted_context, [])
+                if evicted_key in keys:
+                    keys.remove(evicted_key)
+                if not keys:
+                    self._by_context.pop(evicted_context, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "name": "answers",
+            "hits": hits,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+        }
@@ -0,0 +1,182 @@
+# src/context.py
+import re
+import sys
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from utils.logger import logging
+from utils.custom_exception import CustomException
+
+# Layout of the processed CSV's combined_info (see AnimeDataLoader)
+COMBINED_INFO_PATTERN = re.compile(r"Title: (?P<title>.*?)Overview: (?P<overview>.*) Genres: (?P<genres>.*)$", re.S)
+CONTENT_PREFIX = "combined_info: "
+
+# Rough stand-in for BPE pieces when the real encoding is unavailable
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenCounter:
+    """
+    Counts and truncates text in tokens of a tiktoken encoding (e.g. "cl100k_base").
+
+    tiktoken is imported, and the encoding loaded, on first use (once, even when several
+    threads ask at the same time). If it cannot be loaded (package missing, or no network
+    to fetch the encoding file and no TIKTOKEN_CACHE_DIR copy) an error is logged once
+    and a word/punctuation approximation is used instead; `exact` tells which.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        import tiktoken
+
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        logging.error(
+                            f"Could not load tokenizer '{self.encoding_name}' ({e}); "
+                            "falling back to approximate token counts, so context budgets are inexact."
+                        )
+                    # Only set once the attempt is over, so no thread sees a half-done load
+                    self._loaded = True
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """First `max_tokens` tokens of `text`, cut back to a sentence end when one is near."""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            cut = self.encoding.decode(tokens[:max_tokens])
+        else:
+            matches = list(_APPROX_TOKEN_PATTERN.finditer(text))
+            if len(matches) <= max_tokens:
+                return text
+            cut = text[: matches[max_tokens - 1].end()]
+
+        sentence_end = cut.rfind(". ")
+        if sentence_end >= len(cut) // 2:
+            return cut[: sentence_end + 1]
+        return cut.rstrip() + "..."
+
+
+class ContextBuilder:
+    """
+    Assembles the prompt CONTEXT from retrieved chunks instead of pasting every chunk
+    verbatim ("stuff"):
+
+      1. deduplicates chunks of the same anime (by MAL_ID, else title) - one entry per title,
+      2. orders titles by relevance (the rank of their best chunk in retriever order),
+      3. rebuilds each entry from the full row (`source` metadata) as
+         "Title: ... Overview: ... Genres: ...", trimming the overview so the entry fits
+         `max_tokens_per_title`,
+      4. stops adding titles once `max_tokens` would be exceeded.
+
+    Budgets are measured with `TokenCounter`.
+    """
+
+    # Entries shorter than this after trimming to the remaining budget are dropped
+    MIN_ENTRY_TOKENS = 32
+
+    def __init__(
+        self,
+        max_tokens: int = 1200,
+        max_tokens_per_title: int = 300,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        """
+        :param max_tokens:           Token budget for the whole CONTEXT.
+        :param max_tokens_per_title: Token budget for one anime's entry.
+        :param token_counter:        Tokenizer used to measure budgets (default cl100k_base).
+        """
+        if max_tokens <= 0 or max_tokens_per_title <= 0:
+            raise CustomException("Context token budgets must be positive", sys)
+        self.max_tokens = max_tokens
+        self.max_tokens_per_title = max_tokens_per_title
+        self.token_counter = token_counter or TokenCounter()
+
+    @property
+    def version(self) -> str:
+        """Identifies the assembly settings (changes how a given set of documents is rendered)."""
+        settings = f"{self.max_tokens}:{self.max_tokens_per_title}:{self.token_counter.encoding_name}"
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:8]
+
+    @staticmethod
+    def _title_key(doc: Document) -> str:
+        if doc.metadata.get("MAL_ID") is not None:
+            return f"mal:{doc.metadata['MAL_ID']}"
+        match = COMBINED_INFO_PATTERN.search(doc.metadata.get("source") or doc.page_content)
+        return f"title:{match.group('title').strip().lower()}" if match else f"text:{doc.page_content}"
+
+    def _entry(self, doc: Document, budget: int) -> str:
+        """One anime's text, trimmed to `budget` tokens by shortening its overview."""
+        full = doc.metadata.get("source") or doc.page_content
+        if full.startswith(CONTENT_PREFIX):
+            full = full[len(CONTENT_PREFIX):]
+        match = COMBINED_INFO_PATTERN.search(full)
+        if match is None:
+            return self.token_counter.truncate(full.strip(), budget)
+
+        title, overview, genres = (match.group(name).strip() for name in ("title", "overview", "genres"))
+        head, tail = f"Title: {title}\nOverview: ", f"\nGenres: {genres}"
+        overview_budget = budget - self.token_counter.count(head + tail)
+        if overview_budget <= 0:
+            return self.token_counter.truncate(head + tail, budget)
+        return head + self.token_counter.truncate(overview, overview_budget) + tail
+
+    def build(self, docs: List[Document]) -> Tuple[str, Dict[str, int]]:
+        """
+        :param docs: Retrieved documents, most relevant first.
+        :return: (context text, stats with chunk/title counts and token counts before/after).
+        """
+        best: Dict[str, Document] = {}
+        for doc in docs:
+            # Retriever order is relevance order, so the first chunk seen per title is its best
+            best.setdefault(self._title_key(doc), doc)
+
+        entries: List[str] = []
+        used = 0
+        for doc in best.values():
+            remaining = self.max_tokens - used
+            budget = min(self.max_tokens_per_title, remaining)
+            if budget < self.MIN_ENTRY_TOKENS:
+                break
+            entry = self._entry(doc, budget)
+            # Separator tokens count against the budget too
+            cost = self.token_counter.count(entry + ("\n\n" if entries else ""))
+            if cost > remaining:
+                break
+            entries.append(entry)
+            used += cost
+
+        context = "\n\n".join(entries)
+        stats = {
+            "chunks": len(docs),
+            "titles": len(best),
+            "titles_kept": len(entries),
+            "tokens_before": self.token_counter.count("\n\n".join(doc.page_content for doc in docs)),
+            "tokens_after": self.token_counter.count(context),
+        }
+        return context, stats
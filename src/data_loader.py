@@ -1,14 +1,26 @@
 # data_loader.py
 import sys
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
+from langchain_core.documents import Document
 from utils.logger import logging
 from utils.custom_exception import CustomException
+from config.config import CSV_CHUNK_ROWS
+from src.filters import encode_genres
+
+REQUIRED_COLUMNS = ["Name", "Genres", "synopsis"]
+# Raw columns carried through as document metadata when present
+METADATA_COLUMNS = ["MAL_ID", "Score", "Genres"]
 
 class AnimeDataLoader:
     """
     Loads a raw CSV, validates required columns, builds a `combined_info` text field,
-    and writes a processed CSV with one column: combined_info.
+    and writes a processed CSV with the combined_info column plus MAL_ID, Score and
+    Genres (when the raw CSV has them), which the vector store keeps as metadata.
+
+    `iter_documents` is the streaming alternative: it reads the raw CSV in chunks and
+    yields one Document per row without materializing the file or a processed CSV.
     """
     def __init__(self, original_csv: str, processed_csv: str):
         self.original_csv = original_csv
@@ -23,14 +35,7 @@ class AnimeDataLoader:
             raise CustomException("Path validation failed", sys) from e
 
         # 2) Validate header/required columns fast
-        try:
-            header_df = pd.read_csv(self.original_csv, nrows=1, encoding="utf-8", on_bad_lines="skip")
-            required = {"Name", "Genres", "synopsis"}
-            missing = required - set(header_df.columns)
-            if missing:
-                raise ValueError(f"Missing required columns: {sorted(missing)}")
-        except Exception as e:
-            raise CustomException("CSV header validation failed", sys) from e
+        header = self._validate_header()
 
         # 3) Load full file
         try:
@@ -40,26 +45,95 @@ class AnimeDataLoader:
 
         # 4) Clean & build combined_info
         try:
-            # Only drop rows missing required fields
-            df = df.dropna(subset=["Name", "Genres", "synopsis"])
-
-            # Normalize to strings and strip
-            df["Name"] = df["Name"].astype(str).str.strip()
-            df["Genres"] = df["Genres"].astype(str).str.strip()
-            df["synopsis"] = df["synopsis"].astype(str).str.strip()
-
-            df["combined_info"] = (
-                "Title: " + df["Name"] +
-                "Overview: " + df["synopsis"] +
-                " Genres: " + df["Genres"]
-            )
+            df = self._clean(df)
         except Exception as e:
             raise CustomException("Failed while building combined_info", sys) from e
 
-        # 5) Save processed CSV (only the combined column)
+        # 5) Save processed CSV: combined_info plus the columns kept as document metadata
         try:
-            df[["combined_info"]].to_csv(self.processed_csv, index=False, encoding="utf-8")
+            columns = [col for col in METADATA_COLUMNS if col in header]
+            df[columns + ["combined_info"]].to_csv(self.processed_csv, index=False, encoding="utf-8")
             logging.info(f"Processed {len(df)} rows -> {self.processed_csv}")
             return str(self.processed_csv)
         except Exception as e:
             raise CustomException("Failed to write processed CSV", sys) from e
+
+    def _validate_header(self) -> list:
+        try:
+            header = list(pd.read_csv(self.original_csv, nrows=0, encoding="utf-8").columns)
+            missing = set(REQUIRED_COLUMNS) - set(header)
+            if missing:
+                raise ValueError(f"Missing required columns: {sorted(missing)}")
+            return header
+        except Exception as e:
+            raise CustomException("CSV header validation failed", sys) from e
+
+    @staticmethod
+    def _clean(df: pd.DataFrame) -> pd.DataFrame:
+        # Only drop rows missing required fields
+        df = df.dropna(subset=REQUIRED_COLUMNS).copy()
+
+        # Normalize to strings and strip
+        for col in REQUIRED_COLUMNS:
+            df[col] = df[col].astype(str).str.strip()
+
+        df["combined_info"] = (
+            "Title: " + df["Name"] +
+            "Overview: " + df["synopsis"] +
+            " Genres: " + df["Genres"]
+        )
+        if "Score" in df.columns:
+            # MAL uses "Unknown" for unscored entries
+            df["Score"] = pd.to_numeric(df["Score"], errors="coerce")
+        return df
+
+    def iter_documents(self, chunksize: int = CSV_CHUNK_ROWS) -> Iterator[Document]:
+        """
+        Stream the raw CSV `chunksize` rows at a time, yielding the same Documents the
+        vector store builder gets from the processed CSV (identical text and metadata,
+        so chunk ids and hashes match and incremental builds stay compatible).
+
+        Only the needed columns are read, as strings, so memory stays bounded by one chunk.
+
+        :param chunksize: Raw CSV rows per pandas chunk.
+        """
+        if not Path(self.original_csv).exists():
+            raise CustomException(f"Input CSV not found: {self.original_csv}", sys)
+        header = self._validate_header()
+        metadata_columns = [col for col in METADATA_COLUMNS if col in header]
+        usecols = [col for col in header if col in set(REQUIRED_COLUMNS) | set(metadata_columns)]
+
+        try:
+            reader = pd.read_csv(
+                self.original_csv,
+                encoding="utf-8",
+                on_bad_lines="skip",
+                usecols=usecols,
+                dtype=str,
+                chunksize=chunksize,
+            )
+        except Exception as e:
+            raise CustomException("Failed to open CSV for streaming", sys) from e
+
+        row = 0
+        try:
+            for frame in reader:
+                frame = self._clean(frame)
+                for record in frame.itertuples(index=False):
+                    record = record._asdict()
+                    combined = record["combined_info"]
+                    metadata = {"source": combined, "row": row}
+                    if "MAL_ID" in metadata_columns and not pd.isna(record["MAL_ID"]):
+                        metadata["MAL_ID"] = int(record["MAL_ID"])
+                    # Unknown scores are left out, so a `min_score` filter excludes the anime
+                    if "Score" in metadata_columns and not pd.isna(record["Score"]):
+                        metadata["Score"] = float(record["Score"])
+                    metadata["genres"] = encode_genres(record["Genres"])
+                    # Same page_content as CSVLoader over the processed CSV
+                    yield Document(page_content=f"combined_info: {combined.strip()}", metadata=metadata)
+                    row += 1
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException("Failed while streaming CSV rows", sys) from e
+        logging.info(f"Streamed {row} rows from {self.original_csv}")
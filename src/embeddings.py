@@ -0,0 +1,257 @@
+# src/embeddings.py
+import sys
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from utils.logger import logging
+from utils import metrics
+from utils.custom_exception import CustomException
+
+# Written next to an ONNX export; records which model it was exported from
+ONNX_EXPORT_INFO = "export_info.json"
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` backed directly by a sentence-transformers model, with
+    control over how documents are encoded:
+
+      - `batch_size` texts per forward pass,
+      - length-sorted bucketing (texts are globally sorted by length before batching,
+        so every batch - and every chunk handed to a worker process - pads to a
+        similar length),
+      - an optional sentence-transformers multi-process pool with `num_workers`
+        CPU processes for large document sets.
+
+    Produces the same vectors as `HuggingFaceEmbeddings(encode_kwargs={"normalize_embeddings": True})`,
+    so indexes built with either are interchangeable.
+
+    After each `embed_documents` call, `last_stats` holds the document count, wall time
+    and throughput in docs/sec.
+
+    `backend` selects the inference runtime:
+
+      - "torch"     - fp32 PyTorch (reference vectors),
+      - "onnx"      - fp32 ONNX Runtime,
+      - "onnx-int8" - ONNX Runtime with int8 dynamic quantization (smaller and faster on
+                      CPU; vectors are close to, not identical with, the fp32 ones).
+
+    ONNX models are exported (and quantized) once into `onnx_dir` and reused after that,
+    as long as the export there was made from the same model.
+    The ONNX backends need `optimum[onnxruntime]`.
+    """
+
+    BACKENDS = ("torch", "onnx", "onnx-int8")
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_folder: Optional[str] = None,
+        batch_size: int = 32,
+        num_workers: int = 0,
+        device: str = "cpu",
+        normalize: bool = True,
+        min_docs_for_pool: int = 1000,
+        backend: str = "torch",
+        num_threads: int = 0,
+        onnx_dir: Optional[str] = None,
+        quantization_config: str = "avx512_vnni",
+    ):
+        """
+        :param model_name:        sentence-transformers model id or local path.
+        :param cache_folder:      HF cache directory for the model weights.
+        :param batch_size:        Texts per forward pass.
+        :param num_workers:       Processes in the multi-process pool; 0 or 1 encodes in-process.
+        :param device:            Torch device for in-process encoding.
+        :param normalize:         L2-normalize embeddings (cosine == dot product).
+        :param min_docs_for_pool: Smaller inputs are encoded in-process, since starting the
+                                  pool (one model copy per worker) costs more than it saves.
+        :param backend:           "torch", "onnx" or "onnx-int8" (see class docstring).
+        :param num_threads:       CPU threads for inference (torch intra-op threads or the ONNX
+                                  Runtime session); 0 keeps the runtime's default.
+        :param onnx_dir:          Where the exported ONNX model is saved; defaults to
+                                  `<cache_folder or model name>-onnx`.
+        :param quantization_config: Dynamic quantization preset for "onnx-int8": "arm64",
+                                  "avx2", "avx512" or "avx512_vnni".
+        """
+        if backend not in self.BACKENDS:
+            raise CustomException(f"Unknown embedding backend: {backend!r} (expected one of {self.BACKENDS})", sys)
+        self.model_name = model_name
+        self.cache_folder = cache_folder
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.device = device
+        self.normalize = normalize
+        self.min_docs_for_pool = min_docs_for_pool
+        self.backend = backend
+        self.num_threads = num_threads
+        self.onnx_dir = onnx_dir
+        self.quantization_config = quantization_config
+        self.last_stats: Dict[str, float] = {}
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            try:
+                if self.backend == "torch":
+                    from sentence_transformers import SentenceTransformer
+
+                    if self.num_threads > 0:
+                        import torch
+
+                        torch.set_num_threads(self.num_threads)
+                    self._model = SentenceTransformer(
+                        self.model_name,
+                        cache_folder=self.cache_folder,
+                        device=self.device,
+                    )
+                else:
+                    self._model = self._load_onnx_model()
+                logging.info(f"Loaded embedding model {self.model_name} (backend={self.backend})")
+            except Exception as e:
+                raise CustomException(f"Failed to load embedding model: {self.model_name}", sys) from e
+        return self._model
+
+    def _onnx_file_name(self) -> str:
+        if self.backend == "onnx-int8":
+            return f"onnx/model_qint8_{self.quantization_config}.onnx"
+        return "onnx/model.onnx"
+
+    def _export_matches(self, export_dir: Path) -> bool:
+        """True if `export_dir` holds an ONNX export of this model (not of another one)."""
+        try:
+            info = json.loads((export_dir / ONNX_EXPORT_INFO).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        return info.get("model") == self.model_name
+
+    def _load_onnx_model(self):
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+        default_dir = f"{self.cache_folder or Path(self.model_name).name}-onnx"
+        export_dir = Path(self.onnx_dir or default_dir)
+        file_name = self._onnx_file_name()
+
+        reusable = self._export_matches(export_dir)
+        if not reusable and (export_dir / "onnx").exists():
+            logging.warning(f"{export_dir} does not hold an ONNX export of {self.model_name}; exporting it again")
+        if not (reusable and (export_dir / file_name).exists()):
+            logging.info(f"Exporting {self.model_name} to ONNX ({self.backend}) in {export_dir}")
+            if reusable and (export_dir / "onnx" / "model.onnx").exists():
+                # Quantize the fp32 ONNX export made earlier
+                exported = SentenceTransformer(str(export_dir), device="cpu", backend="onnx")
+            else:
+                # backend="onnx" on a PyTorch checkpoint exports it; save it so this happens once
+                exported = SentenceTransformer(
+                    self.model_name, cache_folder=self.cache_folder, device="cpu", backend="onnx"
+                )
+                exported.save_pretrained(str(export_dir))
+                (export_dir / ONNX_EXPORT_INFO).write_text(json.dumps({"model": self.model_name}), encoding="utf-8")
+            if self.backend == "onnx-int8":
+                export_dynamic_quantized_onnx_model(exported, self.quantization_config, str(export_dir))
+
+        model_kwargs = {"file_name": file_name, "provider": "CPUExecutionProvider"}
+        if self.num_threads > 0:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.num_threads
+            model_kwargs["session_options"] = options
+        return SentenceTransformer(str(export_dir), device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        start = time.perf_counter()
+        # Same preprocessing as HuggingFaceEmbeddings
+        texts = [text.replace("\n", " ") for text in texts]
+
+        # Length-sorted bucketing: encode shortest-to-longest, then restore input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        sorted_texts = [texts[i] for i in order]
+
+        use_pool = self.num_workers > 1 and len(texts) >= self.min_docs_for_pool
+        try:
+            if use_pool:
+                vectors = self._encode_with_pool(sorted_texts)
+            else:
+                vectors = self.model.encode(
+                    sorted_texts,
+                    batch_size=self.batch_size,
+                    normalize_embeddings=self.normalize,
+                    show_progress_bar=False,
+                )
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException("Failed to embed documents", sys) from e
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        for position, index in enumerate(order):
+            embeddings[index] = vectors[position].tolist()
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "docs": len(texts),
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        logging.info(
+            f"Embedded {len(texts)} documents in {elapsed:.2f}s "
+            f"({self.last_stats['docs_per_sec']} docs/sec, batch_size={self.batch_size}, "
+            f"workers={self.num_workers if use_pool else 1})"
+        )
+        return embeddings
+
+    def _encode_with_pool(self, sorted_texts: List[str]):
+        pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.num_workers)
+        try:
+            # Contiguous chunks of the sorted list keep each worker's batches length-homogeneous
+            chunk_size = max(self.batch_size, len(sorted_texts) // (self.num_workers * 4) + 1)
+            return self.model.encode(
+                sorted_texts,
+                pool=pool,
+                batch_size=self.batch_size,
+                chunk_size=chunk_size,
+                normalize_embeddings=self.normalize,
+            )
+        finally:
+            self.model.stop_multi_process_pool(pool)
+
+    def embed_query(self, text: str) -> List[float]:
+        try:
+            with metrics.span("embed_query"):
+                vector = self.model.encode(
+                    text.replace("\n", " "),
+                    normalize_embeddings=self.normalize,
+                    show_progress_bar=False,
+                )
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException("Failed to embed query", sys) from e
+        return vector.tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in a single encoder call (same vectors as `embed_query`)."""
+        if not texts:
+            return []
+        try:
+            with metrics.span("embed_query"):
+                vectors = self.model.encode(
+                    [text.replace("\n", " ") for text in texts],
+                    batch_size=self.batch_size,
+                    normalize_embeddings=self.normalize,
+                    show_progress_bar=False,
+                )
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException("Failed to embed queries", sys) from e
+        return vectors.tolist()
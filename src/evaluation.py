@@ -0,0 +1,174 @@
+# src/evaluation.py
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+from src.hybrid_retriever import title_key
+from utils.logger import logging
+
+# Summary metrics compared against floors and baselines (higher is better)
+QUALITY_METRICS = ("recall_at_k", "mrr", "ndcg_at_k")
+
+
+def load_golden_queries(path: str) -> List[Dict[str, Any]]:
+    """
+    Golden queries from a JSON-lines file, one object per line:
+    {"id": ..., "query": ..., "relevant": [MAL_ID, ...]}.
+    """
+    queries: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not record.get("query") or not record.get("relevant"):
+                raise ValueError(f"{path}:{number}: a golden query needs 'query' and 'relevant'")
+            queries.append({
+                "id": str(record.get("id") or number),
+                "query": record["query"],
+                "relevant": [int(mal_id) for mal_id in record["relevant"]],
+            })
+    return queries
+
+
+def ranked_mal_ids(docs: Sequence[Any]) -> List[int]:
+    """Distinct MAL_IDs of retrieved chunks, in retrieval order."""
+    ranked: List[int] = []
+    for doc in docs:
+        key = title_key(doc)
+        if key.startswith("mal:"):
+            mal_id = int(float(key[len("mal:"):]))
+            if mal_id not in ranked:
+                ranked.append(mal_id)
+    return ranked
+
+
+def recall_at_k(ranked: Sequence[int], relevant: Sequence[int], k: int) -> float:
+    """Share of the relevant titles in the top k (out of at most k, so 1.0 is reachable)."""
+    hits = len(set(ranked[:k]) & set(relevant))
+    return hits / min(len(relevant), k)
+
+
+def reciprocal_rank(ranked: Sequence[int], relevant: Sequence[int], k: int) -> float:
+    for rank, mal_id in enumerate(ranked[:k], start=1):
+        if mal_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked: Sequence[int], relevant: Sequence[int], k: int) -> float:
+    """Binary-relevance nDCG: every relevant title counts 1, discounted by log2(rank + 1)."""
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, mal_id in enumerate(ranked[:k], start=1) if mal_id in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal
+
+
+def latency_percentiles(samples_s: Sequence[float]) -> Dict[str, float]:
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def evaluate_retriever(
+    retriever: BaseRetriever,
+    queries: List[Dict[str, Any]],
+    k: int,
+    fetch_k: Optional[int] = None,
+    warmup: int = 2,
+) -> Dict[str, Any]:
+    """
+    Runs every golden query through `retriever` and scores the distinct titles it returns.
+
+    :param k:       Titles scored per query.
+    :param fetch_k: Chunks requested per query (several chunks can share a title); default 3 * k.
+    :param warmup:  Untimed queries first (lazy model loading, cold caches).
+    :return: {"summary": {...}, "queries": [...]} with per-query metrics and latency.
+    """
+    fetch_k = fetch_k or 3 * k
+    for golden in queries[:warmup]:
+        retriever.invoke(golden["query"], k=fetch_k)
+
+    rows: List[Dict[str, Any]] = []
+    for golden in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(golden["query"], k=fetch_k)
+        seconds = time.perf_counter() - start
+
+        ranked = ranked_mal_ids(docs)[:k]
+        relevant = golden["relevant"]
+        rows.append({
+            "id": golden["id"],
+            "recall_at_k": round(recall_at_k(ranked, relevant, k), 4),
+            "mrr": round(reciprocal_rank(ranked, relevant, k), 4),
+            "ndcg_at_k": round(ndcg_at_k(ranked, relevant, k), 4),
+            "latency_ms": round(seconds * 1000, 3),
+            "retrieved": ranked,
+            "relevant": relevant,
+        })
+        if not rows[-1]["mrr"]:
+            logging.info(f"Golden query '{golden['id']}' missed: retrieved {ranked}, expected {relevant}")
+
+    summary = {name: round(sum(row[name] for row in rows) / len(rows), 4) for name in QUALITY_METRICS}
+    summary["latency"] = latency_percentiles([row["latency_ms"] / 1000 for row in rows])
+    return {"summary": summary, "queries": rows}
+
+
+def check_thresholds(
+    summary: Dict[str, Any],
+    min_quality: Dict[str, float],
+    max_p95_ms: float,
+    baseline: Optional[Dict[str, Any]] = None,
+    max_quality_drop: float = 0.0,
+    max_latency_increase: float = 0.0,
+) -> List[Dict[str, Any]]:
+    """
+    Compares a summary with absolute floors / a latency ceiling and, optionally, with a
+    baseline summary. Each check is {"check", "value", "limit", "passed"}.
+
+    :param min_quality:          Floors per quality metric (see `QUALITY_METRICS`); 0 skips one.
+    :param max_p95_ms:           p95 latency ceiling; 0 skips it.
+    :param baseline:             Summary of an earlier run (e.g. before a config change).
+    :param max_quality_drop:     Largest allowed drop of a quality metric below the baseline.
+    :param max_latency_increase: Largest allowed p95 slowdown over the baseline (0.25 = 25%).
+    """
+    p95 = summary["latency"]["p95_ms"]
+    checks = [
+        {"check": f"{name} >= floor", "value": summary[name], "limit": floor, "passed": summary[name] >= floor}
+        for name, floor in min_quality.items()
+        if floor > 0
+    ]
+    if max_p95_ms > 0:
+        checks.append({"check": "p95_ms <= ceiling", "value": p95, "limit": max_p95_ms, "passed": p95 <= max_p95_ms})
+
+    if baseline is not None:
+        for name in QUALITY_METRICS:
+            limit = round(baseline[name] - max_quality_drop, 4)
+            checks.append({
+                "check": f"{name} >= baseline - {max_quality_drop}",
+                "value": summary[name],
+                "limit": limit,
+                "passed": summary[name] >= limit,
+            })
+        limit = round(baseline["latency"]["p95_ms"] * (1 + max_latency_increase), 3)
+        checks.append({
+            "check": f"p95_ms <= baseline * {1 + max_latency_increase:g}",
+            "value": p95,
+            "limit": limit,
+            "passed": p95 <= limit,
+        })
+    return checks
+
+
+def read_report(path: str) -> Dict[str, Any]:
+    """Summary of a report written by `pipeline.eval_pipeline` (for use as a baseline)."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))["summary"]
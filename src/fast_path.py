@@ -0,0 +1,119 @@
+# src/fast_path.py
+import re
+from typing import Dict, List, Sequence
+
+from langchain_core.documents import Document
+
+from src.context import COMBINED_INFO_PATTERN, CONTENT_PREFIX
+from src.filters import normalize_genres
+from src.hybrid_retriever import title_key, tokenize
+
+# Words that carry no preference signal when matching a query against a synopsis
+STOPWORDS = frozenset(
+    "a an and anime are as at be but by for from has have i in is it its like me more my "
+    "of on or show shows similar something that the their them there they this to want "
+    "was watch with".split()
+)
+
+SUMMARY_SENTENCES = 2
+SUMMARY_MAX_WORDS = 60
+
+
+def _fields(doc: Document) -> Dict[str, str]:
+    text = doc.metadata.get("source") or doc.page_content
+    if text.startswith(CONTENT_PREFIX):
+        text = text[len(CONTENT_PREFIX):]
+    match = COMBINED_INFO_PATTERN.search(text)
+    if match is None:
+        return {"title": "", "overview": text.strip(), "genres": doc.metadata.get("genres", "")}
+    return {name: match.group(name).strip() for name in ("title", "overview", "genres")}
+
+
+def _query_terms(query: str) -> List[str]:
+    return [term for term in tokenize(query) if term not in STOPWORDS and len(term) > 2]
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def extractive_summary(overview: str, terms: Sequence[str]) -> str:
+    """
+    The `SUMMARY_SENTENCES` sentences sharing most words with the query (in their
+    original order), or the opening sentences when none do.
+    """
+    overview = re.sub(r"\s*\((Source|Written by)[^)]*\)\s*$", "", overview).strip()
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", overview) if s]
+    if not sentences:
+        return "not specified in the context"
+
+    wanted = set(terms)
+    overlap = [len(wanted & set(tokenize(sentence))) for sentence in sentences]
+    if any(overlap):
+        best = sorted(range(len(sentences)), key=lambda i: (-overlap[i], i))[:SUMMARY_SENTENCES]
+        chosen = [sentences[i] for i in sorted(best)]
+    else:
+        chosen = sentences[:SUMMARY_SENTENCES]
+
+    words = " ".join(chosen).split()
+    summary = " ".join(words[:SUMMARY_MAX_WORDS])
+    return summary if len(words) <= SUMMARY_MAX_WORDS else summary.rstrip(",;:") + "..."
+
+
+def explanation(query: str, genres: str, overview: str, requested_genres: Sequence[str] = ()) -> str:
+    """Why-it-matches line from genre overlap with the query/filters, else shared keywords."""
+    doc_genres = normalize_genres(genres)
+    compact_query = _compact(query)
+    matched = [g for g in doc_genres if g in requested_genres or (_compact(g) and _compact(g) in compact_query)]
+    if matched:
+        names = ", ".join(g.title() for g in matched)
+        return f"It covers the genres you asked for ({names})."
+
+    keywords = [t for t in dict.fromkeys(_query_terms(query)) if t in set(tokenize(overview))]
+    if keywords:
+        return f"Its synopsis mentions {', '.join(keywords[:4])} from your request."
+
+    listed = ", ".join(g.title() for g in doc_genres[:3])
+    return "It is one of the closest matches to your description" + (f" ({listed})." if listed else ".")
+
+
+def fast_recommendation(
+    query: str,
+    docs: List[Document],
+    max_titles: int = 3,
+    requested_genres: Sequence[str] = (),
+) -> str:
+    """
+    Templated answer in the same format the LLM is asked for: up to `max_titles`
+    distinct titles (retriever order) with extractive summaries and genre-overlap
+    explanations. No LLM call.
+
+    :param docs: Retrieved documents, most relevant first.
+    :param requested_genres: Genres the user filtered on (count as asked-for genres).
+    """
+    terms = _query_terms(query)
+    requested = normalize_genres(list(requested_genres))
+    entries: List[str] = []
+    seen = set()
+    for doc in docs:
+        key = title_key(doc)
+        if key in seen:
+            continue
+        seen.add(key)
+        fields = _fields(doc)
+        if not fields["title"]:
+            continue
+        entries.append(
+            f"{len(entries) + 1}. **Title**: {fields['title']}\n"
+            f"   **Summary**: {extractive_summary(fields['overview'], terms)}\n"
+            f"   **Why it matches**: {explanation(query, fields['genres'], fields['overview'], requested)}"
+        )
+        if len(entries) == max_titles:
+            break
+
+    if not entries:
+        return "I don't know: the context does not contain any suitable anime for this request."
+    answer = "\n\n".join(entries)
+    if len(entries) < max_titles:
+        answer += f"\n\nOnly {len(entries)} suitable anime were found in the provided context."
+    return answer
@@ -0,0 +1,180 @@
+# src/filters.py
+import sys
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.custom_exception import CustomException
+
+GENRE_SEPARATOR = "|"
+
+
+def normalize_genres(genres: Any) -> List[str]:
+    """
+    "Action, Sci-Fi , space" -> ["action", "sci-fi", "space"] (also accepts an iterable).
+    """
+    if genres is None:
+        return []
+    if isinstance(genres, str):
+        genres = genres.replace(GENRE_SEPARATOR, ",").split(",")
+    normalized = []
+    for genre in genres:
+        genre = str(genre).strip().lower()
+        if genre and genre != "nan" and genre not in normalized:
+            normalized.append(genre)
+    return normalized
+
+
+def encode_genres(genres: Any) -> str:
+    """Genre list as a single metadata string (vector store metadata must be scalar)."""
+    return GENRE_SEPARATOR.join(normalize_genres(genres))
+
+
+@dataclass(frozen=True)
+class RecommendationFilter:
+    """
+    Structured pre-filter applied before the similarity search.
+
+    :param include_genres: Every one of these genres must be present.
+    :param exclude_genres: None of these genres may be present.
+    :param min_score:      Minimum MAL score (anime without a score are excluded).
+    """
+
+    include_genres: Tuple[str, ...] = ()
+    exclude_genres: Tuple[str, ...] = ()
+    min_score: Optional[float] = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "include_genres", tuple(normalize_genres(self.include_genres)))
+        object.__setattr__(self, "exclude_genres", tuple(normalize_genres(self.exclude_genres)))
+
+    def is_empty(self) -> bool:
+        return not self.include_genres and not self.exclude_genres and self.min_score is None
+
+
+class FiltersUnavailable(ValueError):
+    """The vector store was built without the metadata a `RecommendationFilter` needs."""
+
+
+class GenreIndex:
+    """
+    Inverted index genre -> MAL_IDs, built from the stored document metadata.
+
+    Turns a `RecommendationFilter` into a vector store `where` clause on MAL_ID and
+    Score, so the candidate set shrinks before the similarity search.
+
+    :param filterable: False when the documents carry no MAL_ID metadata (a store built
+                       before filtering existed); every filter would then match nothing.
+    """
+
+    def __init__(self, postings: Dict[str, Set[int]], filterable: bool = True):
+        self.postings = postings
+        self.filterable = filterable
+
+    @classmethod
+    def from_metadatas(cls, metadatas: Iterable[Dict[str, Any]]) -> "GenreIndex":
+        postings: Dict[str, Set[int]] = {}
+        documents = with_ids = 0
+        for metadata in metadatas:
+            documents += 1
+            if not metadata or metadata.get("MAL_ID") is None:
+                continue
+            with_ids += 1
+            for genre in normalize_genres(metadata.get("genres")):
+                postings.setdefault(genre, set()).add(int(metadata["MAL_ID"]))
+        return cls(postings, filterable=with_ids > 0 or documents == 0)
+
+    @property
+    def genres(self) -> List[str]:
+        return sorted(self.postings)
+
+    def to_where(self, filters: Optional[RecommendationFilter]) -> Optional[Dict[str, Any]]:
+        """
+        :return: A Chroma-style `where` clause, or None when nothing is filtered.
+        :raises FiltersUnavailable: If the index is not `filterable`.
+        """
+        if filters is None or filters.is_empty():
+            return None
+        if not self.filterable:
+            raise FiltersUnavailable(
+                "The vector store has no MAL_ID/genres/Score metadata; rebuild it with "
+                "`python -m pipeline.build_pipeline` to use filters"
+            )
+
+        clauses: List[Dict[str, Any]] = []
+        excluded: Set[int] = set()
+        for genre in filters.exclude_genres:
+            excluded |= self.postings.get(genre, set())
+
+        if filters.include_genres:
+            allowed = set.intersection(*(self.postings.get(genre, set()) for genre in filters.include_genres))
+            allowed -= excluded
+            # MAL_IDs are positive, so [-1] matches nothing when no anime qualifies
+            clauses.append({"MAL_ID": {"$in": sorted(allowed) or [-1]}})
+        elif excluded:
+            clauses.append({"MAL_ID": {"$nin": sorted(excluded)}})
+
+        if filters.min_score is not None:
+            clauses.append({"Score": {"$gte": float(filters.min_score)}})
+
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+
+_RANGE_OPERATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def where_mask(where: Dict[str, Any], column: Callable[[str], np.ndarray]) -> np.ndarray:
+    """
+    Boolean row mask for a Chroma-style `where` clause (`$and`/`$or` of `$eq`, `$ne`,
+    `$gt`, `$gte`, `$lt`, `$lte`, `$in`, `$nin` on metadata fields). A row without the
+    field only matches `$ne` and `$nin`.
+
+    :param column: Returns one metadata field for every row as an object array (None
+                   where a row does not have it).
+    """
+    if "$and" in where:
+        return np.logical_and.reduce([where_mask(clause, column) for clause in where["$and"]])
+    if "$or" in where:
+        return np.logical_or.reduce([where_mask(clause, column) for clause in where["$or"]])
+
+    (key, condition), = where.items()
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    (op, operand), = condition.items()
+    values = column(key)
+
+    if op in ("$in", "$nin"):
+        # Set lookups: np.isin sorts object arrays, which is slow and mismatches mixed types
+        members = set(operand)
+        matched = np.fromiter((value in members for value in values), dtype=bool, count=len(values))
+        return matched if op == "$in" else ~matched
+    if op == "$eq":
+        return np.asarray(values == operand, dtype=bool)
+    if op == "$ne":
+        return np.asarray(values != operand, dtype=bool)
+    if op not in _RANGE_OPERATORS:
+        raise CustomException(f"Unsupported where operator: {op}", sys)
+    present = np.array([value is not None for value in values], dtype=bool)
+    mask = np.zeros(len(values), dtype=bool)
+    mask[present] = _RANGE_OPERATORS[op](values[present].astype(float), float(operand))
+    return mask
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    `where_mask` for a single document's metadata, for retrievers that filter outside
+    the vector store.
+    """
+    if not where:
+        return True
+
+    def column(key: str) -> np.ndarray:
+        values = np.empty(1, dtype=object)
+        values[0] = metadata.get(key)
+        return values
+
+    return bool(where_mask(where, column)[0])
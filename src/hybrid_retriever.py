@@ -0,0 +1,208 @@
+# src/hybrid_retriever.py
+import re
+import sys
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.filters import matches_where
+from utils import metrics
+from utils.logger import logging
+from utils.custom_exception import CustomException
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 over a list of texts, stored as per-term postings
+    (document ids + term frequencies as NumPy arrays), so scoring a query only
+    touches the documents that contain its terms.
+    """
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_count = len(texts)
+        lengths = np.zeros(len(texts), dtype=np.float32)
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+
+        avg_length = float(lengths.mean()) if len(texts) else 0.0
+        # Per-document length normalisation, precomputed once
+        self._norm = k1 * (1 - b + b * lengths / avg_length) if avg_length else lengths
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        self.idf = {
+            term: math.log(1 + (self.doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, (ids, _) in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.doc_count
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            scores[ids] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+        return scores
+
+    def search(self, query: str, n: int) -> List[Tuple[int, float]]:
+        """:return: Up to `n` (doc id, score) pairs with a positive score, best first."""
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+        ordered = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), float(scores[i])) for i in ordered]
+
+
+def title_key(doc: Document) -> str:
+    """Groups chunks of the same anime (MAL_ID, else the row the chunk came from)."""
+    if doc.metadata.get("MAL_ID") is not None:
+        return f"mal:{doc.metadata['MAL_ID']}"
+    return f"source:{doc.metadata.get('source') or doc.page_content}"
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses dense vector search with BM25 keyword search over the same chunks using
+    reciprocal rank fusion, then collapses the result to one chunk per title.
+
+      1. the vector retriever and BM25 each return `candidates` chunks,
+      2. each list is collapsed to titles (a title's rank is its best chunk's rank),
+      3. titles are scored by RRF: sum of 1 / (rrf_k + rank) over both lists,
+      4. the top `k` titles are returned, each as its best chunk, with the fused
+         score in `metadata["rrf_score"]`.
+
+    BM25 catches exact title and keyword queries ("like Cowboy Bebop") that dense
+    vectors match poorly; collapsing keeps several chunks of one long synopsis from
+    using up context slots.
+    """
+
+    vector_retriever: BaseRetriever
+    bm25: BM25Index
+    documents: List[Document]
+    k: int = 4
+    candidates: int = 20
+    rrf_k: int = 60
+
+    @classmethod
+    def from_documents(
+        cls, vector_retriever: BaseRetriever, documents: List[Document], **kwargs: Any
+    ) -> "HybridRetriever":
+        """
+        :param documents: Every chunk in the vector store (BM25 is built over their text).
+        """
+        try:
+            bm25 = BM25Index([doc.page_content for doc in documents])
+        except Exception as e:
+            raise CustomException("Failed to build BM25 index", sys) from e
+        logging.info(f"Built BM25 index over {len(documents)} chunks ({len(bm25.postings)} terms)")
+        return cls(vector_retriever=vector_retriever, bm25=bm25, documents=documents, **kwargs)
+
+    def keyword_search(self, query: str, n: int, where: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Top `n` BM25 chunks that satisfy `where`."""
+        hits = self.bm25.search(query, n if not where else len(self.bm25))
+        docs = [self.documents[i] for i, _ in hits if matches_where(self.documents[i].metadata, where)]
+        return docs[:n]
+
+    def fuse(
+        self,
+        query: str,
+        dense: List[Document],
+        k: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """
+        RRF over already-retrieved dense results and BM25 results for `query`.
+        (Separate from retrieval so batched callers can supply their own dense results.)
+        """
+        with metrics.span("keyword_search"):
+            sparse = self.keyword_search(query, self.candidates, where)
+
+        scores: Dict[str, float] = {}
+        best: Dict[str, Document] = {}
+        for ranked in (dense, sparse):
+            seen = set()
+            rank = 0
+            for doc in ranked:
+                key = title_key(doc)
+                if key in seen:
+                    continue
+                seen.add(key)
+                rank += 1
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+                # Dense results come first, so a title keeps its best vector chunk when it has one
+                best.setdefault(key, doc)
+
+        top = sorted(scores, key=scores.get, reverse=True)[: k or self.k]
+        return [
+            Document(
+                id=best[key].id,
+                page_content=best[key].page_content,
+                metadata={**best[key].metadata, "rrf_score": round(scores[key], 6)},
+            )
+            for key in top
+        ]
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        search_kwargs: Dict[str, Any] = {"k": self.candidates}
+        if filter is not None:
+            search_kwargs["filter"] = filter
+        dense = self.vector_retriever.invoke(query, **search_kwargs)
+        return self.fuse(query, dense, k=k, where=filter)
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        search_kwargs: Dict[str, Any] = {"k": self.candidates}
+        if filter is not None:
+            search_kwargs["filter"] = filter
+        dense = await self.vector_retriever.ainvoke(query, **search_kwargs)
+        return self.fuse(query, dense, k=k, where=filter)
+
+
+def documents_from_store(vector_store) -> List[Document]:
+    """Every chunk (text + metadata) of a LangChain Chroma store, for `HybridRetriever.from_documents`."""
+    try:
+        data = vector_store.get(include=["documents", "metadatas"])
+    except Exception as e:
+        raise CustomException("Failed to read documents from Chroma", sys) from e
+    return [
+        Document(id=doc_id, page_content=text, metadata=metadata or {})
+        for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+    ]
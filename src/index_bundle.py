@@ -0,0 +1,205 @@
+# src/index_bundle.py
+import sys
+import json
+import shutil
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.numpy_index import NumpyVectorIndex
+from utils.logger import logging
+from utils.custom_exception import CustomException
+from config.config import NUMPY_INDEX_RERANK_CANDIDATES
+
+# Bumped when the bundle layout changes; older readers refuse newer bundles
+BUNDLE_FORMAT = 1
+MANIFEST_FILE = "bundle.json"
+# Name of the bundle in a bundle root that `load_index_bundle` picks by default
+LATEST_FILE = "LATEST"
+NEIGHBOURS_FILE = "neighbours.npz"
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bundle_identity(model: str, splitter: Dict[str, int], embedding: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """
+    The settings a bundle's vectors depend on; a pipeline refuses a bundle built with others.
+
+    :param embedding: Inference backend and int8 quantization preset, if any (fp32 and
+                      int8 vectors of the same model are not interchangeable).
+    """
+    return {"format": BUNDLE_FORMAT, "model": model, "embedding": embedding, "splitter": splitter}
+
+
+def write_index_bundle(
+    root: str,
+    index: NumpyVectorIndex,
+    identity: Dict[str, Any],
+    source_path: str,
+    index_version: str,
+    dtype: str = "float32",
+    rerank: bool = True,
+    neighbours_path: Optional[str] = None,
+    keep: int = 2,
+) -> Path:
+    """
+    Writes `index` (plus, optionally, the neighbour table) as a self-describing bundle
+    `<root>/<version>/` and points `<root>/LATEST` at it. The version is derived from
+    the identity, the source-data hash, the chunk manifest version and the storage
+    dtype, so an unchanged build reproduces the same version.
+
+    :param identity:      `bundle_identity(...)` of the build.
+    :param source_path:   Data the vectors were built from (hashed into the manifest).
+    :param index_version: Version of the vector store the index was copied from.
+    :param keep:          Bundles kept in `root` (the newest ones, including this one).
+    :return: The bundle directory.
+    """
+    try:
+        root_dir = Path(root)
+        root_dir.mkdir(parents=True, exist_ok=True)
+        source = {"file": Path(source_path).name, "sha256": file_sha256(Path(source_path))}
+        version = hashlib.sha256(
+            json.dumps([identity, source["sha256"], index_version, dtype, rerank], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        # Written under a temporary name and renamed, so readers never see half a bundle
+        staging = root_dir / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        index.save(str(staging), dtype=dtype, rerank=rerank)
+        if neighbours_path and Path(neighbours_path).exists():
+            shutil.copyfile(neighbours_path, staging / NEIGHBOURS_FILE)
+
+        files = {
+            path.name: {"sha256": file_sha256(path), "bytes": path.stat().st_size}
+            for path in sorted(staging.iterdir())
+        }
+        manifest = {
+            **identity,
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "source": source,
+            "index_version": index_version,
+            "dtype": dtype,
+            "rerank": rerank,
+            "count": len(index),
+            "files": files,
+        }
+        with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        bundle_dir = root_dir / version
+        shutil.rmtree(bundle_dir, ignore_errors=True)
+        staging.rename(bundle_dir)
+        latest_tmp = root_dir / f"{LATEST_FILE}.tmp"
+        latest_tmp.write_text(version + "\n", encoding="utf-8")
+        latest_tmp.replace(root_dir / LATEST_FILE)
+
+        bundles = sorted(
+            (p for p in root_dir.iterdir() if (p / MANIFEST_FILE).exists() and p != bundle_dir),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in bundles[max(keep - 1, 0):]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+        logging.info(f"Wrote index bundle {version} ({len(index)} vectors, {dtype}) to {bundle_dir}")
+        return bundle_dir
+    except Exception as e:
+        raise CustomException(f"Failed to write index bundle to {root}", sys) from e
+
+
+def resolve_bundle_dir(path: str) -> Path:
+    """A bundle directory itself, or the bundle named by `LATEST` in a bundle root."""
+    path = Path(path)
+    if (path / MANIFEST_FILE).exists():
+        return path
+    latest = path / LATEST_FILE
+    if latest.exists():
+        return path / latest.read_text(encoding="utf-8").strip()
+    raise CustomException(f"No index bundle found at {path}", sys)
+
+
+def read_bundle_manifest(path: str) -> Dict[str, Any]:
+    with open(resolve_bundle_dir(path) / MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_bundle(
+    bundle_dir: Path,
+    manifest: Dict[str, Any],
+    identity: Dict[str, Any],
+    source_path: Optional[str] = None,
+    checksums: bool = True,
+) -> None:
+    """
+    :param source_path: Raw data the running app expects the vectors to come from; the
+                        bundle must have been built from a file of that name and content.
+                        None skips the source check.
+    :raises CustomException: If the bundle was built for another format, model or
+        splitter, from different (or missing) source data, or if a file is missing,
+        truncated or (with `checksums`) corrupted.
+    """
+    problems = [
+        f"{key} is {manifest.get(key)!r}, expected {value!r}"
+        for key, value in identity.items()
+        if manifest.get(key) != value
+    ]
+
+    if source_path is not None:
+        source = Path(source_path)
+        if source.name != manifest["source"]["file"]:
+            problems.append(f"built from {manifest['source']['file']}, expected {source.name}")
+        elif not source.exists():
+            problems.append(f"source data {source_path} is missing")
+        elif file_sha256(source) != manifest["source"]["sha256"]:
+            problems.append(f"source data {source_path} changed since the bundle was built")
+
+    for name, expected in manifest["files"].items():
+        path = bundle_dir / name
+        if not path.exists():
+            problems.append(f"{name} is missing")
+        elif path.stat().st_size != expected["bytes"]:
+            problems.append(f"{name} has {path.stat().st_size} bytes, expected {expected['bytes']}")
+        elif checksums and file_sha256(path) != expected["sha256"]:
+            problems.append(f"{name} checksum mismatch")
+
+    if problems:
+        raise CustomException(f"Refusing index bundle {bundle_dir}: " + "; ".join(problems), sys)
+
+
+def load_index_bundle(
+    path: str,
+    identity: Dict[str, Any],
+    source_path: Optional[str] = None,
+    checksums: bool = True,
+    rerank_candidates: int = NUMPY_INDEX_RERANK_CANDIDATES,
+):
+    """
+    Validates a bundle and memory-maps its index.
+
+    :param path:        Bundle directory or bundle root (uses `LATEST`).
+    :param identity:    `bundle_identity(...)` of the running configuration.
+    :param source_path: Raw data the running app expects the vectors to come from (see
+                        `verify_bundle`).
+    :param checksums:   Also compare SHA-256 checksums (reads every file once); sizes
+                        are always checked.
+    :return: (NumpyVectorIndex, manifest, bundle directory).
+    """
+    bundle_dir = resolve_bundle_dir(path)
+    try:
+        with open(bundle_dir / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception as e:
+        raise CustomException(f"Failed to read index bundle manifest in {bundle_dir}", sys) from e
+
+    verify_bundle(bundle_dir, manifest, identity, source_path=source_path, checksums=checksums)
+    index = NumpyVectorIndex.load(str(bundle_dir), mmap=True, rerank_candidates=rerank_candidates)
+    logging.info(f"Loaded index bundle {manifest['version']} from {bundle_dir}")
+    return index, manifest, bundle_dir
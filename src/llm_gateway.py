@@ -0,0 +1,364 @@
+# src/llm_gateway.py
+import json
+import time
+import random
+import hashlib
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from utils import metrics
+from utils.logger import logging
+from config.config import (
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_TIMEOUT,
+    LLM_COALESCE_ENABLED,
+    LLM_RATE_LIMIT_RPS,
+    LLM_RATE_LIMIT_BURST,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+)
+
+# Upstream statuses worth retrying: rate limited, or a transient server-side failure
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+_http_lock = threading.Lock()
+_http_clients: Optional[Tuple[httpx.Client, httpx.AsyncClient]] = None
+
+
+def shared_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Process-wide keep-alive connection pools for the LLM client (sync and async), so
+    every AnimeRecommender reuses warm TLS connections instead of opening its own.
+    """
+    global _http_clients
+    with _http_lock:
+        if _http_clients is None:
+            limits = httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_KEEPALIVE_CONNECTIONS,
+            )
+            _http_clients = (
+                httpx.Client(limits=limits, timeout=LLM_HTTP_TIMEOUT),
+                httpx.AsyncClient(limits=limits, timeout=LLM_HTTP_TIMEOUT),
+            )
+        return _http_clients
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second refill up to `capacity`.
+    `acquire` waits for a token (rate 0 = unlimited).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Takes a token (possibly going into debt) and returns how long to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self) -> Tuple[bool, float]:
+        """Non-blocking: (acquired, seconds until a token is available)."""
+        if self.rate <= 0:
+            return True, 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, 0.0
+            return False, (1 - self._tokens) / self.rate
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self) -> float:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (e.g. per user), for rejecting clients that exceed
+    `per_minute` requests with bursts of up to `burst`. Buckets of the least recently
+    seen keys are dropped beyond `max_keys`.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def try_acquire(self, key: str) -> Tuple[bool, float]:
+        """:return: (allowed, seconds until the key may retry)."""
+        if not self.enabled:
+            return True, 0.0
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.try_acquire()
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, transient 5xx and connection/timeout errors (any HTTP client)."""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "APIConnectionError",
+        "APITimeoutError",
+    )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the upstream's Retry-After header, if it sent one."""
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _Flight:
+    """One in-flight streamed LLM call whose chunks are replayed to every subscriber."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+
+    def replay(self) -> Iterator[str]:
+        index = 0
+        while True:
+            with self.condition:
+                while index == len(self.chunks) and not self.done:
+                    self.condition.wait()
+                pending = self.chunks[index:]
+                finished, error = self.done, self.error
+            index += len(pending)
+            yield from pending
+            if finished and index == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class LLMGateway:
+    """
+    Sits between the recommender and the chat model:
+
+      - coalescing: concurrent calls with the same key (prompt inputs) share one
+        upstream call and all receive its answer (also for streamed answers),
+      - a token bucket (`rate` requests/s, bursts of `burst`) paces upstream calls,
+      - retryable failures (429, 5xx, connection errors) are retried with exponential
+        backoff and jitter, honouring the upstream's Retry-After.
+
+    Streams are only retried before their first chunk has been delivered.
+    """
+
+    def __init__(
+        self,
+        coalesce: bool = LLM_COALESCE_ENABLED,
+        rate: float = LLM_RATE_LIMIT_RPS,
+        burst: int = LLM_RATE_LIMIT_BURST,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+    ):
+        self.coalesce = coalesce
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._streams: Dict[str, _Flight] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * (0.5 + random.random() / 2)
+        return max(delay, min(retry_after(error) or 0.0, self.backoff_max))
+
+    def _should_retry(self, attempt: int, error: BaseException) -> bool:
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+        metrics.inc("anime_llm_retries_total", status=str(_status_code(error) or type(error).__name__))
+        return True
+
+    def _call_with_retries(self, call: Callable[[], str]) -> str:
+        for attempt in range(self.max_retries + 1):
+            with metrics.span("llm_rate_limit"):
+                self.bucket.acquire()
+            try:
+                return call()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                delay = self._backoff(attempt, e)
+                logging.warning(f"LLM call failed ({e!r}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def _acall_with_retries(self, call: Callable[[], Awaitable[str]]) -> str:
+        for attempt in range(self.max_retries + 1):
+            with metrics.span("llm_rate_limit"):
+                await self.bucket.aacquire()
+            try:
+                return await call()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                delay = self._backoff(attempt, e)
+                logging.warning(f"LLM call failed ({e!r}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def invoke(self, key: str, call: Callable[[], str]) -> str:
+        """
+        :param key:  Identity of the request (e.g. a hash of the prompt inputs).
+        :param call: Makes the upstream call; run once per group of concurrent callers.
+        """
+        if not self.coalesce:
+            return self._call_with_retries(call)
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            metrics.inc("anime_llm_coalesced_total")
+            return future.result()
+
+        try:
+            future.set_result(self._call_with_retries(call))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result()
+
+    async def ainvoke(self, key: str, call: Callable[[], Awaitable[str]]) -> str:
+        """Async `invoke`; coalesces callers on the same event loop."""
+        if not self.coalesce:
+            return await self._acall_with_retries(call)
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._async_calls.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._acall_with_retries(call))
+            self._async_calls[flight_key] = task
+            task.add_done_callback(lambda _: self._async_calls.pop(flight_key, None))
+        else:
+            metrics.inc("anime_llm_coalesced_total")
+        # A caller that is cancelled (e.g. times out) does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, start: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Streaming `invoke`: the first caller drives `start()`; concurrent callers with
+        the same key replay its chunks as they arrive.
+        """
+        if not self.coalesce:
+            yield from self._stream_with_retries(start)
+            return
+
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Flight()
+        if not leader:
+            metrics.inc("anime_llm_coalesced_total")
+            yield from flight.replay()
+            return
+
+        # The leader produces in the background so a slow or abandoned consumer
+        # (e.g. a closed browser tab) never stalls the other subscribers.
+        def produce() -> None:
+            try:
+                for chunk in self._stream_with_retries(start):
+                    with flight.condition:
+                        flight.chunks.append(chunk)
+                        flight.condition.notify_all()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._streams.pop(key, None)
+                with flight.condition:
+                    flight.done = True
+                    flight.condition.notify_all()
+
+        # Run in the caller's context so LLM spans and token counts land in its request trace
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(produce,), name="llm-stream", daemon=True).start()
+        yield from flight.replay()
+
+    def _stream_with_retries(self, start: Callable[[], Iterator[str]]) -> Iterator[str]:
+        for attempt in range(self.max_retries + 1):
+            with metrics.span("llm_rate_limit"):
+                self.bucket.acquire()
+            delivered = False
+            try:
+                for chunk in start():
+                    delivered = True
+                    yield chunk
+                return
+            except Exception as e:
+                if delivered or not self._should_retry(attempt, e):
+                    raise
+                delay = self._backoff(attempt, e)
+                logging.warning(f"LLM stream failed ({e!r}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for coalescing: identical prompt inputs give identical keys."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
@@ -0,0 +1,161 @@
+# src/neighbours.py
+import re
+import sys
+import difflib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from src.context import COMBINED_INFO_PATTERN
+from utils.logger import logging
+from utils.custom_exception import CustomException
+
+
+def normalize_title(title: str) -> str:
+    """"Cowboy Bebop: The Movie!" -> "cowboy bebop the movie"."""
+    return " ".join(re.findall(r"\w+", title.lower()))
+
+
+class NeighbourTable:
+    """
+    Precomputed "more like this" table: for every anime (MAL_ID), its `top_n` most
+    similar anime by cosine similarity of their mean chunk embeddings.
+
+    Stored as one `.npz` with int32 MAL_IDs and neighbour ids plus float16 scores, so
+    a lookup is a dictionary access and a row slice - no encoder, vector store or LLM.
+    """
+
+    def __init__(self, mal_ids: np.ndarray, titles: List[str], neighbours: np.ndarray, scores: np.ndarray):
+        """
+        :param mal_ids:    (n,) int32 MAL_IDs.
+        :param titles:     n titles, same order.
+        :param neighbours: (n, top_n) int32 row indices into `mal_ids`, most similar first.
+        :param scores:     (n, top_n) float16 cosine similarities.
+        """
+        self.mal_ids = mal_ids
+        self.titles = list(titles)
+        self.neighbours = neighbours
+        self.scores = scores
+        self._row_by_id: Dict[int, int] = {int(mal_id): row for row, mal_id in enumerate(mal_ids)}
+        self._row_by_title: Dict[str, int] = {}
+        for row, title in enumerate(self.titles):
+            self._row_by_title.setdefault(normalize_title(title), row)
+        # Per instance, so the cache does not keep discarded tables alive
+        self._fuzzy_row = lru_cache(maxsize=4096)(self._fuzzy_match)
+
+    def __len__(self) -> int:
+        return len(self.mal_ids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        metadatas: List[Dict[str, Any]],
+        top_n: int = 20,
+        block_rows: int = 1024,
+    ) -> "NeighbourTable":
+        """
+        :param vectors:    (n_chunks, dim) normalized chunk embeddings.
+        :param metadatas:  Chunk metadata with MAL_ID (and `source` for the title).
+        :param top_n:      Neighbours kept per anime.
+        :param block_rows: Anime scored per matrix multiplication; peak extra memory is
+                           block_rows x n_anime float32 instead of n_anime^2.
+        """
+        rows: Dict[int, int] = {}
+        titles: List[str] = []
+        for metadata in metadatas:
+            mal_id = metadata.get("MAL_ID")
+            if mal_id is None or int(mal_id) in rows:
+                continue
+            rows[int(mal_id)] = len(rows)
+            match = COMBINED_INFO_PATTERN.search(str(metadata.get("source", "")))
+            titles.append(match.group("title").strip() if match else str(mal_id))
+        if not rows:
+            raise CustomException("No chunks with a MAL_ID; cannot build neighbour table", sys)
+
+        # Mean of each anime's chunk vectors, re-normalized
+        chunk_rows = np.array(
+            [rows.get(int(m["MAL_ID"]), -1) if m.get("MAL_ID") is not None else -1 for m in metadatas]
+        )
+        keep = chunk_rows >= 0
+        items = np.zeros((len(rows), vectors.shape[1]), dtype=np.float32)
+        np.add.at(items, chunk_rows[keep], np.asarray(vectors, dtype=np.float32)[keep])
+        items /= np.maximum(np.linalg.norm(items, axis=1, keepdims=True), 1e-12)
+
+        n = len(items)
+        top_n = min(top_n, n - 1)
+        neighbours = np.zeros((n, max(top_n, 0)), dtype=np.int32)
+        scores = np.zeros((n, max(top_n, 0)), dtype=np.float16)
+        if top_n > 0:
+            for start in range(0, n, block_rows):
+                block = items[start:start + block_rows] @ items.T
+                block[np.arange(len(block)), np.arange(start, start + len(block))] = -np.inf  # not itself
+                candidates = np.argpartition(-block, top_n - 1, axis=1)[:, :top_n]
+                candidate_scores = np.take_along_axis(block, candidates, axis=1)
+                order = np.argsort(-candidate_scores, axis=1)
+                neighbours[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+                scores[start:start + len(block)] = np.take_along_axis(candidate_scores, order, axis=1)
+
+        logging.info(f"Built neighbour table: {n} anime x top {top_n}")
+        return cls(np.fromiter(rows, dtype=np.int32, count=len(rows)), titles, neighbours, scores)
+
+    def save(self, path: str) -> None:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            np.savez(
+                path,
+                mal_ids=self.mal_ids.astype(np.int32),
+                titles=np.array(self.titles, dtype=str),
+                neighbours=self.neighbours.astype(np.int32),
+                scores=self.scores.astype(np.float16),
+            )
+            logging.info(f"Saved neighbour table ({len(self)} anime) to {path}")
+        except Exception as e:
+            raise CustomException(f"Failed to save neighbour table to {path}", sys) from e
+
+    @classmethod
+    def load(cls, path: str) -> "NeighbourTable":
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                table = cls(data["mal_ids"], data["titles"].tolist(), data["neighbours"], data["scores"])
+        except Exception as e:
+            raise CustomException(f"Failed to load neighbour table from {path}", sys) from e
+        logging.info(f"Loaded neighbour table ({len(table)} anime) from {path}")
+        return table
+
+    def _fuzzy_match(self, normalized: str, cutoff: float) -> Optional[int]:
+        match = difflib.get_close_matches(normalized, self._row_by_title.keys(), n=1, cutoff=cutoff)
+        return self._row_by_title[match[0]] if match else None
+
+    def find(self, title_or_id: Union[int, str], cutoff: float = 0.6) -> Optional[int]:
+        """
+        Row of an anime given its MAL_ID (an int) or title (a str, even an all-digit
+        one such as "86"). Titles match exactly after normalization, else by closest
+        fuzzy match (difflib ratio >= `cutoff`).
+        """
+        if isinstance(title_or_id, (int, np.integer)):
+            return self._row_by_id.get(int(title_or_id))
+        normalized = normalize_title(str(title_or_id))
+        row = self._row_by_title.get(normalized)
+        if row is None and normalized:
+            row = self._fuzzy_row(normalized, cutoff)
+        return row
+
+    def similar_to(self, title_or_id: Union[int, str], n: int = 10, cutoff: float = 0.6) -> Dict[str, Any]:
+        """
+        :return: {"mal_id", "title", "similar": [{"mal_id", "title", "score"}, ...]}.
+        """
+        row = self.find(title_or_id, cutoff)
+        if row is None:
+            raise KeyError(f"No anime matches {title_or_id!r}")
+        similar = [
+            {
+                "mal_id": int(self.mal_ids[neighbour]),
+                "title": self.titles[neighbour],
+                "score": round(float(score), 4),
+            }
+            for neighbour, score in zip(self.neighbours[row, :n], self.scores[row, :n])
+        ]
+        return {"mal_id": int(self.mal_ids[row]), "title": self.titles[row], "similar": similar}
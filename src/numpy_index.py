@@ -0,0 +1,292 @@
+# src/numpy_index.py
+import sys
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables.config import run_in_executor
+
+from src.filters import where_mask
+from utils.logger import logging
+from utils import metrics
+from utils.custom_exception import CustomException
+from config.config import NUMPY_INDEX_RERANK_CANDIDATES
+
+
+class NumpyVectorIndex:
+    """
+    Exact in-process vector index: a (n, dim) matrix of normalized embeddings plus
+    parallel lists of ids, texts and metadata.
+
+    On disk it is a `vectors.npy` matrix (float32 or float16) that is memory-mapped on
+    load, and an `index.json` sidecar with the ids, texts and metadata. Search is one
+    matrix-vector product followed by `argpartition`, so it needs no database at all.
+
+    Compact storage: the matrix can be float16, or int8 with a per-vector scale
+    (`scales.npy`, v ~= int8 * scale), for a half / quarter sized first-pass scan. An
+    optional memory-mapped float32 copy (`vectors_fp32.npy`) then re-scores only the
+    top `rerank_candidates` rows exactly, so rankings match float32 search while the
+    full-precision pages stay on disk.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    SCALES_FILE = "scales.npy"
+    RERANK_FILE = "vectors_fp32.npy"
+    SIDECAR_FILE = "index.json"
+    DTYPES = ("float32", "float16", "int8")
+
+    # Rows per block when scoring a float16 matrix (upcast block-wise to keep BLAS speed)
+    BLOCK_ROWS = 8192
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        scales: Optional[np.ndarray] = None,
+        rerank_vectors: Optional[np.ndarray] = None,
+        rerank_candidates: int = NUMPY_INDEX_RERANK_CANDIDATES,
+    ):
+        """
+        :param vectors:   (n, dim) float32/float16 embeddings, or int8 codes with `scales`.
+        :param scales:    (n,) float32 per-vector scales of an int8 `vectors` matrix.
+        :param rerank_vectors: Optional (n, dim) float32 embeddings used to re-score the
+                          first-pass candidates of a reduced-precision `vectors` matrix.
+        :param rerank_candidates: First-pass candidates re-scored per query (0 = no re-rank).
+        """
+        if not (len(vectors) == len(ids) == len(texts) == len(metadatas)):
+            raise ValueError("vectors, ids, texts and metadatas must have the same length")
+        if vectors.dtype == np.int8 and scales is None:
+            raise ValueError("int8 vectors need per-vector scales")
+        self.vectors = vectors
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.scales = scales
+        self.rerank_vectors = rerank_vectors
+        self.rerank_candidates = rerank_candidates
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_chroma(cls, vector_store) -> "NumpyVectorIndex":
+        """Copy every stored embedding, text and metadata out of a LangChain Chroma store."""
+        try:
+            data = vector_store.get(include=["embeddings", "documents", "metadatas"])
+            vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        except Exception as e:
+            raise CustomException("Failed to read embeddings from Chroma", sys) from e
+
+        return cls(
+            vectors=vectors,
+            ids=list(data["ids"]),
+            texts=list(data["documents"]),
+            metadatas=[metadata or {} for metadata in data["metadatas"]],
+        )
+
+    @staticmethod
+    def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric per-vector int8 quantization: returns (codes, scales) with v ~= codes * scale."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    def float32_vectors(self) -> np.ndarray:
+        """Full-precision matrix (the re-rank copy if present, else upcast/dequantized)."""
+        if self.rerank_vectors is not None:
+            return np.asarray(self.rerank_vectors, dtype=np.float32)
+        vectors = np.asarray(self.vectors, dtype=np.float32)
+        return vectors * self.scales[:, None] if self.scales is not None else vectors
+
+    def save(self, directory: str, dtype: str = "float32", rerank: bool = True) -> None:
+        """
+        :param directory: Output directory (created if needed).
+        :param dtype:     "float32", "float16" (half the size) or "int8" (a quarter, plus
+                          one float32 scale per vector); scores are computed in float32.
+        :param rerank:    For float16/int8, also store the float32 matrix used to re-rank
+                          the first-pass candidates.
+        """
+        if dtype not in self.DTYPES:
+            raise CustomException(f"Unsupported vector dtype: {dtype}", sys)
+
+        try:
+            out = Path(directory)
+            out.mkdir(parents=True, exist_ok=True)
+            full = self.float32_vectors()
+            rerank = rerank and dtype != "float32"
+            for stale in (self.SCALES_FILE, self.RERANK_FILE):
+                (out / stale).unlink(missing_ok=True)
+
+            if dtype == "int8":
+                codes, scales = self.quantize_int8(full)
+                np.save(out / self.VECTORS_FILE, codes)
+                np.save(out / self.SCALES_FILE, scales)
+            else:
+                np.save(out / self.VECTORS_FILE, np.ascontiguousarray(full, dtype=dtype))
+            if rerank:
+                np.save(out / self.RERANK_FILE, np.ascontiguousarray(full))
+
+            with open(out / self.SIDECAR_FILE, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "dtype": dtype,
+                        "rerank": rerank,
+                        "count": len(self.ids),
+                        "dim": int(full.shape[1]) if len(self.ids) else 0,
+                        "ids": self.ids,
+                        "texts": self.texts,
+                        "metadatas": self.metadatas,
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            logging.info(
+                f"Saved NumPy vector index ({len(self.ids)} vectors, {dtype}"
+                f"{' + float32 re-rank copy' if rerank else ''}) to {out}"
+            )
+        except Exception as e:
+            raise CustomException(f"Failed to save NumPy vector index to {directory}", sys) from e
+
+    @classmethod
+    def load(
+        cls, directory: str, mmap: bool = True, rerank_candidates: int = NUMPY_INDEX_RERANK_CANDIDATES
+    ) -> "NumpyVectorIndex":
+        """
+        :param mmap: Memory-map the vector matrices instead of reading them into memory.
+        :param rerank_candidates: First-pass candidates re-scored in float32 when the index
+                                  has a re-rank copy (0 = use first-pass scores only).
+        """
+        try:
+            path = Path(directory)
+            mmap_mode = "r" if mmap else None
+            vectors = np.load(path / cls.VECTORS_FILE, mmap_mode=mmap_mode)
+            scales = np.load(path / cls.SCALES_FILE) if (path / cls.SCALES_FILE).exists() else None
+            rerank_vectors = (
+                np.load(path / cls.RERANK_FILE, mmap_mode=mmap_mode) if (path / cls.RERANK_FILE).exists() else None
+            )
+            with open(path / cls.SIDECAR_FILE, encoding="utf-8") as f:
+                sidecar = json.load(f)
+        except Exception as e:
+            raise CustomException(f"Failed to load NumPy vector index from {directory}", sys) from e
+
+        logging.info(
+            f"Loaded NumPy vector index ({sidecar['count']} vectors, {sidecar['dtype']}"
+            f"{', float32 re-rank' if rerank_vectors is not None else ''}) from {directory}"
+        )
+        return cls(
+            vectors,
+            sidecar["ids"],
+            sidecar["texts"],
+            sidecar["metadatas"],
+            scales=scales,
+            rerank_vectors=rerank_vectors,
+            rerank_candidates=rerank_candidates,
+        )
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Dot-product scores of shape (n_queries, n)."""
+        if self.vectors.dtype == np.float32:
+            return queries @ np.asarray(self.vectors).T
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + self.BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def _rerank(self, query: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Exact float32 top-k among the best `rerank_candidates` first-pass rows."""
+        candidates = [row for row, _ in self._top_k(scores, max(k, self.rerank_candidates))]
+        if not candidates:
+            return []
+        rows = np.sort(np.asarray(candidates))  # ascending rows read the memory map sequentially
+        exact = np.asarray(self.rerank_vectors[rows], dtype=np.float32) @ query
+        order = np.argsort(-exact)[:k]
+        return [(int(rows[i]), float(exact[i])) for i in order]
+
+    def _column(self, key: str) -> np.ndarray:
+        if key not in self._columns:
+            self._columns[key] = np.array([metadata.get(key) for metadata in self.metadatas], dtype=object)
+        return self._columns[key]
+
+    def where_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a Chroma-style `where` clause (see `src.filters.where_mask`)."""
+        return where_mask(where, self._column)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ordered = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), float(scores[i])) for i in ordered]
+
+    def search(self, query_vector, k: int = 4, where: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """
+        :param where: Optional Chroma-style metadata filter applied before ranking.
+        :return: (row, cosine score) pairs, best first.
+        """
+        return self.search_batch([query_vector], k, where)[0]
+
+    def search_batch(
+        self, query_vectors, k: int = 4, where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """Top-k for several queries with one matrix-matrix product."""
+        if len(self) == 0:
+            return [[] for _ in query_vectors]
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        scores = self._scores(queries)
+        if where:
+            scores[:, ~self.where_mask(where)] = -np.inf
+        if self.rerank_vectors is not None and self.rerank_candidates > 0:
+            return [self._rerank(query, row, k) for query, row in zip(queries, scores)]
+        return [self._top_k(row, k) for row in scores]
+
+    def document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+
+class NumpyRetriever(BaseRetriever):
+    """LangChain retriever over a `NumpyVectorIndex`; embeds the query with `embedding`."""
+
+    index: NumpyVectorIndex
+    embedding: Embeddings
+    k: int = 4
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        vector = self.embedding.embed_query(query)
+        with metrics.span("vector_search"):
+            hits = self.index.search(vector, k or self.k, where=filter)
+        return [self.index.document(row) for row, _ in hits]
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        # The default async path drops the per-call search arguments
+        return await run_in_executor(
+            None, self._get_relevant_documents, query, run_manager=run_manager.get_sync(), k=k, filter=filter
+        )
@@ -1,7 +1,8 @@
+import hashlib
+
 from langchain_core.prompts.prompt import PromptTemplate
 
-def get_anime_prompt():
-    template = """
+ANIME_PROMPT_TEMPLATE = """
 You are an expert anime recommender.
 
 Your job:
@@ -38,4 +39,10 @@ Now provide your answer in this exact format:
 If there are fewer than three suitable anime, only list the ones you can support from the CONTEXT and then add a final line like:
 "Only N suitable anime were found in the provided context."
 """
-    return PromptTemplate(template=template, input_variables=["context", "question"])
+
+# Changes whenever the template text changes; used to key cached answers
+PROMPT_VERSION = hashlib.sha256(ANIME_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+
+def get_anime_prompt():
+    return PromptTemplate(template=ANIME_PROMPT_TEMPLATE, input_variables=["context", "question"])
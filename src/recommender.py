@@ -1,81 +1,303 @@
 
 
 import sys
-from typing import Tuple, List
+import time
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional
 
-from langchain_classic.chains import RetrievalQA
 from langchain_groq import ChatGroq
 from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.retrievers import BaseRetriever
 
+from src.cache import AnswerCache
+from src.context import ContextBuilder
+from src.llm_gateway import LLMGateway, request_key, shared_http_clients
 from src.prompt_template import get_anime_prompt
+from utils import metrics
 from utils.custom_exception import CustomException
 from utils.logger import logging
 
 
+def create_llm(
+    api_key: str,
+    model_name: str,
+    temperature: float = 0.0,
+    base_url: Optional[str] = None,
+    max_retries: int = 0,
+) -> BaseChatModel:
+    """
+    The ChatGroq client, on the process-wide keep-alive connection pools.
+
+    :param max_retries: Retries inside the Groq client; 0 when an LLMGateway retries instead.
+    """
+    try:
+        http_client, http_async_client = shared_http_clients()
+        return ChatGroq(
+            api_key=api_key,
+            model=model_name,
+            temperature=temperature,
+            base_url=base_url,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
+        )
+    except Exception as e:
+        raise CustomException("Failed to initialize ChatGroq LLM", sys) from e
+
+
 class AnimeRecommender:
     """
-    High-level facade around a RetrievalQA chain that uses:
+    High-level facade around a retrieve-then-generate ("stuff") chain that uses:
       - Chroma (or any retriever) for semantic search over anime data
       - ChatGroq as the LLM
       - A custom prompt for anime recommendations
+      - An optional AnswerCache in front of the LLM
 
     Usage:
         recommender = AnimeRecommender(retriever, api_key=..., model_name="mixtral-8x7b-32768")
-        answer, sources = recommender.get_recommendation("cozy slice of life with found family")
+        answer = recommender.get_recommendation("cozy slice of life with found family")
     """
 
-    def __init__(self, retriever: BaseRetriever, api_key: str, model_name: str, temperature: float = 0.0):
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        api_key: str,
+        model_name: str,
+        temperature: float = 0.0,
+        answer_cache: Optional[AnswerCache] = None,
+        llm: Optional[BaseChatModel] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        gateway: Optional[LLMGateway] = None,
+        base_url: Optional[str] = None,
+    ):
         """
         :param retriever: Any LangChain retriever (e.g. Chroma().as_retriever()).
         :param api_key:   GROQ API key.
         :param model_name:Groq model id (e.g. "mixtral-8x7b-32768").
         :param temperature:LLM temperature; 0.0 for deterministic answers.
+        :param answer_cache:Optional cache of answers keyed on retrieved docs + prompt + query.
+        :param llm:       Optional pre-built chat model used instead of ChatGroq (e.g. a local stub).
+        :param context_builder:Optional deduplicating, token-budgeted context assembly; without
+                          it every retrieved chunk is pasted verbatim.
+        :param gateway:   Optional LLMGateway that coalesces identical concurrent calls and
+                          rate-limits/retries upstream calls.
+        :param base_url:  Optional Groq API endpoint override (e.g. a local mock server).
         """
         self.retriever = retriever
+        self.answer_cache = answer_cache
+        self.context_builder = context_builder
+        self.gateway = gateway
 
-        try:
-            self.llm = ChatGroq(
-                api_key=api_key,
-                model=model_name,
-                temperature=temperature,
-            )
-        except Exception as e:
-            raise CustomException("Failed to initialize ChatGroq LLM", sys) from e
+        # With a gateway, retries go through its rate limiter and backoff instead
+        self.llm = llm if llm is not None else create_llm(
+            api_key, model_name, temperature, base_url=base_url, max_retries=0 if gateway is not None else 2
+        )
 
         # Your improved anime recommendation prompt
         self.prompt = get_anime_prompt()
 
         try:
-            # Build a RetrievalQA chain:
-            # 1) uses retriever to fetch docs
-            # 2) stuffs them + question into the prompt
-            # 3) sends that to the LLM
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=self.retriever,
-                return_source_documents=True,
-                chain_type_kwargs={"prompt": self.prompt},
-                verbose=False,
-            )
+            # Equivalent to RetrievalQA's "stuff" chain, but with retrieval done
+            # separately so the retrieved documents can key the answer cache:
+            # 1) retriever fetches docs (see `get_recommendation`)
+            # 2) docs + question are stuffed into the prompt
+            # 3) that is sent to the LLM
+            self.answer_chain = self.prompt | self.llm | StrOutputParser()
         except Exception as e:
-            raise CustomException("Failed to create RetrievalQA chain", sys) from e
+            raise CustomException("Failed to create recommendation chain", sys) from e
+
+    @staticmethod
+    def format_context(docs: List[Document]) -> str:
+        # Same layout as the "stuff" documents chain
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    def _retrieve(self, query: str, search_kwargs: Optional[Dict[str, Any]]) -> List[Document]:
+        with metrics.span("retrieval"):
+            sources: List[Document] = self.retriever.invoke(query, **(search_kwargs or {}))
+        metrics.inc("anime_retrieved_documents_total", len(sources))
+        return sources
+
+    async def _aretrieve(self, query: str, search_kwargs: Optional[Dict[str, Any]]) -> List[Document]:
+        with metrics.span("retrieval"):
+            sources: List[Document] = await self.retriever.ainvoke(query, **(search_kwargs or {}))
+        metrics.inc("anime_retrieved_documents_total", len(sources))
+        return sources
+
+    def _chain_input(self, query: str, sources: List[Document]) -> Dict[str, str]:
+        with metrics.span("prompt"):
+            if self.context_builder is None:
+                context = self.format_context(sources)
+            else:
+                context, stats = self.context_builder.build(sources)
+                logging.info(
+                    f"Context assembled: {stats['chunks']} chunks -> {stats['titles_kept']}/{stats['titles']} titles, "
+                    f"prompt context tokens {stats['tokens_before']} -> {stats['tokens_after']}"
+                )
+                metrics.inc("anime_context_tokens_total", stats["tokens_before"], stage="before")
+                metrics.inc("anime_context_tokens_total", stats["tokens_after"], stage="after")
+        metrics.inc("anime_context_chars_total", len(context))
+        return {"context": context, "question": query}
+
+    def _cached_answer(self, query: str, sources: List[Document]) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        with metrics.span("answer_cache"):
+            cached = self.answer_cache.lookup(query, sources)
+        if cached is not None:
+            logging.info("Anime recommendation served from answer cache.")
+        return cached
+
+    def _generate(self, chain_input: Dict[str, str]) -> str:
+        def call() -> str:
+            return self.answer_chain.invoke(chain_input, config={"callbacks": metrics.callbacks()})
 
-    def get_recommendation(self, query: str) -> str:
+        return call() if self.gateway is None else self.gateway.invoke(request_key(chain_input), call)
+
+    async def _agenerate(self, chain_input: Dict[str, str]) -> str:
+        def call():
+            return self.answer_chain.ainvoke(chain_input, config={"callbacks": metrics.callbacks()})
+
+        return await (call() if self.gateway is None else self.gateway.ainvoke(request_key(chain_input), call))
+
+    def _stream(self, chain_input: Dict[str, str]) -> Iterator[str]:
+        def start() -> Iterator[str]:
+            return self.answer_chain.stream(chain_input, config={"callbacks": metrics.callbacks()})
+
+        return start() if self.gateway is None else self.gateway.stream(request_key(chain_input), start)
+
+    def get_recommendation(self, query: str, search_kwargs: Optional[Dict[str, Any]] = None) -> str:
         """
         Run a recommendation query.
 
         :param query: Natural language description of what the user wants.
-        :return: (result_text, source_documents)
+        :param search_kwargs: Extra retriever arguments, e.g. {"filter": <where clause>}.
+        :return: result_text
+        """
+        try:
+            sources = self._retrieve(query, search_kwargs)
+
+            cached = self._cached_answer(query, sources)
+            if cached is not None:
+                return cached
+
+            answer = self._generate(self._chain_input(query, sources))
+
+            if self.answer_cache is not None:
+                self.answer_cache.store(query, sources, answer)
+
+            logging.info("Anime recommendation generated successfully.")
+            return answer
+        except Exception as e:
+            raise CustomException("Failed to generate anime recommendation", sys) from e
+
+    def stream_recommendation(
+        self, query: str, search_kwargs: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """
+        Run a recommendation query, yielding answer tokens as the LLM produces them.
+        Logs time-to-first-token and total latency.
+
+        :param query: Natural language description of what the user wants.
+        :param search_kwargs: Extra retriever arguments, e.g. {"filter": <where clause>}.
+        :return: Iterator over text chunks; their concatenation is the full answer.
+        """
+        try:
+            start = time.perf_counter()
+            sources = self._retrieve(query, search_kwargs)
+
+            cached = self._cached_answer(query, sources)
+            if cached is not None:
+                yield cached
+                return
+
+            parts: List[str] = []
+            first_token_at: Optional[float] = None
+            for token in self._stream(self._chain_input(query, sources)):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(token)
+                yield token
+
+            total = time.perf_counter() - start
+            ttft = (first_token_at - start) if first_token_at is not None else total
+            logging.info(
+                f"Anime recommendation streamed successfully "
+                f"(time_to_first_token={ttft:.3f}s, total_latency={total:.3f}s, chunks={len(parts)})."
+            )
+
+            if self.answer_cache is not None:
+                self.answer_cache.store(query, sources, "".join(parts))
+        except Exception as e:
+            raise CustomException("Failed to stream anime recommendation", sys) from e
+
+    async def aget_recommendation(
+        self, query: str, search_kwargs: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Async variant of `get_recommendation` (uses the retriever's and chain's async paths).
         """
         try:
-            # RetrievalQA expects a dict with key "query"
-            result = self.qa_chain.invoke({"query": query})
-            answer: str = result["result"]
-            sources: List[Document] = result["source_documents"]
+            sources = await self._aretrieve(query, search_kwargs)
+
+            cached = self._cached_answer(query, sources)
+            if cached is not None:
+                return cached
+
+            answer = await self._agenerate(self._chain_input(query, sources))
+
+            if self.answer_cache is not None:
+                self.answer_cache.store(query, sources, answer)
 
             logging.info("Anime recommendation generated successfully.")
             return answer
         except Exception as e:
             raise CustomException("Failed to generate anime recommendation", sys) from e
+
+    async def arecommend_from_documents(
+        self,
+        queries: List[str],
+        sources: List[List[Document]],
+        max_concurrency: int = 4,
+    ) -> List[str]:
+        """
+        Generate answers for already-retrieved documents, with at most `max_concurrency`
+        LLM calls in flight. Cached answers skip the LLM entirely.
+
+        :param queries: User queries.
+        :param sources: Retrieved documents for each query (same order).
+        :return: One answer per query.
+        """
+        try:
+            answers: List[Optional[str]] = [self._cached_answer(q, docs) for q, docs in zip(queries, sources)]
+            pending = [i for i, answer in enumerate(answers) if answer is None]
+
+            if pending:
+                inputs = [self._chain_input(queries[i], sources[i]) for i in pending]
+                if self.gateway is not None:
+                    # Through the gateway, so identical prompts in (or across) batches share a call
+                    semaphore = asyncio.Semaphore(max_concurrency)
+
+                    async def generate(chain_input: Dict[str, str]) -> str:
+                        async with semaphore:
+                            return await self._agenerate(chain_input)
+
+                    generated = await asyncio.gather(*(generate(chain_input) for chain_input in inputs))
+                else:
+                    generated = await self.answer_chain.abatch(
+                        inputs,
+                        config={"max_concurrency": max_concurrency, "callbacks": metrics.callbacks()},
+                    )
+                for i, answer in zip(pending, generated):
+                    answers[i] = answer
+                    if self.answer_cache is not None:
+                        self.answer_cache.store(queries[i], sources[i], answer)
+
+            logging.info(
+                f"Generated {len(queries)} anime recommendations "
+                f"({len(pending)} LLM calls, max_concurrency={max_concurrency})."
+            )
+            return answers
+        except Exception as e:
+            raise CustomException("Failed to generate batch anime recommendations", sys) from e
@@ -0,0 +1,103 @@
+# src/stubs.py
+"""
+Offline stand-ins for external services, so benchmarks and local test servers
+(`python -m app.server --stub-llm --fake-embeddings`) run without a Groq key or
+network access. Never used unless explicitly requested.
+"""
+import re
+import time
+import asyncio
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.embeddings import BatchedEmbeddings
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that answers in the recommender's output format after a fixed delay,
+    listing the first three titles found in the prompt's context.
+    """
+
+    latency: float = 0.5
+    token_latency: float = 0.01
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @staticmethod
+    def _answer(messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        titles: List[str] = []
+        for title in re.findall(r"Title: (.+?)\s*Overview:", prompt):
+            if title not in titles:
+                titles.append(title)
+        lines = [
+            f"{n}. **Title**: {title}\n   **Summary**: not specified in the context\n"
+            f"   **Why it matches**: stub answer"
+            for n, title in enumerate(titles[:3], start=1)
+        ]
+        return "\n\n".join(lines) or "I don't know; the context is insufficient."
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in re.split(r"(?<= )", self._answer(messages)):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in re.split(r"(?<= )", self._answer(messages)):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def make_embeddings(model_name: Optional[str] = None) -> Embeddings:
+    """
+    A small local sentence-transformers model when `model_name` is given
+    (e.g. "sentence-transformers/all-MiniLM-L6-v2"), else deterministic fake vectors.
+    """
+    if model_name:
+        return BatchedEmbeddings(model_name=model_name)
+    return DeterministicFakeEmbedding(size=384)
@@ -1,34 +1,150 @@
 # src/vector_store.py
+import os
+import csv
 import sys
+import json
+import math
+import time
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from utils.logger import logging
 from utils.custom_exception import CustomException
 from config.config import (
     HUGGINGFACE_MODEL_NAME,
     HUGGINGFACE_MODEL_CACHE_DIR,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_NUM_WORKERS,
+    EMBEDDING_BACKEND,
+    EMBEDDING_NUM_THREADS,
+    EMBEDDING_ONNX_DIR,
+    EMBEDDING_QUANTIZATION,
+    INGEST_BATCH_SIZE,
+    INGEST_PARALLEL,
+    INGEST_QUEUE_BATCHES,
+    NUMPY_INDEX_RERANK,
+    INDEX_BUNDLE_KEEP,
+    RAW_CSV_PATH,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
 )
 
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_community.document_loaders.csv_loader import CSVLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 
-load_dotenv()
+from src.embeddings import BatchedEmbeddings
+from src.cache import QueryCache, CachedQueryEmbeddings
+from src.numpy_index import NumpyVectorIndex
+from src.index_bundle import bundle_identity, write_index_bundle
+from src.neighbours import NeighbourTable
+from src.filters import encode_genres
+from utils.stages import run_stages
+
+# Processed CSV columns kept as document metadata (for ids and filtering)
+METADATA_COLUMNS = ["MAL_ID", "Score", "Genres"]
+
+
+def native_collection(db: Chroma):
+    """
+    The chromadb collection behind a LangChain `Chroma` store.
+
+    `Chroma._collection` is private (checked against langchain_community 0.4 and
+    chromadb 1.x), but the wrapper has no public way to upsert precomputed embeddings
+    or to query several vectors in one call. Every such use goes through here, so a
+    rename upstream is a one-line fix.
+    """
+    return db._collection
+
+
+def search_by_vectors(
+    db: Chroma, vectors: List[List[float]], k: int, where: Optional[Dict[str, Any]] = None
+) -> List[List[Document]]:
+    """
+    The `k` nearest chunks for each query vector, in one collection query. The public
+    `Chroma.similarity_search_by_vector` takes a single vector, so a batch would cost
+    one round trip per query.
+    """
+    response = native_collection(db).query(
+        query_embeddings=vectors,
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas"],
+    )
+    return [
+        [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        for texts, metadatas in zip(response["documents"], response["metadatas"])
+    ]
 
 
 class VectorStoreBuilder:
     """
     Builds and persists a Chroma vector store from a processed CSV that contains a
     `combined_info` column. Also supports reloading the persisted store.
+
+    Every chunk is stored under a stable id (`<MAL_ID>-<chunk index>`) and a manifest
+    of chunk id -> content hash is written next to the persist directory, so that
+    `build_and_save_vectorstore(incremental=True)` only embeds new or changed chunks.
     """
 
-    def __init__(self, csv_path: str, persist_dir: str = "chroma_db", collection: str = "anime"):
+    def __init__(
+        self,
+        csv_path: str,
+        persist_dir: str = "chroma_db",
+        collection: str = "anime",
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        num_workers: int = EMBEDDING_NUM_WORKERS,
+        query_cache: Optional[QueryCache] = None,
+        embedding: Optional[Embeddings] = None,
+        ingest_batch_size: int = INGEST_BATCH_SIZE,
+        embedding_backend: str = EMBEDDING_BACKEND,
+        num_threads: int = EMBEDDING_NUM_THREADS,
+    ):
+        """
+        :param batch_size:  Texts per embedding forward pass.
+        :param num_workers: Embedding processes for large builds; 0/1 encodes in-process.
+        :param query_cache: If given, query embeddings are cached in it.
+        :param embedding:   Optional pre-built embeddings used instead of the configured
+                            HuggingFace model (e.g. a small local model for benchmarks).
+        :param ingest_batch_size: Chunks embedded and upserted per batch during a build.
+        :param embedding_backend: "torch", "onnx" or "onnx-int8" inference for the configured model.
+        :param num_threads: CPU inference threads (0 = runtime default).
+        """
         self.csv_path = csv_path
         self.persist_dir = persist_dir
         self.collection = collection
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.query_cache = query_cache
+        self.ingest_batch_size = ingest_batch_size
+        self.embedding_backend = embedding_backend
+        self.num_threads = num_threads
+        self.manifest_path = Path(persist_dir).with_name(f"{Path(persist_dir).name}_manifest.json")
+        self.checkpoint_path = Path(persist_dir).with_name(f"{Path(persist_dir).name}_checkpoint.jsonl")
+
+        # The embedding model is loaded on first use, so a no-op incremental
+        # rebuild never has to pay for it.
+        self._base_embedding = embedding
+        self._embedding: Optional[Embeddings] = None
+        self._manifest_mtime: Optional[float] = None
+        self._index_version = ""
 
+    @property
+    def embedding(self) -> Embeddings:
+        if self._embedding is None:
+            embedding = self._base_embedding or self._create_embedding()
+            if self.query_cache is not None:
+                embedding = CachedQueryEmbeddings(embedding, self.query_cache)
+            self._embedding = embedding
+        return self._embedding
+
+    def _create_embedding(self) -> Embeddings:
         try:
             cache_dir: Path = HUGGINGFACE_MODEL_CACHE_DIR
             cache_dir.mkdir(parents=True, exist_ok=True)
@@ -41,63 +157,423 @@ class VectorStoreBuilder:
                     f"Model '{HUGGINGFACE_MODEL_NAME}' will be downloaded on first use."
                 )
 
-            # ✅ use cache_folder here, no model_kwargs
-            self.embedding = HuggingFaceEmbeddings(
+            embedding = BatchedEmbeddings(
                 model_name=HUGGINGFACE_MODEL_NAME,
                 cache_folder=str(cache_dir),
-                encode_kwargs={"normalize_embeddings": True},
-                # local_files_only=True,  # optional offline mode
+                batch_size=self.batch_size,
+                num_workers=self.num_workers,
+                backend=self.embedding_backend,
+                num_threads=self.num_threads,
+                onnx_dir=str(EMBEDDING_ONNX_DIR),
+                quantization_config=EMBEDDING_QUANTIZATION,
+            )
+            logging.info(
+                f"BatchedEmbeddings initialized with model: {HUGGINGFACE_MODEL_NAME} "
+                f"(backend={self.embedding_backend}, batch_size={self.batch_size}, "
+                f"num_workers={self.num_workers}, num_threads={self.num_threads or 'default'})"
             )
-            logging.info(f"HuggingFaceEmbeddings initialized with model: {HUGGINGFACE_MODEL_NAME}")
+            return embedding
 
         except Exception as e:
             raise CustomException("Failed to initialize embedding model", sys) from e
 
-    def build_and_save_vectorstore(self) -> None:
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Loads the embedding model and runs one dummy encode (bypassing the query cache)
+        so the first real query does not pay for lazy initialization.
+
+        :return: Timings in seconds for the "embedding_model" and "warm_up" phases.
+        """
+        try:
+            start = time.perf_counter()
+            embedding = self.embedding
+            if isinstance(embedding, CachedQueryEmbeddings):
+                embedding = embedding.embeddings
+            if isinstance(embedding, BatchedEmbeddings):
+                embedding.model  # noqa: B018 - triggers the model load
+            loaded = time.perf_counter()
+
+            embedding.embed_query("warm up")
+            done = time.perf_counter()
+        except Exception as e:
+            raise CustomException("Failed to warm up embedding model", sys) from e
+
+        logging.info(f"Embedding model loaded in {loaded - start:.2f}s, warm-up encode took {done - loaded:.2f}s")
+        return {"embedding_model": round(loaded - start, 3), "warm_up": round(done - loaded, 3)}
+
+    def _iter_csv_documents(self) -> Iterator[Document]:
+        """Lazily reads the processed CSV (one Document per row)."""
         if not Path(self.csv_path).exists():
             raise CustomException(f"Processed CSV not found: {self.csv_path}", sys)
 
         try:
+            # Older processed CSVs only carry `combined_info`; keep metadata columns when present
+            with open(self.csv_path, encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f), [])
             loader = CSVLoader(
                 file_path=self.csv_path,
                 encoding="utf-8",
                 source_column="combined_info",
-                metadata_columns=[],
+                metadata_columns=[col for col in METADATA_COLUMNS if col in header],
             )
-            docs = loader.load()
+            for doc in loader.lazy_load():
+                yield self._with_typed_metadata(doc)
         except Exception as e:
             raise CustomException("Failed to load documents from CSV", sys) from e
 
-        if not docs:
-            raise CustomException("No documents were loaded from the processed CSV", sys)
+    @staticmethod
+    def _with_typed_metadata(doc: Document) -> Document:
+        """
+        CSV metadata arrives as strings; store MAL_ID as int, Score as float and Genres
+        as a normalized "action|sci-fi" string so the vector store can filter on them.
+        An unknown Score is left out, so a `min_score` filter excludes the anime.
+        """
+        metadata = doc.metadata
+        if metadata.get("MAL_ID") not in (None, ""):
+            metadata["MAL_ID"] = int(metadata["MAL_ID"])
+        if "Score" in metadata:
+            try:
+                score = float(metadata.pop("Score"))
+            except ValueError:
+                score = math.nan
+            if not math.isnan(score):
+                metadata["Score"] = score
+        if "Genres" in metadata:
+            metadata["genres"] = encode_genres(metadata.pop("Genres"))
+        return doc
+
+    @staticmethod
+    def _chunk_keys(
+        chunks: List[Document], seen: Optional[Dict[str, int]] = None
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Returns a stable id (`<MAL_ID>-<n>`, or `row<row>-<n>` without MAL_ID) and a
+        hash of the chunk's text and filterable metadata for every chunk.
+
+        :param seen: Chunks numbered so far per key; pass the same dict across calls
+                     when chunking a stream document by document.
+        """
+        ids, hashes = [], []
+        seen = {} if seen is None else seen
+        for chunk in chunks:
+            mal_id = chunk.metadata.get("MAL_ID")
+            key = str(mal_id) if mal_id not in (None, "") else f"row{chunk.metadata.get('row')}"
+            n = seen.get(key, 0)
+            seen[key] = n + 1
+            ids.append(f"{key}-{n}")
+            # `row`/`source` are positional/duplicated text and must not force re-embedding
+            metadata = {k: v for k, v in chunk.metadata.items() if k not in ("row", "source")}
+            payload = chunk.page_content + "\x00" + json.dumps(metadata, sort_keys=True)
+            hashes.append(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+        return ids, hashes
+
+    def _splitter_config(self) -> Dict[str, int]:
+        return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+    def _embedding_config(self) -> Dict[str, Optional[str]]:
+        # fp32 torch and ONNX vectors differ slightly and int8 ones noticeably, so a store
+        # built with one backend is not reused by another
+        quantization = EMBEDDING_QUANTIZATION if self.embedding_backend == "onnx-int8" else None
+        return {"backend": self.embedding_backend, "quantization": quantization}
+
+    def read_manifest(self) -> Optional[dict]:
+        if not self.manifest_path.exists():
+            return None
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            logging.warning(f"Ignoring unreadable manifest: {self.manifest_path}", exc_info=True)
+            return None
+
+    def index_version(self) -> str:
+        """
+        Identifies the current contents of the vector store (embedding model + manifest
+        version). The manifest is only re-read when its mtime changes, so this is cheap
+        enough to call on every query.
+        """
+        try:
+            mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            return f"{HUGGINGFACE_MODEL_NAME}:unversioned"
+
+        if mtime != self._manifest_mtime:
+            manifest = self.read_manifest() or {}
+            self._index_version = f"{manifest.get('model')}:{manifest.get('version')}"
+            self._manifest_mtime = mtime
+        return self._index_version
+
+    def _write_manifest(self, chunk_hashes: Dict[str, str]) -> None:
+        version = hashlib.sha256(
+            json.dumps(chunk_hashes, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        manifest = {
+            "model": HUGGINGFACE_MODEL_NAME,
+            "embedding": self._embedding_config(),
+            "collection": self.collection,
+            "splitter": self._splitter_config(),
+            "version": version,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "chunks": chunk_hashes,
+        }
+        try:
+            tmp_path = self.manifest_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            tmp_path.replace(self.manifest_path)
+        except Exception as e:
+            raise CustomException("Failed to write vector store manifest", sys) from e
+
+    def _manifest_matches(self, manifest: Optional[dict]) -> bool:
+        if manifest is None or not Path(self.persist_dir).exists():
+            return False
+        return (
+            manifest.get("model") == HUGGINGFACE_MODEL_NAME
+            and manifest.get("embedding") == self._embedding_config()
+            and manifest.get("collection") == self.collection
+            and manifest.get("splitter") == self._splitter_config()
+        )
+
+    def _read_checkpoint(self, manifest: Optional[dict]) -> Optional[Tuple[Optional[str], Dict[str, str]]]:
+        """
+        Chunks persisted by an interrupted build, if its checkpoint is usable.
+
+        :return: (manifest version the interrupted build started from, or None for a
+                 full rebuild; chunk id -> hash already upserted), or None.
+        """
+        if not self.checkpoint_path.exists():
+            return None
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                chunks: Dict[str, str] = {}
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn final write
+                    batch = json.loads(line)
+                    chunks.update(zip(batch["ids"], batch["hashes"]))
+        except Exception:
+            logging.warning(f"Ignoring unreadable build checkpoint: {self.checkpoint_path}", exc_info=True)
+            return None
+
+        compatible = (
+            Path(self.persist_dir).exists()
+            and header.get("model") == HUGGINGFACE_MODEL_NAME
+            and header.get("embedding") == self._embedding_config()
+            and header.get("collection") == self.collection
+            and header.get("splitter") == self._splitter_config()
+        )
+        base = header.get("base_version")
+        if not compatible or (base is not None and (manifest or {}).get("version") != base):
+            logging.warning("Build checkpoint does not match the current vector store; starting over.")
+            return None
+        return base, chunks
+
+    def _start_checkpoint(self, base_version: Optional[str]) -> None:
+        header = {
+            "model": HUGGINGFACE_MODEL_NAME,
+            "embedding": self._embedding_config(),
+            "collection": self.collection,
+            "splitter": self._splitter_config(),
+            "base_version": base_version,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with open(self.checkpoint_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+
+    def _append_checkpoint(self, ids: List[str], hashes: List[str]) -> None:
+        # One line per upserted batch, so checkpointing stays O(batch) however large the build
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ids": ids, "hashes": hashes}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _upsert_chunks(db: Chroma, ids: List[str], chunks: List[Document], vectors: List[List[float]]) -> None:
+        # `Chroma.add_documents` would embed the chunks again, so the already-computed
+        # vectors go straight to the collection. Upserting by id means changed chunks
+        # replace their old vectors.
+        native_collection(db).upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[chunk.page_content for chunk in chunks],
+            metadatas=[chunk.metadata for chunk in chunks],
+        )
+
+    def build_and_save_vectorstore(
+        self,
+        incremental: bool = False,
+        documents: Optional[Iterable[Document]] = None,
+        parallel: bool = INGEST_PARALLEL,
+        queue_batches: int = INGEST_QUEUE_BATCHES,
+        resume: bool = True,
+    ) -> None:
+        """
+        Splits, embeds and upserts documents in batches of `ingest_batch_size` chunks, so
+        peak memory is bounded by one batch rather than the whole catalogue.
+
+        The build runs as three stages connected by bounded queues: reading + splitting
+        (calling thread), embedding, and Chroma upserts. With `parallel` each stage has
+        its own thread, so the database write of one batch and the reading of the next
+        overlap with encoding. After every upserted batch a line is appended to a
+        checkpoint file next to the persist directory; if the build is interrupted,
+        the next build skips the chunks already upserted instead of starting over.
+
+        :param incremental: If True and a compatible manifest exists, only embed new or
+                            changed chunks, delete stale ones and leave the rest untouched.
+                            Otherwise the collection is rebuilt from scratch.
+        :param documents:   Optional document stream (e.g. `AnimeDataLoader.iter_documents()`)
+                            used instead of reading `csv_path`.
+        :param parallel:    Run the stages concurrently (False = one batch at a time).
+        :param queue_batches: Batches buffered in front of the embedding and upsert stages.
+        :param resume:      Continue an interrupted build from its checkpoint, if any.
+        """
+        manifest = self.read_manifest()
+        if not self._manifest_matches(manifest):
+            manifest = None
+        if incremental and manifest is None:
+            logging.info("No compatible vector store manifest found; running a full rebuild.")
+
+        checkpoint = self._read_checkpoint(manifest) if resume else None
+        if checkpoint is not None:
+            base_version, done = checkpoint
+            logging.info(f"Resuming interrupted build: {len(done)} chunks were already upserted.")
+        else:
+            base_version = manifest["version"] if incremental and manifest is not None else None
+            done = {}
+
+        # What the collection already holds (chunk id -> hash), as far as we know
+        previous: Optional[Dict[str, str]] = None
+        if base_version is not None:
+            previous = {**manifest["chunks"], **done}
+        elif checkpoint is not None:
+            previous = dict(done)
+
+        if documents is None:
+            documents = self._iter_csv_documents()
 
         try:
             splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=100,
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
                 separators=["\n\n", "\n", ". ", " ", ""],
             )
-            chunks = splitter.split_documents(docs)
         except Exception as e:
-            raise CustomException("Failed to split documents into chunks", sys) from e
+            raise CustomException("Failed to create text splitter", sys) from e
 
-        if not chunks:
-            raise CustomException("No chunks were produced by the text splitter", sys)
+        # The collection is only opened once there is something to write, so a no-op
+        # incremental build touches neither Chroma nor the embedding model.
+        db: Optional[Chroma] = None
 
-        try:
-            db = Chroma.from_documents(
-                documents=chunks,
-                embedding=self.embedding,
-                persist_directory=self.persist_dir,
-                collection_name=self.collection,
+        def open_db() -> Chroma:
+            nonlocal db
+            if db is None:
+                if previous is None:
+                    # The old manifest and any old checkpoint list chunks that are about to
+                    # be dropped; were they to survive an interrupted rebuild, the next
+                    # incremental or resumed build would skip those chunks
+                    self.manifest_path.unlink(missing_ok=True)
+                    self.checkpoint_path.unlink(missing_ok=True)
+                    if Path(self.persist_dir).exists():
+                        # Drop the previous collection so a rebuild never leaves duplicates behind
+                        self.load_vectorstore().delete_collection()
+                db = self.load_vectorstore()
+                if checkpoint is None:
+                    self._start_checkpoint(base_version)
+            return db
+
+        chunk_hashes: Dict[str, str] = {}
+        progress = {"documents": 0, "queued": 0, "embedded": 0, "upserted": 0}
+        start = time.perf_counter()
+
+        def plan() -> Iterator[Tuple[List[str], List[str], List[Document]]]:
+            """Stage 1: split documents and batch the chunks that need (re-)embedding."""
+            seen: Dict[str, int] = {}
+            ids: List[str] = []
+            hashes: List[str] = []
+            chunks: List[Document] = []
+            for doc in documents:
+                progress["documents"] += 1
+                try:
+                    doc_chunks = splitter.split_documents([doc])
+                except Exception as e:
+                    raise CustomException("Failed to split documents into chunks", sys) from e
+
+                doc_ids, doc_hashes = self._chunk_keys(doc_chunks, seen)
+                for chunk, chunk_id, chunk_hash in zip(doc_chunks, doc_ids, doc_hashes):
+                    chunk_hashes[chunk_id] = chunk_hash
+                    if previous is None or previous.get(chunk_id) != chunk_hash:
+                        ids.append(chunk_id)
+                        hashes.append(chunk_hash)
+                        chunks.append(chunk)
+
+                if len(ids) >= self.ingest_batch_size:
+                    progress["queued"] += len(ids)
+                    yield ids, hashes, chunks
+                    ids, hashes, chunks = [], [], []
+            if ids:
+                progress["queued"] += len(ids)
+                yield ids, hashes, chunks
+
+        def embed(batch: Tuple[List[str], List[str], List[Document]]):
+            """Stage 2: encode a batch."""
+            ids, hashes, chunks = batch
+            try:
+                vectors = self.embedding.embed_documents([chunk.page_content for chunk in chunks])
+            except Exception as e:
+                raise CustomException("Failed to embed chunks", sys) from e
+            progress["embedded"] += len(ids)
+            return ids, hashes, chunks, vectors
+
+        def persist(batch) -> None:
+            """Stage 3: upsert a batch and checkpoint it."""
+            ids, hashes, chunks, vectors = batch
+            try:
+                self._upsert_chunks(open_db(), ids, chunks, vectors)
+            except Exception as e:
+                raise CustomException("Failed to upsert chunks into Chroma vector store", sys) from e
+            self._append_checkpoint(ids, hashes)
+            progress["upserted"] += len(ids)
+            elapsed = time.perf_counter() - start
+            logging.info(
+                f"Build progress: {progress['documents']} documents read, "
+                f"{progress['upserted']}/{progress['queued']} chunks upserted "
+                f"({progress['embedded']} embedded, {progress['upserted'] / elapsed:.0f} chunks/s)"
             )
-            db.persist()
+
+        run_stages(
+            plan(),
+            [("embed", embed), ("persist", persist)],
+            queue_size=queue_batches,
+            parallel=parallel,
+        )
+        upserted = progress["upserted"]
+
+        if progress["documents"] == 0:
+            raise CustomException("No documents were loaded for the vector store", sys)
+        if not chunk_hashes:
+            raise CustomException("No chunks were produced by the text splitter", sys)
+
+        stale = [chunk_id for chunk_id in (previous or {}) if chunk_id not in chunk_hashes]
+        if stale:
+            try:
+                open_db().delete(ids=stale)
+            except Exception as e:
+                raise CustomException("Failed to delete stale chunks from Chroma vector store", sys) from e
+
+        if previous is not None and not upserted and not stale:
+            logging.info(f"Vector store is up to date ({len(chunk_hashes)} chunks); nothing to embed.")
+        else:
             logging.info(
-                f"Chroma vector store saved at {self.persist_dir} "
-                f"(collection='{self.collection}')"
+                f"Chroma vector store saved at {self.persist_dir} (collection='{self.collection}', "
+                f"{'resumed' if checkpoint is not None else 'incremental' if previous is not None else 'full'}): "
+                f"{upserted} chunks upserted, "
+                f"{len(stale)} stale chunks deleted, {len(chunk_hashes) - upserted} unchanged "
+                f"in {time.perf_counter() - start:.1f}s"
             )
-        except Exception as e:
-            raise CustomException("Failed to build or persist Chroma vector store", sys) from e
+
+        self._write_manifest(chunk_hashes)
+        self.checkpoint_path.unlink(missing_ok=True)
 
     def load_vectorstore(self) -> Chroma:
         try:
@@ -108,3 +584,206 @@ class VectorStoreBuilder:
             )
         except Exception as e:
             raise CustomException("Failed to load persisted Chroma vector store", sys) from e
+
+    def export_numpy_index(
+        self, directory: str, dtype: str = "float32", rerank: bool = NUMPY_INDEX_RERANK
+    ) -> NumpyVectorIndex:
+        """
+        Copies the persisted Chroma collection into a memory-mappable NumpyVectorIndex
+        (no re-embedding).
+
+        :param directory: Output directory for `vectors.npy` + `index.json`.
+        :param dtype:     "float32", "float16" or "int8".
+        :param rerank:    For float16/int8, also store a float32 copy to re-rank candidates.
+        """
+        index = NumpyVectorIndex.from_chroma(self.load_vectorstore())
+        if len(index) == 0:
+            raise CustomException("Chroma collection is empty; build the vector store first", sys)
+        index.save(directory, dtype=dtype, rerank=rerank)
+        return index
+
+    def bundle_identity(self) -> Dict[str, Any]:
+        """Embedding model, backend and splitter settings an index bundle must have been built with."""
+        return bundle_identity(HUGGINGFACE_MODEL_NAME, self._splitter_config(), self._embedding_config())
+
+    def export_index_bundle(
+        self,
+        root: str,
+        dtype: str = "float32",
+        rerank: bool = NUMPY_INDEX_RERANK,
+        source_path: str = str(RAW_CSV_PATH),
+        neighbours_path: Optional[str] = None,
+        keep: int = INDEX_BUNDLE_KEEP,
+    ) -> Path:
+        """
+        Copies the persisted Chroma collection into a versioned, checksummed index bundle
+        (`src.index_bundle`) that a pipeline can memory-map without Chroma or re-embedding.
+
+        :param root:        Bundle root; the bundle goes to `<root>/<version>/`.
+        :param source_path: Raw data the store was built from (hashed into the bundle).
+        :param neighbours_path: Neighbour table to ship in the bundle, if it exists.
+        :param keep:        Bundles kept in `root`, newest first.
+        """
+        manifest = self.read_manifest()
+        if not self._manifest_matches(manifest):
+            raise CustomException("Vector store manifest is missing or stale; rebuild before bundling", sys)
+        index = NumpyVectorIndex.from_chroma(self.load_vectorstore())
+        if len(index) == 0:
+            raise CustomException("Chroma collection is empty; build the vector store first", sys)
+        return write_index_bundle(
+            root,
+            index,
+            identity=self.bundle_identity(),
+            source_path=source_path,
+            index_version=manifest["version"],
+            dtype=dtype,
+            rerank=rerank,
+            neighbours_path=neighbours_path,
+            keep=keep,
+        )
+
+    @staticmethod
+    def _disk_usage(path: Path) -> int:
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) if path.exists() else 0
+
+    @staticmethod
+    def _release_chroma_clients() -> None:
+        """
+        Drops chromadb's process-wide client cache, so clients opened after the store's
+        directory is swapped read the new files instead of reusing the old ones.
+        """
+        from chromadb.api.shared_system_client import SharedSystemClient
+
+        SharedSystemClient.clear_system_cache()
+
+    def compact_vectorstore(self) -> Dict[str, Any]:
+        """
+        Maintenance: rewrites the persisted Chroma store without duplicates or leftovers.
+
+          - with a compatible manifest, chunks it does not list (e.g. left behind by
+            older `from_documents` builds under random ids) are dropped, and every
+            chunk it lists is kept (even with the same text as another), so the next
+            incremental build finds exactly the chunks it expects,
+          - without one, chunks of the same anime (MAL_ID) with identical text are
+            stored once,
+          - the kept chunks and their stored embeddings (no re-embedding) are copied into
+            a fresh store, which is VACUUMed and swapped in, so deleted rows, old HNSW
+            segments and orphaned collections no longer take disk space.
+
+        Run it while nothing else has the store open.
+
+        :return: Report with chunk counts, disk bytes before/after and the in-memory size
+                 of the vectors at each NumPy index precision.
+        """
+        persist_dir = Path(self.persist_dir)
+        if not persist_dir.exists():
+            raise CustomException(f"No persisted vector store at {persist_dir}", sys)
+        manifest = self.read_manifest()
+        listed: Optional[Dict[str, str]] = manifest["chunks"] if self._manifest_matches(manifest) else None
+
+        disk_before = self._disk_usage(persist_dir)
+        source = native_collection(self.load_vectorstore())
+        collection_metadata = source.metadata
+        total = source.count()
+
+        dim = 0
+        kept_ids: List[str] = []
+        seen: set = set()
+        orphans: List[str] = []
+        duplicates = 0
+        for offset in range(0, total, self.ingest_batch_size):
+            page = source.get(limit=self.ingest_batch_size, offset=offset, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                if listed is not None:
+                    # The manifest is authoritative: keep what it lists, drop the rest
+                    if chunk_id in listed:
+                        kept_ids.append(chunk_id)
+                    else:
+                        orphans.append(chunk_id)
+                    continue
+                metadata = metadata or {}
+                owner = str(metadata.get("MAL_ID", f"row{metadata.get('row')}"))
+                key = (owner, hashlib.sha256((text or "").encode("utf-8")).hexdigest())
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                kept_ids.append(chunk_id)
+
+        tmp_dir = persist_dir.with_name(f"{persist_dir.name}.compacting")
+        old_dir = persist_dir.with_name(f"{persist_dir.name}.old")
+        for leftover in (tmp_dir, old_dir):
+            shutil.rmtree(leftover, ignore_errors=True)
+
+        try:
+            import chromadb
+
+            target = chromadb.PersistentClient(path=str(tmp_dir)).create_collection(
+                self.collection, metadata=collection_metadata or None
+            )
+            for start in range(0, len(kept_ids), self.ingest_batch_size):
+                page = source.get(
+                    ids=kept_ids[start:start + self.ingest_batch_size],
+                    include=["embeddings", "documents", "metadatas"],
+                )
+                dim = len(page["embeddings"][0])
+                target.upsert(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
+                )
+            self._release_chroma_clients()
+
+            connection = sqlite3.connect(tmp_dir / "chroma.sqlite3")
+            try:
+                connection.execute("VACUUM")
+            finally:
+                connection.close()
+
+            persist_dir.rename(old_dir)
+            tmp_dir.rename(persist_dir)
+            shutil.rmtree(old_dir)
+        except Exception as e:
+            if old_dir.exists() and not persist_dir.exists():
+                old_dir.rename(persist_dir)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise CustomException(f"Failed to compact vector store at {persist_dir}", sys) from e
+
+        if listed is not None:
+            self._write_manifest({chunk_id: listed[chunk_id] for chunk_id in kept_ids})
+
+        disk_after = self._disk_usage(persist_dir)
+        n = len(kept_ids)
+        report = {
+            "chunks_before": total,
+            "chunks_after": n,
+            "duplicates_removed": duplicates,
+            "orphans_removed": len(orphans),
+            "disk_bytes_before": disk_before,
+            "disk_bytes_after": disk_after,
+            "disk_saved_pct": round(100 * (1 - disk_after / disk_before), 1) if disk_before else 0.0,
+            # First-pass vector memory of a NumPy index export at each precision
+            "vector_bytes": {
+                "float32": n * dim * 4,
+                "float16": n * dim * 2,
+                "int8": n * (dim + 4),
+            },
+        }
+        logging.info(
+            f"Compacted {persist_dir}: {total} -> {n} chunks ({duplicates} duplicates, {len(orphans)} orphans), "
+            f"disk {disk_before / 1e6:.1f} MB -> {disk_after / 1e6:.1f} MB"
+        )
+        return report
+
+    def export_neighbour_table(self, path: str, top_n: int = 20) -> NeighbourTable:
+        """
+        Precomputes the top-`top_n` similar anime per MAL_ID from the stored chunk
+        embeddings (no re-embedding) and saves it as a compact `.npz`.
+        """
+        index = NumpyVectorIndex.from_chroma(self.load_vectorstore())
+        if len(index) == 0:
+            raise CustomException("Chroma collection is empty; build the vector store first", sys)
+        table = NeighbourTable.build(index.vectors, index.metadatas, top_n=top_n)
+        table.save(path)
+        return table
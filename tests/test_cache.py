@@ -0,0 +1,138 @@
+import time
+from typing import List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from src.cache import AnswerCache, CachedRetriever, QueryCache
+
+
+class CountingRetriever(BaseRetriever):
+    calls: List[str] = []
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        self.calls.append(query)
+        return [Document(id=str(len(self.calls)), page_content=f"{query} #{len(self.calls)}", metadata={"MAL_ID": 1})]
+
+
+def _cached(version, **cache_kwargs):
+    inner = CountingRetriever(calls=[])
+    cache = QueryCache(name="retrieval", **cache_kwargs)
+    return inner, CachedRetriever(retriever=inner, cache=cache, version_fn=lambda: version[0])
+
+
+def test_cached_retriever_serves_repeats_until_the_index_version_changes():
+    version = ["v1"]
+    inner, retriever = _cached(version)
+
+    first = retriever.invoke("Space  Pirates")
+    assert retriever.invoke("space pirates") == first
+    assert len(inner.calls) == 1
+
+    version[0] = "v2"
+    rebuilt = retriever.invoke("space pirates")
+    assert rebuilt != first
+    assert len(inner.calls) == 2
+    assert retriever.invoke("space pirates") == rebuilt
+    assert len(inner.calls) == 2
+
+
+def test_cached_retriever_does_not_serve_entries_of_an_older_version_from_disk(tmp_path):
+    version = ["v1"]
+    inner, retriever = _cached(version, sqlite_path=str(tmp_path / "cache.sqlite"))
+    retriever.invoke("mecha")
+
+    version[0] = "v2"
+    retriever.invoke("mecha")
+    assert len(inner.calls) == 2
+
+
+def test_processes_on_different_versions_keep_each_others_disk_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old = QueryCache(name="retrieval", namespace="v1", sqlite_path=path)
+    old.set("query", [1, 2, 3])
+
+    QueryCache(name="retrieval", namespace="v2", sqlite_path=path).set_namespace("v3")
+
+    # A fresh process still on v1 finds the entry on disk
+    restarted = QueryCache(name="retrieval", namespace="v1", sqlite_path=path)
+    assert restarted.get("query") == [1, 2, 3]
+    assert restarted.disk_hits == 1
+
+
+def test_unused_namespaces_age_out_of_the_disk_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old = QueryCache(name="retrieval", namespace="v1", sqlite_path=path)
+    old.set("query", [1])
+    old._db.execute("UPDATE cache SET accessed_at = ?", (time.time() - 120,))
+    old._db.commit()
+
+    QueryCache(name="retrieval", namespace="v2", sqlite_path=path, namespace_ttl_seconds=60)
+
+    assert QueryCache(name="retrieval", namespace="v1", sqlite_path=path).get("query") is None
+
+
+class TableEmbeddings(Embeddings):
+    """Fixed query vectors, so cosine similarities are known exactly."""
+
+    VECTORS = {
+        "dark fantasy with demons": [1.0, 0.0],
+        "demon-filled dark fantasy": [0.99, 0.141],  # cosine 0.99
+        "dark fantasy comedy": [0.8, 0.6],  # cosine 0.8
+    }
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.VECTORS[text]
+
+
+DOCS = [Document(page_content="Berserk", metadata={"MAL_ID": 33}), Document(page_content="Claymore", metadata={"MAL_ID": 1818})]
+
+
+def _answer_cache(version=None):
+    return AnswerCache(
+        prompt_version="p1",
+        similarity_threshold=0.95,
+        embedding=TableEmbeddings(),
+        version_fn=(lambda: version[0]) if version is not None else None,
+    )
+
+
+def test_answer_cache_serves_a_paraphrase_above_the_threshold():
+    cache = _answer_cache()
+    cache.store("dark fantasy with demons", DOCS, "Berserk")
+
+    assert cache.lookup("Dark fantasy  with demons", DOCS) == "Berserk"
+    assert cache.lookup("demon-filled dark fantasy", DOCS) == "Berserk"
+    assert (cache.exact_hits, cache.semantic_hits) == (1, 1)
+
+
+def test_answer_cache_misses_a_query_below_the_threshold():
+    cache = _answer_cache()
+    cache.store("dark fantasy with demons", DOCS, "Berserk")
+
+    assert cache.lookup("dark fantasy comedy", DOCS) is None
+    assert cache.misses == 1
+
+
+def test_answer_cache_misses_for_other_documents():
+    cache = _answer_cache()
+    cache.store("dark fantasy with demons", DOCS, "Berserk")
+
+    assert cache.lookup("dark fantasy with demons", DOCS[:1]) is None
+
+
+def test_answer_cache_misses_after_the_index_version_changes():
+    version = ["v1"]
+    cache = _answer_cache(version)
+    cache.store("dark fantasy with demons", DOCS, "Berserk")
+    assert cache.lookup("dark fantasy with demons", DOCS) == "Berserk"
+
+    version[0] = "v2"
+    assert cache.lookup("dark fantasy with demons", DOCS) is None
+    assert cache.lookup("demon-filled dark fantasy", DOCS) is None
+    assert cache.stats()["memory_entries"] == 0
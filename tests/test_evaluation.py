@@ -0,0 +1,65 @@
+import math
+
+import pytest
+from langchain_core.documents import Document
+
+from src.evaluation import check_thresholds, ndcg_at_k, ranked_mal_ids, recall_at_k, reciprocal_rank
+
+RANKED = [10, 20, 30, 40, 50]
+RELEVANT = [20, 50, 99]
+
+
+def test_recall_at_k_counts_relevant_titles_out_of_at_most_k():
+    assert recall_at_k(RANKED, RELEVANT, k=5) == pytest.approx(2 / 3)
+    assert recall_at_k(RANKED, RELEVANT, k=2) == pytest.approx(1 / 2)
+    assert recall_at_k([20, 10], RELEVANT, k=1) == 1.0
+    assert recall_at_k(RANKED, [99], k=5) == 0.0
+
+
+def test_reciprocal_rank_uses_the_first_relevant_title_within_k():
+    assert reciprocal_rank(RANKED, RELEVANT, k=5) == 0.5
+    assert reciprocal_rank([50, 20], RELEVANT, k=5) == 1.0
+    assert reciprocal_rank(RANKED, [50], k=4) == 0.0
+
+
+def test_ndcg_at_k_matches_hand_computed_values():
+    # Hits at ranks 2 and 5; ideal: three hits at ranks 1-3
+    dcg = 1 / math.log2(3) + 1 / math.log2(6)
+    ideal = 1 + 1 / math.log2(3) + 1 / math.log2(4)
+    assert ndcg_at_k(RANKED, RELEVANT, k=5) == pytest.approx(dcg / ideal)
+    assert ndcg_at_k(RANKED, RELEVANT, k=5) == pytest.approx(0.47762, abs=1e-5)
+    assert ndcg_at_k([2, 1], [1, 2], k=5) == pytest.approx(1.0)
+    assert ndcg_at_k(RANKED, [99], k=5) == 0.0
+
+
+def test_ranked_mal_ids_collapses_chunks_of_one_title():
+    docs = [
+        Document(page_content="a", metadata={"MAL_ID": 7}),
+        Document(page_content="b", metadata={"MAL_ID": 7.0}),
+        Document(page_content="c", metadata={}),
+        Document(page_content="d", metadata={"MAL_ID": 3}),
+    ]
+    assert ranked_mal_ids(docs) == [7, 3]
+
+
+SUMMARY = {"recall_at_k": 0.8, "mrr": 0.7, "ndcg_at_k": 0.75, "latency": {"p95_ms": 40.0}}
+
+
+def test_no_floors_and_no_baseline_means_no_checks():
+    checks = check_thresholds(SUMMARY, min_quality={"recall_at_k": 0, "mrr": 0, "ndcg_at_k": 0}, max_p95_ms=0)
+    assert checks == []
+
+
+def test_floors_and_baseline_regressions_fail():
+    baseline = {"recall_at_k": 0.9, "mrr": 0.7, "ndcg_at_k": 0.75, "latency": {"p95_ms": 30.0}}
+    checks = check_thresholds(
+        SUMMARY,
+        min_quality={"recall_at_k": 0.85, "mrr": 0, "ndcg_at_k": 0},
+        max_p95_ms=50,
+        baseline=baseline,
+        max_quality_drop=0.02,
+        max_latency_increase=0.25,
+    )
+    failed = {check["check"] for check in checks if not check["passed"]}
+    assert failed == {"recall_at_k >= floor", "recall_at_k >= baseline - 0.02", "p95_ms <= baseline * 1.25"}
+    assert len(checks) == 6
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.filters import FiltersUnavailable, GenreIndex, RecommendationFilter, matches_where
+from src.numpy_index import NumpyVectorIndex
+
+METADATAS = [
+    {"MAL_ID": 1, "Score": 8.8, "genres": "action|sci-fi"},
+    {"MAL_ID": 2, "Score": 6.1, "genres": "romance"},
+    {"MAL_ID": 3, "genres": "action"},  # unknown score
+    {"MAL_ID": 4, "Score": 7.5, "genres": "action|romance"},
+    {},
+]
+
+WHERES = [
+    {"MAL_ID": {"$in": [1, 3, 99]}},
+    {"MAL_ID": {"$nin": [1, 3]}},
+    {"MAL_ID": 2},
+    {"MAL_ID": {"$ne": 2}},
+    {"Score": {"$gte": 0.0}},
+    {"Score": {"$lt": 7.5}},
+    {"$and": [{"MAL_ID": {"$in": [1, 3, 4]}}, {"Score": {"$gte": 7.0}}]},
+    {"$or": [{"MAL_ID": 2}, {"Score": {"$gt": 8.0}}]},
+]
+
+
+@pytest.mark.parametrize("where", WHERES)
+def test_single_document_and_index_filters_agree(where):
+    index = NumpyVectorIndex(
+        vectors=np.zeros((len(METADATAS), 2), dtype=np.float32),
+        ids=[str(i) for i in range(len(METADATAS))],
+        texts=[""] * len(METADATAS),
+        metadatas=METADATAS,
+    )
+    assert index.where_mask(where).tolist() == [matches_where(metadata, where) for metadata in METADATAS]
+
+
+def test_unknown_score_is_excluded_by_min_score():
+    where = GenreIndex.from_metadatas(METADATAS).to_where(RecommendationFilter(include_genres=("action",), min_score=0))
+    assert [metadata.get("MAL_ID") for metadata in METADATAS if matches_where(metadata, where)] == [1, 4]
+
+
+def test_store_without_filter_metadata_refuses_filters():
+    # Chunks of a store built before filtering existed carry no metadata at all
+    index = GenreIndex.from_metadatas([{}, None, {"source": "anime.csv"}])
+    assert not index.filterable
+    assert index.to_where(None) is None
+    assert index.to_where(RecommendationFilter()) is None
+    with pytest.raises(FiltersUnavailable):
+        index.to_where(RecommendationFilter(min_score=7))
+
+
+def test_empty_store_is_filterable():
+    assert GenreIndex.from_metadatas([]).filterable
@@ -0,0 +1,76 @@
+from typing import List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.hybrid_retriever import HybridRetriever, title_key
+
+BEBOP = Document(id="1a", page_content="cowboy bebop bounty hunters in space", metadata={"MAL_ID": 1})
+BEBOP_2 = Document(id="1b", page_content="spike spiegel plays jazz", metadata={"MAL_ID": 1})
+TRIGUN = Document(id="2", page_content="trigun gunman on a desert planet", metadata={"MAL_ID": 2})
+OUTLAW = Document(id="3", page_content="outlaw star pirates in space", metadata={"MAL_ID": 3})
+KEION = Document(id="4", page_content="school music club slice of life", metadata={"MAL_ID": 4})
+CORPUS = [BEBOP, BEBOP_2, TRIGUN, OUTLAW, KEION]
+
+
+class FixedRetriever(BaseRetriever):
+    """Dense stand-in returning a fixed ranking and recording its search kwargs."""
+
+    ranking: List[Document]
+    calls: List[dict] = []
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs) -> List[Document]:
+        self.calls.append(kwargs)
+        return self.ranking
+
+
+def _hybrid(dense, k=3):
+    return HybridRetriever.from_documents(FixedRetriever(ranking=dense, calls=[]), CORPUS, k=k, candidates=10, rrf_k=1)
+
+
+def test_fuse_orders_titles_by_reciprocal_rank():
+    hybrid = _hybrid([])
+    # Dense title ranks: Trigun 1, Bebop 2 (its second chunk is skipped), Outlaw 3.
+    # BM25 only matches the first Bebop chunk: Bebop 1.
+    fused = hybrid.fuse("cowboy bebop", [TRIGUN, BEBOP_2, BEBOP, OUTLAW])
+
+    assert [doc.metadata["MAL_ID"] for doc in fused] == [1, 2, 3]
+    assert [doc.metadata["rrf_score"] for doc in fused] == [round(1 / 3 + 1 / 2, 6), 0.5, 0.25]
+
+
+def test_fuse_collapses_chunks_of_one_title_to_its_best_dense_chunk():
+    fused = _hybrid([]).fuse("cowboy bebop", [BEBOP_2, BEBOP, TRIGUN])
+
+    assert [doc.id for doc in fused] == ["1b", "2"]
+    assert fused[0].metadata["rrf_score"] == round(1 / 2 + 1 / 2, 6)
+
+
+def test_fuse_keeps_a_keyword_only_title_and_truncates_to_k():
+    fused = _hybrid([], k=2).fuse("desert planet", [OUTLAW, KEION, BEBOP])
+
+    # Outlaw 1/2 and Trigun (BM25 only) 1/2 tie; the dense list is scored first
+    assert [doc.metadata["MAL_ID"] for doc in fused] == [3, 2]
+
+
+def test_fuse_applies_where_to_keyword_results():
+    fused = _hybrid([]).fuse("cowboy bebop space", [TRIGUN, OUTLAW], where={"MAL_ID": {"$ne": 1}})
+
+    assert 1 not in [doc.metadata["MAL_ID"] for doc in fused]
+    assert [doc.metadata["MAL_ID"] for doc in fused] == [3, 2]
+
+
+def test_invoke_passes_candidates_and_filter_to_the_dense_retriever():
+    hybrid = _hybrid([TRIGUN, BEBOP])
+    fused = hybrid.invoke("cowboy bebop", k=1, filter={"MAL_ID": {"$in": [1, 2]}})
+
+    assert hybrid.vector_retriever.calls == [{"k": 10, "filter": {"MAL_ID": {"$in": [1, 2]}}}]
+    assert [doc.metadata["MAL_ID"] for doc in fused] == [1]
+
+
+def test_title_key_groups_chunks_without_mal_id_by_source_row():
+    first = Document(page_content="part one", metadata={"source": "row-7"})
+    second = Document(page_content="part two", metadata={"source": "row-7"})
+
+    assert title_key(first) == title_key(second) == "source:row-7"
+    assert title_key(BEBOP) == title_key(BEBOP_2) == "mal:1"
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.index_bundle import bundle_identity, load_index_bundle, resolve_bundle_dir, write_index_bundle
+from src.numpy_index import NumpyVectorIndex
+from utils.custom_exception import CustomException
+
+IDENTITY = bundle_identity(
+    "test-model", {"chunk_size": 500, "chunk_overlap": 50}, {"backend": "torch", "quantization": None}
+)
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    source = tmp_path / "anime_with_synopsis.csv"
+    source.write_text("MAL_ID,Name\n1,Cowboy Bebop\n", encoding="utf-8")
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(6, 4)).astype(np.float32)
+    index = NumpyVectorIndex(
+        vectors=vectors / np.linalg.norm(vectors, axis=1, keepdims=True),
+        ids=[f"{i}-0" for i in range(6)],
+        texts=[f"text {i}" for i in range(6)],
+        metadatas=[{"MAL_ID": i} for i in range(6)],
+    )
+    root = tmp_path / "bundles"
+    write_index_bundle(str(root), index, IDENTITY, source_path=str(source), index_version="v1")
+    return root, source
+
+
+def test_matching_bundle_loads(bundle):
+    root, source = bundle
+    index, manifest, _ = load_index_bundle(str(root), IDENTITY, source_path=str(source), checksums=True)
+    assert len(index) == 6
+    assert manifest["source"]["file"] == source.name
+
+
+def test_tampered_file_is_refused(bundle):
+    root, source = bundle
+    sidecar = resolve_bundle_dir(str(root)) / NumpyVectorIndex.SIDECAR_FILE
+    data = bytearray(sidecar.read_bytes())
+    data[-2] = ord("X") if data[-2] != ord("X") else ord("Y")  # same size, different bytes
+    sidecar.write_bytes(bytes(data))
+    with pytest.raises(CustomException, match="checksum mismatch"):
+        load_index_bundle(str(root), IDENTITY, source_path=str(source), checksums=True)
+
+
+def test_changed_source_is_refused(bundle):
+    root, source = bundle
+    source.write_text("MAL_ID,Name\n1,Trigun\n", encoding="utf-8")
+    with pytest.raises(CustomException, match="changed since the bundle was built"):
+        load_index_bundle(str(root), IDENTITY, source_path=str(source))
+
+
+def test_source_with_another_name_is_refused(bundle, tmp_path):
+    root, _ = bundle
+    other = tmp_path / "anime_updated.csv"
+    other.write_text("anything\n", encoding="utf-8")
+    with pytest.raises(CustomException, match="expected anime_updated.csv"):
+        load_index_bundle(str(root), IDENTITY, source_path=str(other))
+
+
+def test_missing_source_is_refused(bundle):
+    root, source = bundle
+    source.unlink()
+    with pytest.raises(CustomException, match="is missing"):
+        load_index_bundle(str(root), IDENTITY, source_path=str(source))
+
+
+def test_other_embedding_backend_is_refused(bundle):
+    root, source = bundle
+    int8 = {**IDENTITY, "embedding": {"backend": "onnx-int8", "quantization": "avx2"}}
+    with pytest.raises(CustomException, match="embedding"):
+        load_index_bundle(str(root), int8, source_path=str(source))
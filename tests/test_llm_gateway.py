@@ -0,0 +1,184 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from src import llm_gateway
+from src.llm_gateway import LLMGateway, TokenBucket, _Flight
+
+
+class FakeModel:
+    """Upstream stand-in: counts calls and fails with the queued errors first."""
+
+    def __init__(self, errors=(), answer="answer"):
+        self.errors = list(errors)
+        self.answer = answer
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.answer
+
+    async def acall(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return self.answer
+
+
+def _http_error(status, headers=None):
+    request = httpx.Request("POST", "https://api.groq.test/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(llm_gateway.time, "sleep", delays.append)
+    return delays
+
+
+def _gateway(**kwargs):
+    return LLMGateway(**{"coalesce": True, "rate": 0, "burst": 1, "max_retries": 3, **kwargs})
+
+
+def test_identical_concurrent_prompts_share_one_call():
+    gateway, model = _gateway(), FakeModel()
+    model.release.clear()
+    answers = []
+
+    def ask():
+        answers.append(gateway.invoke("same prompt", model))
+
+    leader = threading.Thread(target=ask)
+    leader.start()
+    assert model.started.wait(timeout=5)
+    followers = [threading.Thread(target=ask) for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    threading.Event().wait(0.1)  # let the followers join the in-flight call
+    model.release.set()
+    for thread in [leader, *followers]:
+        thread.join(timeout=5)
+
+    assert model.calls == 1
+    assert answers == ["answer"] * 5
+
+
+def test_identical_concurrent_async_prompts_share_one_call():
+    gateway, model = _gateway(), FakeModel()
+
+    async def ask_all():
+        return await asyncio.gather(*(gateway.ainvoke("same prompt", model.acall) for _ in range(3)))
+
+    assert asyncio.run(ask_all()) == ["answer"] * 3
+    assert model.calls == 1
+
+
+def test_different_prompts_are_not_coalesced():
+    gateway, model = _gateway(), FakeModel()
+    gateway.invoke("a", model)
+    gateway.invoke("b", model)
+    assert model.calls == 2
+
+
+def test_rate_limit_retry_honours_retry_after(sleeps):
+    gateway = _gateway(backoff_base=0.001, backoff_max=5)
+    model = FakeModel(errors=[_http_error(429, {"retry-after": "0.3"})])
+
+    assert gateway.invoke("prompt", model) == "answer"
+    assert model.calls == 2
+    assert sleeps == [0.3]
+
+
+def test_non_retryable_error_raises_immediately(sleeps):
+    gateway = _gateway()
+    model = FakeModel(errors=[_http_error(400)])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        gateway.invoke("prompt", model)
+    assert model.calls == 1
+    assert sleeps == []
+
+
+def test_retries_stop_after_max_retries(sleeps):
+    gateway = _gateway(max_retries=2, backoff_base=0.001)
+    model = FakeModel(errors=[_http_error(503)] * 5)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        gateway.invoke("prompt", model)
+    assert model.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_coalesced_stream_replays_every_chunk_to_each_subscriber():
+    gateway = _gateway()
+    release = threading.Event()
+    starts = []
+
+    def start():
+        starts.append(1)
+        release.wait(timeout=5)
+        yield from ["one ", "two ", "three"]
+
+    first = gateway.stream("prompt", start)
+    second = gateway.stream("prompt", start)
+    collected = {}
+
+    def consume(name, stream):
+        collected[name] = "".join(stream)
+
+    threads = [threading.Thread(target=consume, args=(name, stream)) for name, stream in [("a", first), ("b", second)]]
+    threads[0].start()
+    while "prompt" not in gateway._streams:
+        threading.Event().wait(0.01)
+    threads[1].start()
+    threading.Event().wait(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert collected == {"a": "one two three", "b": "one two three"}
+    assert len(starts) == 1
+
+
+def test_flight_delivers_chunks_before_raising_the_error():
+    flight = _Flight()
+    flight.chunks.extend(["a", "b"])
+    flight.error = RuntimeError("upstream closed the stream")
+    flight.done = True
+
+    replay = flight.replay()
+    assert [next(replay), next(replay)] == ["a", "b"]
+    with pytest.raises(RuntimeError):
+        next(replay)
+
+
+def test_token_bucket_allows_a_burst_then_reports_the_wait():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == (True, 0.0)
+    assert bucket.try_acquire() == (True, 0.0)
+    allowed, wait = bucket.try_acquire()
+    assert not allowed
+    assert 0 < wait <= 0.1
+
+
+def test_token_bucket_reserve_goes_into_debt():
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_with_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert all(bucket.try_acquire() == (True, 0.0) for _ in range(100))
+    assert bucket.reserve() == 0.0
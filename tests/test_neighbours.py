@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from src.neighbours import NeighbourTable
+
+
+def _source(title):
+    return f"Title: {title} Overview: a story Genres: drama"
+
+
+def _random_corpus(n_anime=40, dim=16, seed=7):
+    rng = np.random.default_rng(seed)
+    mal_ids = rng.choice(np.arange(1, 10_000), size=n_anime, replace=False)
+    # One to three chunks per anime, interleaved like a real store
+    chunk_ids = np.repeat(mal_ids, rng.integers(1, 4, size=n_anime))
+    rng.shuffle(chunk_ids)
+    vectors = rng.normal(size=(len(chunk_ids), dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [{"MAL_ID": int(mal_id), "source": _source(f"Anime {mal_id}")} for mal_id in chunk_ids]
+    return vectors, metadatas
+
+
+def _brute_force(vectors, metadatas, top_n):
+    ids = sorted({m["MAL_ID"] for m in metadatas})
+    means = np.stack([vectors[[m["MAL_ID"] == i for m in metadatas]].mean(axis=0) for i in ids])
+    means /= np.linalg.norm(means, axis=1, keepdims=True)
+    similarity = means @ means.T
+    np.fill_diagonal(similarity, -np.inf)
+    return {
+        ids[row]: ([ids[col] for col in np.argsort(-similarity[row])[:top_n]], np.sort(similarity[row])[::-1][:top_n])
+        for row in range(len(ids))
+    }
+
+
+@pytest.mark.parametrize("block_rows", [1, 7, 1024])
+def test_build_matches_brute_force_top_k(block_rows):
+    vectors, metadatas = _random_corpus()
+    table = NeighbourTable.build(vectors, metadatas, top_n=5, block_rows=block_rows)
+    expected = _brute_force(vectors, metadatas, top_n=5)
+
+    assert sorted(int(mal_id) for mal_id in table.mal_ids) == sorted(expected)
+    for row, mal_id in enumerate(table.mal_ids):
+        neighbour_ids, neighbour_scores = expected[int(mal_id)]
+        assert [int(table.mal_ids[col]) for col in table.neighbours[row]] == neighbour_ids
+        np.testing.assert_allclose(table.scores[row].astype(np.float32), neighbour_scores, atol=2e-3)
+
+
+def test_top_n_is_capped_by_the_number_of_other_anime():
+    vectors, metadatas = _random_corpus(n_anime=4)
+    table = NeighbourTable.build(vectors, metadatas, top_n=10)
+
+    assert table.neighbours.shape == (4, 3)
+
+
+def _named_table():
+    vectors = np.eye(3, dtype=np.float32)
+    metadatas = [
+        {"MAL_ID": 41587, "source": _source("86")},
+        {"MAL_ID": 86, "source": _source("Cowboy Bebop")},
+        {"MAL_ID": 5, "source": _source("Trigun")},
+    ]
+    return NeighbourTable.build(vectors, metadatas, top_n=2)
+
+
+def test_all_digit_strings_are_titles_and_ints_are_mal_ids():
+    table = _named_table()
+
+    assert table.similar_to("86")["mal_id"] == 41587
+    assert table.similar_to(86)["title"] == "Cowboy Bebop"
+    assert table.similar_to(np.int64(5))["title"] == "Trigun"
+
+
+def test_titles_match_fuzzily_and_unknown_ones_raise():
+    table = _named_table()
+
+    assert table.similar_to("cowboy bebop!")["mal_id"] == 86
+    assert table.similar_to("Cowboy Bebob")["mal_id"] == 86
+    with pytest.raises(KeyError):
+        table.similar_to("Neon Genesis Evangelion")
+    assert table.find(123456) is None
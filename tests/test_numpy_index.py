@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.filters import matches_where
+from src.numpy_index import NumpyVectorIndex
+
+WHERE = {"$and": [{"MAL_ID": {"$nin": [3, 5, 8]}}, {"Score": {"$gte": 7.0}}]}
+
+
+def _random_index(n=600, dim=32, seed=11):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [
+        {"MAL_ID": int(row % 50), "Score": round(float(rng.uniform(5, 9)), 2)} if row % 7 else {"MAL_ID": int(row % 50)}
+        for row in range(n)
+    ]
+    index = NumpyVectorIndex(
+        vectors=vectors, ids=[str(row) for row in range(n)], texts=[f"chunk {row}" for row in range(n)], metadatas=metadatas
+    )
+    queries = rng.normal(size=(25, dim)).astype(np.float32)
+    return index, queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def _saved(index, tmp_path, dtype, rerank):
+    directory = tmp_path / f"{dtype}-{rerank}"
+    index.save(str(directory), dtype=dtype, rerank=rerank)
+    return NumpyVectorIndex.load(str(directory), rerank_candidates=50)
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+@pytest.mark.parametrize("where", [None, WHERE])
+def test_reduced_precision_with_rerank_returns_the_float32_top_k(tmp_path, dtype, where):
+    index, queries = _random_index()
+    exact = _saved(index, tmp_path, "float32", rerank=False)
+    compact = _saved(index, tmp_path, dtype, rerank=True)
+
+    expected = exact.search_batch(queries, k=10, where=where)
+    found = compact.search_batch(queries, k=10, where=where)
+
+    for hits, expected_hits in zip(found, expected):
+        assert [row for row, _ in hits] == [row for row, _ in expected_hits]
+        np.testing.assert_allclose([s for _, s in hits], [s for _, s in expected_hits], rtol=1e-5, atol=1e-6)
+
+
+def test_where_still_applies_after_the_rerank(tmp_path):
+    index, queries = _random_index()
+    compact = _saved(index, tmp_path, "int8", rerank=True)
+
+    for hits in compact.search_batch(queries, k=10, where=WHERE):
+        assert len(hits) == 10
+        assert all(matches_where(compact.metadatas[row], WHERE) for row, _ in hits)
+
+
+def test_rerank_never_returns_rows_excluded_by_where(tmp_path):
+    index, queries = _random_index()
+    compact = _saved(index, tmp_path, "int8", rerank=True)
+    # Fewer matching rows than re-rank candidates: filtered-out rows must not fill the gap
+    where = {"MAL_ID": 3}
+
+    for hits in compact.search_batch(queries, k=20, where=where):
+        assert len(hits) == 12
+        assert {compact.metadatas[row]["MAL_ID"] for row, _ in hits} == {3}
+
+
+def test_int8_quantization_error_is_small():
+    index, _ = _random_index()
+    codes, scales = NumpyVectorIndex.quantize_int8(index.vectors)
+
+    np.testing.assert_allclose(codes * scales[:, None], index.vectors, atol=float(scales.max()) / 2 + 1e-7)
@@ -0,0 +1,109 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.filters import FiltersUnavailable, RecommendationFilter
+from utils.custom_exception import CustomException
+
+
+def _pipeline(tmp_path, startup):
+    return AnimeRecommendationPipeline(
+        csv_path="",
+        persist_dir=str(tmp_path / "db"),
+        use_query_cache=False,
+        use_answer_cache=False,
+        llm=FakeListChatModel(responses=[""]),
+        embedding=DeterministicFakeEmbedding(size=8),
+        startup=startup,
+    )
+
+
+def test_concurrent_lazy_waiters_do_not_hang_when_startup_fails(tmp_path):
+    pipeline = _pipeline(tmp_path, "lazy")
+    attempts = []
+
+    def failing_load():
+        attempts.append(threading.current_thread().name)
+        time.sleep(0.2)  # long enough for the second waiter to find the lock taken
+        raise RuntimeError("model download failed")
+
+    pipeline._load_components = failing_load
+    outcomes = []
+
+    def wait():
+        try:
+            pipeline.wait_until_ready()
+            outcomes.append("ready")
+        except CustomException:
+            outcomes.append("failed")
+
+    waiters = [threading.Thread(target=wait) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    for waiter in waiters:
+        waiter.join(timeout=5)
+
+    assert not any(waiter.is_alive() for waiter in waiters)
+    assert outcomes == ["failed", "failed"]
+    # Lazy failures are not terminal: each waiter made its own attempt
+    assert len(attempts) == 2
+    assert not pipeline.is_ready()
+
+
+def test_lazy_startup_retries_after_a_failed_attempt(tmp_path):
+    pipeline = _pipeline(tmp_path, "lazy")
+    calls = []
+
+    def flaky_load():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+        pipeline._ready.set()
+
+    pipeline._load_components = flaky_load
+    with pytest.raises(CustomException):
+        pipeline.wait_until_ready()
+    assert pipeline.wait_until_ready() is True
+    assert pipeline.is_ready()
+
+
+def test_background_startup_failure_is_raised_to_every_waiter(tmp_path, monkeypatch):
+    def failing_load(self):
+        time.sleep(0.1)
+        raise RuntimeError("index bundle refused")
+
+    monkeypatch.setattr(AnimeRecommendationPipeline, "_load_components", failing_load)
+    pipeline = _pipeline(tmp_path, "background")
+    for _ in range(2):
+        with pytest.raises(CustomException):
+            pipeline.wait_until_ready(timeout=5)
+    assert not pipeline.is_ready()
+
+
+def test_wait_times_out_while_another_attempt_holds_the_lock(tmp_path):
+    pipeline = _pipeline(tmp_path, "lazy")
+    with pipeline._init_lock:
+        assert pipeline.wait_until_ready(timeout=0.05) is False
+
+
+class _MetadataLessStore:
+    def get(self, include):
+        return {"metadatas": [{}, {}, {}]}
+
+
+def test_filters_are_refused_when_the_store_has_no_filter_metadata(tmp_path, caplog):
+    pipeline = _pipeline(tmp_path, "lazy")
+    pipeline.vector_store = _MetadataLessStore()
+    pipeline.genre_index = pipeline._build_genre_index()
+    pipeline.recommender = SimpleNamespace(get_recommendation=lambda query, search_kwargs: "answer")
+    pipeline._ready.set()
+
+    assert "no MAL_ID/genres/Score metadata" in caplog.text
+    with pytest.raises(FiltersUnavailable):
+        pipeline.recommend("space opera", filters=RecommendationFilter(include_genres=("sci-fi",)))
+    assert pipeline.recommend("space opera") == "answer"
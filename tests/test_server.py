@@ -0,0 +1,18 @@
+from starlette.requests import Request
+
+from app.server import rate_limit_key
+
+
+def _request(headers=None, client=("203.0.113.7", 5000)):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw, "client": client})
+
+
+def test_rate_limit_key_ignores_client_supplied_user_header_by_default():
+    assert rate_limit_key(_request({"X-User-Id": "someone-else"}), user_header="") == "203.0.113.7"
+
+
+def test_rate_limit_key_uses_the_configured_proxy_header():
+    request = _request({"X-User-Id": "alice"})
+    assert rate_limit_key(request, user_header="X-User-Id") == "alice"
+    assert rate_limit_key(_request(), user_header="X-User-Id") == "203.0.113.7"
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from utils.stages import run_stages
+
+
+def _stages(log, fail_on=None):
+    lock = threading.Lock()
+
+    def double(item):
+        if item == fail_on:
+            raise ValueError(f"bad item {item}")
+        return item * 2
+
+    def collect(item):
+        with lock:
+            log.append(item)
+
+    return [("double", double), ("collect", collect)]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_every_item_flows_through_in_order(parallel):
+    log = []
+    run_stages(range(20), _stages(log), queue_size=2, parallel=parallel)
+    assert log == [i * 2 for i in range(20)]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_stage_error_is_raised_after_earlier_items_finish(parallel):
+    log = []
+    with pytest.raises(ValueError, match="bad item 5"):
+        run_stages(range(20), _stages(log, fail_on=5), queue_size=2, parallel=parallel)
+    # Items handed on before the failure still reach the last stage; nothing after it does
+    assert log == [i * 2 for i in range(5)]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_source_error_is_raised_and_queued_items_drain(parallel):
+    def source():
+        yield from range(3)
+        raise RuntimeError("source broke")
+
+    log = []
+    with pytest.raises(RuntimeError, match="source broke"):
+        run_stages(source(), _stages(log), queue_size=2, parallel=parallel)
+    assert log == [0, 2, 4]
+
+
+def test_failed_stage_stops_the_source():
+    consumed = []
+
+    def source():
+        for i in range(1000):
+            consumed.append(i)
+            yield i
+
+    with pytest.raises(ValueError):
+        run_stages(source(), _stages([], fail_on=0), queue_size=1)
+    # Bounded queues: the source can only run a few items ahead of the failure
+    assert len(consumed) < 10
+    assert not [t for t in threading.enumerate() if t.name.startswith("stage-")]
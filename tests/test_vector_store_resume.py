@@ -0,0 +1,138 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.vector_store import VectorStoreBuilder, native_collection
+from utils.custom_exception import CustomException
+
+
+def _documents(n=12):
+    return [
+        Document(
+            page_content=f"Title: Anime {i} Overview: " + " ".join(f"word{i}-{j}" for j in range(60)),
+            metadata={"MAL_ID": i, "Score": 7.0 + i / 10, "genres": "|action|"},
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Fake embeddings that count the texts they encode and can fail on a given call."""
+
+    calls: int = 0
+    texts: int = 0
+    fail_on_call: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("embedding backend died")
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def _builder(tmp_path, name, embedding):
+    return VectorStoreBuilder(
+        csv_path="", persist_dir=str(tmp_path / name), embedding=embedding, ingest_batch_size=3
+    )
+
+
+def _contents(builder):
+    stored = native_collection(builder.load_vectorstore()).get(include=["documents", "metadatas", "embeddings"])
+    return {
+        chunk_id: (text, metadata, [round(x, 6) for x in vector])
+        for chunk_id, text, metadata, vector in zip(
+            stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+        )
+    }
+
+
+def test_sequential_build_matches_parallel_build(tmp_path):
+    parallel = _builder(tmp_path, "parallel", DeterministicFakeEmbedding(size=16))
+    parallel.build_and_save_vectorstore(documents=_documents(), parallel=True, queue_batches=1)
+    sequential = _builder(tmp_path, "sequential", DeterministicFakeEmbedding(size=16))
+    sequential.build_and_save_vectorstore(documents=_documents(), parallel=False)
+
+    assert _contents(parallel) == _contents(sequential)
+    assert parallel.read_manifest()["chunks"] == sequential.read_manifest()["chunks"]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_resume_after_failed_build_only_embeds_the_rest(tmp_path, parallel):
+    failing = CountingEmbedding(size=16, fail_on_call=3)
+    builder = _builder(tmp_path, "db", failing)
+    with pytest.raises(CustomException):
+        builder.build_and_save_vectorstore(documents=_documents(), parallel=parallel, queue_batches=1)
+    assert builder.checkpoint_path.exists()
+    assert builder.read_manifest() is None
+    upserted_before = failing.texts
+
+    retry = CountingEmbedding(size=16)
+    resumed = _builder(tmp_path, "db", retry)
+    resumed.build_and_save_vectorstore(documents=_documents(), parallel=parallel)
+
+    reference = _builder(tmp_path, "reference", DeterministicFakeEmbedding(size=16))
+    reference.build_and_save_vectorstore(documents=_documents())
+    total = len(reference.read_manifest()["chunks"])
+
+    assert upserted_before > 0
+    assert retry.texts == total - upserted_before
+    assert not resumed.checkpoint_path.exists()
+    assert resumed.read_manifest()["chunks"] == reference.read_manifest()["chunks"]
+    assert _contents(resumed) == _contents(reference)
+
+
+def test_incremental_build_after_resume_is_a_no_op(tmp_path):
+    builder = _builder(tmp_path, "db", CountingEmbedding(size=16, fail_on_call=2))
+    with pytest.raises(CustomException):
+        builder.build_and_save_vectorstore(documents=_documents())
+    _builder(tmp_path, "db", DeterministicFakeEmbedding(size=16)).build_and_save_vectorstore(documents=_documents())
+
+    again = CountingEmbedding(size=16)
+    _builder(tmp_path, "db", again).build_and_save_vectorstore(documents=_documents(), incremental=True)
+    assert again.calls == 0
+
+
+def test_interrupted_full_rebuild_does_not_leave_a_trusted_manifest(tmp_path):
+    _builder(tmp_path, "db", DeterministicFakeEmbedding(size=16)).build_and_save_vectorstore(documents=_documents())
+    total = len(_contents(_builder(tmp_path, "db", DeterministicFakeEmbedding(size=16))))
+
+    # A full rebuild drops the collection, writes one batch and dies
+    interrupted = _builder(tmp_path, "db", CountingEmbedding(size=16, fail_on_call=2))
+    with pytest.raises(CustomException):
+        interrupted.build_and_save_vectorstore(documents=_documents(), parallel=False)
+    assert interrupted.read_manifest() is None
+
+    # Without the checkpoint, an incremental build must not trust the old manifest
+    counting = CountingEmbedding(size=16)
+    rerun = _builder(tmp_path, "db", counting)
+    rerun.build_and_save_vectorstore(documents=_documents(), incremental=True, resume=False)
+    assert counting.texts == total
+    assert len(_contents(rerun)) == total
+
+
+def test_full_rebuild_discards_an_old_checkpoint_before_dropping_the_collection(tmp_path, monkeypatch):
+    # An interrupted build leaves a checkpoint listing the chunks it upserted
+    stale = _builder(tmp_path, "db", CountingEmbedding(size=16, fail_on_call=2))
+    with pytest.raises(CustomException):
+        stale.build_and_save_vectorstore(documents=_documents(), parallel=False)
+    assert stale.checkpoint_path.exists()
+
+    # A full rebuild (resume=False) drops the collection and dies before its first checkpoint
+    restart = _builder(tmp_path, "db", DeterministicFakeEmbedding(size=16))
+
+    def crash(base_version):
+        raise RuntimeError("killed")
+
+    monkeypatch.setattr(restart, "_start_checkpoint", crash)
+    with pytest.raises(CustomException):
+        restart.build_and_save_vectorstore(documents=_documents(), parallel=False, resume=False)
+    assert not restart.checkpoint_path.exists()
+
+    # Resuming must not trust the old checkpoint's chunks: they were dropped with the collection
+    counting = CountingEmbedding(size=16)
+    resumed = _builder(tmp_path, "db", counting)
+    resumed.build_and_save_vectorstore(documents=_documents())
+    total = len(resumed.read_manifest()["chunks"])
+    assert counting.texts == total
+    assert len(_contents(resumed)) == total
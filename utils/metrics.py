@@ -0,0 +1,295 @@
+"""
+Lightweight per-stage timing spans and counters, exposed in the Prometheus text
+format (no client library needed).
+
+    with span("retrieval"):
+        docs = retriever.invoke(query)
+    inc("anime_retrieved_documents_total", len(docs))
+
+Everything is a no-op when METRICS_ENABLED is false: `span` returns a shared null
+context and `inc`/`observe` return immediately, so instrumented code pays one
+attribute lookup and a function call.
+
+Each request's spans are also collected into a trace (see `trace`) and logged as one
+JSON line, so a slow request can be broken down from the log file alone.
+"""
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.logger import logging
+from config.config import METRICS_ENABLED, METRICS_PORT
+
+# Stage latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL_CONTEXT = nullcontext()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and label set."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(key) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{self._labels(key)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in sorted(series.items()):
+                    for bound, count in zip(self.buckets, state):
+                        lines.append(f"{name}_bucket{self._labels(key, ('le', f'{bound:g}'))} {count:g}")
+                    lines.append(f"{name}_bucket{self._labels(key, ('le', '+Inf'))} {state[-1]:g}")
+                    lines.append(f"{name}_sum{self._labels(key)} {state[-2]:.6f}")
+                    lines.append(f"{name}_count{self._labels(key)} {state[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("anime_stage_duration_seconds", "Latency of each recommend stage.")
+REGISTRY.describe("anime_requests_total", "Recommendation requests by method.")
+REGISTRY.describe("anime_request_errors_total", "Failed recommendation requests by method.")
+REGISTRY.describe("anime_retrieved_documents_total", "Documents returned by the retriever.")
+REGISTRY.describe("anime_context_chars_total", "Characters of retrieved context stuffed into prompts.")
+REGISTRY.describe("anime_context_tokens_total", "Context tokens before and after compression.")
+REGISTRY.describe("anime_llm_tokens_total", "LLM tokens reported by the provider, by type.")
+REGISTRY.describe("anime_llm_calls_total", "LLM calls made.")
+REGISTRY.describe("anime_http_rejected_total", "HTTP requests rejected with 429 (server saturated).")
+REGISTRY.describe("anime_llm_coalesced_total", "LLM requests served by joining an identical in-flight call.")
+REGISTRY.describe("anime_llm_retries_total", "LLM calls retried after a retryable failure, by status.")
+REGISTRY.describe("anime_user_rate_limited_total", "Requests rejected by the per-user rate limit.")
+
+_enabled = METRICS_ENABLED
+_current_trace: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "anime_metrics_trace", default=None
+)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool) -> None:
+    """Turn collection on or off at runtime (e.g. in benchmarks)."""
+    global _enabled
+    _enabled = value
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    if _enabled:
+        REGISTRY.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    if _enabled:
+        REGISTRY.observe(name, value, **labels)
+
+
+def _record(stage: str, seconds: float) -> None:
+    REGISTRY.observe("anime_stage_duration_seconds", seconds, stage=stage)
+    current = _current_trace.get()
+    if current is not None:
+        current[stage] = round(current.get(stage, 0.0) + seconds, 6)
+
+
+@contextmanager
+def _span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - start)
+
+
+def span(stage: str):
+    """Context manager timing one stage into `anime_stage_duration_seconds{stage=...}`."""
+    if not _enabled:
+        return _NULL_CONTEXT
+    return _span(stage)
+
+
+@contextmanager
+def _trace(method: str, query: str) -> Iterator[Dict[str, float]]:
+    spans: Dict[str, float] = {}
+    token = _current_trace.set(spans)
+    REGISTRY.inc("anime_requests_total", method=method)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield spans
+    except Exception:
+        # Not BaseException: a client abandoning a stream (GeneratorExit) or a cancelled
+        # task (CancelledError) is not a request error
+        failed = True
+        REGISTRY.inc("anime_request_errors_total", method=method)
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming generator finished in a different context than it started
+            _current_trace.set(None)
+        total = time.perf_counter() - start
+        _record("total", total)
+        logging.info(
+            "recommend_trace %s",
+            json.dumps({"method": method, "query": query[:200], "failed": failed, "spans": spans}),
+        )
+
+
+def trace(method: str, query: str = ""):
+    """
+    Wraps one request: counts it, times it as stage "total" and logs its spans as a
+    single `recommend_trace {...}` JSON line.
+    """
+    if not _enabled:
+        return _NULL_CONTEXT
+    return _trace(method, query)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback that times every LLM call as stage "llm" and counts the prompt
+    and completion tokens the provider reports (`usage_metadata` / `token_usage`).
+    """
+
+    # Run in the caller's context (not an executor) so spans land in the request trace
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[Any, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        start = self._starts.pop(run_id, None)
+        if not _enabled:
+            return
+        if start is not None:
+            _record("llm", time.perf_counter() - start)
+        REGISTRY.inc("anime_llm_calls_total")
+
+        prompt_tokens, completion_tokens = self._token_usage(response)
+        if prompt_tokens:
+            REGISTRY.inc("anime_llm_tokens_total", prompt_tokens, type="prompt")
+        if completion_tokens:
+            REGISTRY.inc("anime_llm_tokens_total", completion_tokens, type="completion")
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs) -> None:
+        self._starts.pop(run_id, None)
+
+    @staticmethod
+    def _token_usage(response: LLMResult) -> Tuple[int, int]:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        return int(usage.get("prompt_tokens", 0)), int(usage.get("completion_tokens", 0))
+
+
+def callbacks() -> List[BaseCallbackHandler]:
+    """Callbacks to pass in a runnable config; empty when metrics are disabled."""
+    return [MetricsCallbackHandler()] if _enabled else []
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would otherwise flood stderr
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve `/metrics` on a daemon thread. Idempotent (safe to call on every Streamlit
+    rerun); does nothing when metrics are disabled.
+    """
+    global _server
+    if not _enabled:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logging.info(f"Metrics endpoint listening on {host}:{port}/metrics")
+    return _server
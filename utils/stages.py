@@ -0,0 +1,132 @@
+"""
+Minimal producer/consumer pipeline: items from a source iterable flow through a
+sequence of stage functions, each running in its own thread and connected to the next
+by a bounded queue.
+
+    run_stages(batches, [("embed", embed), ("persist", persist)], queue_size=4)
+
+While one stage is busy (e.g. encoding on the CPU) the others keep working on the
+batches before and after it (reading and splitting, writing to the database), and
+the bounded queues stop a fast stage from running arbitrarily far ahead.
+"""
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from utils.logger import logging
+
+Stage = Tuple[str, Callable[[Any], Any]]
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class _Stopped(Exception):
+    """Another stage failed; unwind this one."""
+
+
+def _put(q: queue.Queue, item: Any, stopped: Callable[[], bool]) -> None:
+    while True:
+        if stopped():
+            raise _Stopped()
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stopped: Callable[[], bool]) -> Any:
+    while True:
+        if stopped():
+            raise _Stopped()
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+
+
+def run_stages(source: Iterable[Any], stages: Sequence[Stage], queue_size: int = 4, parallel: bool = True) -> None:
+    """
+    Feeds every item of `source` through `stages` in order; each stage receives the
+    previous one's return value and the last stage's return value is discarded.
+
+    When a stage fails, the source and the stages before it stop, while the stages
+    after it finish the items already handed to them (so e.g. batches that were
+    already embedded still get written before the error is raised).
+
+    :param source:     Iterated in the calling thread (the first, producing stage).
+    :param stages:     (name, function) pairs; each gets its own thread.
+    :param queue_size: Items buffered in front of each stage.
+    :param parallel:   False runs every stage inline, one item at a time.
+    :raises: The first exception raised by the source or any stage, after every
+             thread has stopped.
+    """
+    if not parallel:
+        for item in source:
+            for _, function in stages:
+                item = function(item)
+        return
+
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    errors: List[BaseException] = []
+    # Highest index of a failed stage; it and everything upstream of it stop (source = -1)
+    failed = [-2]
+    lock = threading.Lock()
+
+    def fail(index: int, error: BaseException) -> None:
+        with lock:
+            errors.append(error)
+            failed[0] = max(failed[0], index)
+
+    def worker(index: int) -> None:
+        name, function = stages[index]
+        stopped = lambda: failed[0] >= index  # noqa: E731
+        outbox: Optional[queue.Queue] = queues[index + 1] if index + 1 < len(stages) else None
+        try:
+            while True:
+                item = _get(queues[index], stopped)
+                if item is _DONE:
+                    break
+                try:
+                    result = function(item)
+                except BaseException as e:
+                    logging.error(f"Build stage '{name}' failed", exc_info=True)
+                    fail(index, e)
+                    break
+                if outbox is not None:
+                    _put(outbox, result, stopped)
+        except _Stopped:
+            pass
+        if outbox is not None:
+            # Let downstream stages drain what they already have, unless they failed too
+            try:
+                _put(outbox, _DONE, lambda: failed[0] > index)
+            except _Stopped:
+                pass
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"stage-{name}", daemon=True)
+        for i, (name, _) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+
+    source_stopped = lambda: failed[0] >= -1  # noqa: E731
+    try:
+        for item in source:
+            _put(queues[0], item, source_stopped)
+    except _Stopped:
+        pass
+    except BaseException as e:
+        fail(-1, e)
+    finally:
+        try:
+            _put(queues[0], _DONE, lambda: failed[0] >= 0)
+        except _Stopped:
+            pass
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]